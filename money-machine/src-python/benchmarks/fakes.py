@@ -0,0 +1,61 @@
+"""
+Offline stand-in for Gemini, used by the benchmark suite
+The exchange side uses engine.exchange_simulator.SimulatedExchange
+"""
+
+import json
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeStreamResponse:
+    """Iterable of text chunks, like a streamed GenerateContentResponse"""
+
+    def __init__(self, text: str, chunk_chars: int, latency: float):
+        self.text = text
+        self.usage_metadata = None
+        self._chunk_chars = chunk_chars
+        self._latency = latency
+
+    def __iter__(self):
+        # Latency is spread over the chunks in proportion to their length
+        for start in range(0, len(self.text), self._chunk_chars):
+            chunk = self.text[start:start + self._chunk_chars]
+            if self._latency:
+                time.sleep(self._latency * len(chunk) / len(self.text))
+            yield FakeResponse(chunk)
+
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel; returns a canned JSON decision"""
+
+    RESPONSE = {
+        "action": "BUY",
+        "decision": "BUY",
+        "confidence": 0.72,
+        "entry_price": 50000.0,
+        "stop_loss": 49500.0,
+        "take_profit": 51000.0,
+        "amount_pct": 0.01,
+        "reasoning": "Momentum continuation above the 20-period average with rising volume.",
+        "reason": "Momentum continuation",
+    }
+
+    def __init__(self, latency: float = 0.0, chunk_chars: int = 24):
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.text = json.dumps(self.RESPONSE)
+        self.calls = 0
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            return FakeStreamResponse(self.text, self.chunk_chars, self.latency)
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self.text)
@@ -0,0 +1,481 @@
+"""
+Hot-path benchmark suite for the Money Machine engine
+Runs fully offline against SimulatedExchange / FakeGeminiModel
+
+Usage (from src-python/):
+    python -m benchmarks.run_benchmarks                   # run and compare with baseline
+    python -m benchmarks.run_benchmarks --save-baseline   # record a new baseline
+    python -m benchmarks.run_benchmarks -k ipc --threshold 0.25
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fakes import FakeGeminiModel
+from engine.candle_aggregator import CandleAggregator
+from engine.exchange_simulator import SimulatedExchange
+from engine.features import FeaturePipeline
+from engine.local_model import LocalTier, feature_vector, train_logistic
+from engine.paper_trading import PaperTradingEngine
+from engine.position_sizing import PositionSizer
+from engine.trading_core import TradingEngine
+from engine.signal_generator import SignalGenerator
+from skills.skill_executor import SkillExecutor
+from utils.ipc_server import IPCServer
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_RESULTS = BENCH_DIR / "results" / "latest.json"
+
+IPC_COMMANDS = {
+    "PING": {},
+    "GET_STATUS": {},
+    "GET_PORTFOLIO": {},
+    "START_TRADING": {},
+    "STOP_TRADING": {},
+    "UPDATE_CONFIG": {},
+    "GENERATE_SIGNAL": {"symbol": "BTC/USDT"},
+    "GET_LAST_SIGNAL": {"symbol": "BTC/USDT"},
+    "EXECUTE_SKILL": {"skill": "aggressive-scalper-v1", "params": {"symbol": "BTC/USDT"}},
+    "EXECUTE_SKILLS": {"symbols": ["BTC/USDT", "ETH/USDT"]},
+    "RELOAD_SKILLS": {},
+}
+
+# name -> (setup coroutine returning the operation, iterations per round)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, iterations: int = 1000):
+    def register(setup: Callable):
+        BENCHMARKS[name] = (setup, iterations)
+        return setup
+    return register
+
+
+class BenchContext:
+    """Shared offline engine, app and IPC server for one benchmark run"""
+
+    def __init__(self, tmp_dir: Path):
+        self.tmp_dir = tmp_dir
+        self.config = {"initial_balance": 10000.0, "max_risk_per_trade": 1.0,
+                       "max_gross_exposure": 1e9, "max_asset_exposure": 1e9}
+        self.engine = TradingEngine(self.config)
+        self.engine.exchange = SimulatedExchange()
+        self.engine._connected = True
+        self.candles: List[List] = []
+        self.app = None
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        from main import MoneyMachineApp
+
+        self.candles = await self.engine.get_market_data("BTC/USDT")
+
+        # Skills directory with the stock skill plus generated copies
+        skills_dir = self.tmp_dir / "skills"
+        skills_dir.mkdir()
+        _write_skill_copies(skills_dir, 50)
+
+        app = MoneyMachineApp()
+        app.config = self.config
+        app.engine = self.engine
+        app.skill_executor = SkillExecutor(self.engine, skills_dir=skills_dir)
+        app.signal_generator = SignalGenerator(features=self.engine.features)
+        app.signal_generator.model = FakeGeminiModel()
+        self.app = app
+
+        ipc = IPCServer(app.handle_command, port=0)
+        self.server = await asyncio.start_server(ipc.handle_client, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def round_trip(self, command: str, payload: dict) -> dict:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write((json.dumps({"command": command, "payload": payload}) + "\n").encode())
+        await writer.drain()
+        response = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        return json.loads(response)
+
+
+def _write_skill_copies(skills_dir: Path, count: int):
+    source = (Path(__file__).parent.parent / "skills" / "aggressive_scalper.aix").read_text()
+    shutil.copy(Path(__file__).parent.parent / "skills" / "aggressive_scalper.aix", skills_dir)
+    for i in range(count):
+        text = source.replace('name: "aggressive-scalper-v1"', f'name: "bench-skill-{i}"')
+        (skills_dir / f"bench_skill_{i}.aix").write_text(text)
+
+
+# === IPC ===
+
+def _register_ipc(command: str, payload: dict):
+    iterations = 20 if command == "RELOAD_SKILLS" else 200
+
+    @benchmark(f"ipc.{command}", iterations=iterations)
+    async def setup(ctx: BenchContext):
+        async def op():
+            result = await ctx.round_trip(command, payload)
+            if result.get("error") and command != "GET_LAST_SIGNAL":
+                raise RuntimeError(f"{command} failed: {result['error']}")
+        return op
+
+
+for _command, _payload in IPC_COMMANDS.items():
+    _register_ipc(_command, _payload)
+
+
+@benchmark("handler.GET_PORTFOLIO_unchanged", iterations=5000)
+async def bench_portfolio_unchanged(ctx: BenchContext):
+    # Repeated poll with the current version: cached encoded reply, no serialization
+    first = await ctx.app.handle_command("GET_PORTFOLIO", {})
+    version = json.loads(first.line)["result"]["version"]
+
+    async def op():
+        await ctx.app.handle_command("GET_PORTFOLIO", {"since_version": version})
+    return op
+
+
+# === Signal generation ===
+
+@benchmark("context.get_context_string", iterations=2000)
+async def bench_context_string(ctx: BenchContext):
+    generator = SignalGenerator()
+    generator.context.add_market_data("BTC/USDT", ctx.candles)
+    return lambda: generator.context.get_context_string("BTC/USDT")
+
+
+@benchmark("context.get_compact_context", iterations=2000)
+async def bench_compact_context(ctx: BenchContext):
+    generator = SignalGenerator()
+    generator.context.add_market_data("BTC/USDT", ctx.candles)
+
+    def op():
+        generator.context.add_market_data("BTC/USDT", ctx.candles)
+        return generator.context.get_compact_context("BTC/USDT")
+    return op
+
+
+@benchmark("signal.rule_based", iterations=5000)
+async def bench_rule_based_signal(ctx: BenchContext):
+    generator = SignalGenerator()
+    return lambda: generator._generate_rule_based_signal("BTC/USDT", ctx.candles)
+
+
+@benchmark("signal.parse_json_response", iterations=5000)
+async def bench_parse_json(ctx: BenchContext):
+    generator = SignalGenerator()
+    text = FakeGeminiModel().text
+    return lambda: generator._parse_json_response("BTC/USDT", text, ctx.candles)
+
+
+@benchmark("signal.generate_streamed", iterations=500)
+async def bench_generate_streamed(ctx: BenchContext):
+    # Streamed fake Gemini call: worker-thread hand-off plus incremental parsing
+    generator = SignalGenerator()
+    generator.model = FakeGeminiModel()
+
+    async def op():
+        await generator.generate_signal("BTC/USDT", ctx.candles)
+    return op
+
+
+@benchmark("features.update_same_bar", iterations=5000)
+async def bench_features_same_bar(ctx: BenchContext):
+    # Every read between candle closes: context refresh only, features reused
+    pipeline = FeaturePipeline()
+    pipeline.update("BTC/USDT", ctx.candles)
+    return lambda: pipeline.update("BTC/USDT", ctx.candles)
+
+
+@benchmark("local_model.predict", iterations=20000)
+async def bench_local_model_predict(ctx: BenchContext):
+    # Local tier decision on a feature snapshot, with a model trained on synthetic labels
+    snapshot = FeaturePipeline().update("BTC/USDT", ctx.candles, {"position": 0.0})
+    x = np.asarray([feature_vector(snapshot.features, snapshot.exposure)] * 3)
+    x[:, 0] += [-10.0, 0.0, 10.0]
+    tier = LocalTier({"enabled": True, "shadow_every": 0, "min_confidence": 0.0})
+    tier.model = train_logistic(x, ["BUY", "HOLD", "SELL"], epochs=50)
+    return lambda: tier.predict(snapshot.features, snapshot.exposure)
+
+
+@benchmark("sizing.same_bar", iterations=500)
+async def bench_sizing_same_bar(ctx: BenchContext):
+    # Every signal between candle closes: cached paths, stop / take evaluated on all of them
+    sizer = PositionSizer({"seed": 1})
+    return lambda: sizer.size("BTC/USDT", "BUY", ctx.candles, confidence=0.6)
+
+
+@benchmark("sizing.new_bar", iterations=200)
+async def bench_sizing_new_bar(ctx: BenchContext):
+    # First signal after a candle close: resample and accumulate the paths, then evaluate
+    sizer = PositionSizer({"seed": 1})
+
+    def op():
+        sizer._cache.clear()
+        return sizer.size("BTC/USDT", "BUY", ctx.candles, confidence=0.6)
+    return op
+
+
+@benchmark("scanner.scan_600", iterations=5)
+async def bench_scanner_scan(ctx: BenchContext):
+    # Full scan of a 600-symbol simulated universe: tickers, prefilter to 200, candles, ranking
+    symbols = [f"SIM{i:03d}/USDT" for i in range(600)]
+    engine = TradingEngine({"exchange": {"name": "simulator",
+                                         "simulator": {"symbols": symbols, "history_bars": 600}}})
+    await engine.initialize()
+    await engine.scanner.scan()  # Generates the simulated history once
+
+    async def op():
+        await engine.scanner.scan()
+    return op
+
+
+@benchmark("features.update_new_bar", iterations=2000)
+async def bench_features_new_bar(ctx: BenchContext):
+    # Once per candle close: full feature computation
+    pipeline = FeaturePipeline()
+
+    def op():
+        pipeline._snapshots.clear()
+        return pipeline.update("BTC/USDT", ctx.candles)
+    return op
+
+
+# === Skills ===
+
+@benchmark("skills.load_cold", iterations=5)
+async def bench_skill_load_cold(ctx: BenchContext):
+    skills_dir = ctx.tmp_dir / "skills"
+
+    def op():
+        (skills_dir / ".skill_cache.json").unlink(missing_ok=True)
+        SkillExecutor(ctx.engine, skills_dir=skills_dir)
+    return op
+
+
+@benchmark("skills.reload_warm", iterations=20)
+async def bench_skill_reload(ctx: BenchContext):
+    return ctx.app.skill_executor.reload_skills
+
+
+# === Order path ===
+
+@benchmark("trade.execute_mock", iterations=5000)
+async def bench_execute_trade(ctx: BenchContext):
+    engine = TradingEngine(ctx.config)
+    await engine.get_market_data("BTC/USDT")
+    sides = ['buy', 'sell']
+    counter = [0]
+
+    async def op():
+        counter[0] += 1
+        result = await engine.execute_trade({
+            "symbol": "BTC/USDT", "order_type": sides[counter[0] % 2], "amount": 0.001
+        })
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+    return op
+
+
+@benchmark("trade.execute_simulated", iterations=2000)
+async def bench_execute_trade_simulated(ctx: BenchContext):
+    engine = TradingEngine(ctx.config)
+    engine.exchange = SimulatedExchange()
+    await engine.get_market_data("BTC/USDT")
+    sides = ['buy', 'sell']
+    counter = [0]
+
+    async def op():
+        counter[0] += 1
+        result = await engine.execute_trade({
+            "symbol": "BTC/USDT", "order_type": sides[counter[0] % 2], "amount": 0.001
+        })
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+    return op
+
+
+@benchmark("exchange.fetch_ohlcv_5m", iterations=2000)
+async def bench_fetch_ohlcv(ctx: BenchContext):
+    exchange = SimulatedExchange()
+
+    async def op():
+        await exchange.fetch_ohlcv("BTC/USDT", "5m", limit=100)
+    return op
+
+
+@benchmark("paper.on_tick_10k_resting", iterations=20000)
+async def bench_paper_tick(ctx: BenchContext):
+    paper = PaperTradingEngine({"max_participation": None})
+    rng = random.Random(7)
+    for i in range(10000):
+        side = 'buy' if i % 2 else 'sell'
+        offset = rng.uniform(1, 20)
+        paper.submit("BTC/USDT", side, 1.0, 100 - offset if side == 'buy' else 100 + offset, 100)
+    prices = [100 + rng.gauss(0, 2) for _ in range(1000)]
+    counter = [0]
+
+    def op():
+        counter[0] += 1
+        paper.on_tick("BTC/USDT", prices[counter[0] % 1000], 1.0)
+    return op
+
+
+@benchmark("candles.base_update_4_frames", iterations=20000)
+async def bench_candle_update(ctx: BenchContext):
+    # One new 1m candle folded into tracked 5m/15m/1h/4h frames
+    aggregator = CandleAggregator()
+    base = await ctx.engine.exchange.fetch_ohlcv("BTC/USDT", "1m", limit=1000)
+    aggregator.on_candles("BTC/USDT", base)
+    for timeframe in ("5m", "15m", "1h", "4h"):
+        aggregator.get("BTC/USDT", timeframe)
+    candle = list(base[-1])
+
+    def op():
+        candle[0] += 60_000
+        aggregator.on_candles("BTC/USDT", [candle])
+    return op
+
+
+# === Runner ===
+
+async def _time_op(op: Callable, iterations: int, rounds: int) -> Dict:
+    is_async = inspect.iscoroutinefunction(op)
+
+    # Warm-up
+    for _ in range(max(1, iterations // 10)):
+        if is_async:
+            await op()
+        else:
+            op()
+
+    per_op_us = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        if is_async:
+            for _ in range(iterations):
+                await op()
+        else:
+            for _ in range(iterations):
+                op()
+        per_op_us.append((time.perf_counter() - start) / iterations * 1e6)
+
+    return {
+        "median_us": statistics.median(per_op_us),
+        "min_us": min(per_op_us),
+        "max_us": max(per_op_us),
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+async def run_benchmarks(selected: Optional[str] = None, rounds: int = 5) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = BenchContext(Path(tmp))
+        await ctx.start()
+        try:
+            for name, (setup, iterations) in BENCHMARKS.items():
+                if selected and selected not in name:
+                    continue
+                op = await setup(ctx)
+                results[name] = await _time_op(op, iterations, rounds)
+                print(f"{name:<36} {results[name]['median_us']:>12.1f} us/op")
+        finally:
+            await ctx.stop()
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Return the names of benchmarks slower than baseline by more than threshold"""
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<36} {'-':>12} {result['median_us']:>12.1f} {'new':>9}")
+            continue
+        change = result['median_us'] / base['median_us'] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {base['median_us']:>12.1f} {result['median_us']:>12.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _metadata() -> Dict:
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Money Machine engine benchmarks")
+    parser.add_argument("-k", dest="selected", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="relative slowdown flagged as a regression (default 0.20)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    # Keep per-command INFO logs out of the timings and the report
+    logging.disable(logging.INFO)
+
+    results = asyncio.run(run_benchmarks(args.selected, args.rounds))
+    document = {"meta": _metadata(), "results": results}
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(document, indent=2))
+
+    if args.save_baseline:
+        baseline = {"meta": document["meta"], "results": {}}
+        if args.baseline.exists():
+            baseline["results"] = json.loads(args.baseline.read_text()).get("results", {})
+        baseline["results"].update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()).get("results", {})
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
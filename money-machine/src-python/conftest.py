@@ -0,0 +1,13 @@
+"""
+pytest setup for the Python engine
+Tests import engine/, skills/ and utils/ as top-level packages, the way
+main.py and the benchmarks run them.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Manual scripts against a running engine / the Gemini API, not unit tests
+collect_ignore = ["test_ai_signals.py", "test_ipc.py"]
@@ -0,0 +1,211 @@
+"""
+Multi-timeframe candle aggregation from one base stream
+Each symbol keeps a single base-resolution series (fed by 1m candles or by
+trades). Higher timeframes are resampled from it with NumPy the first time
+they are requested and then updated incrementally: every base candle touches
+only the forming bar of each tracked timeframe.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+_UNIT_MS = {'s': 1000, 'm': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """'15m' -> 900000"""
+    try:
+        return int(timeframe[:-1]) * _UNIT_MS[timeframe[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def resample(candles: np.ndarray, step_ms: int) -> np.ndarray:
+    """Aggregate an (n, 6) OHLCV array into step_ms buckets"""
+    if len(candles) == 0:
+        return np.empty((0, 6))
+    buckets = candles[:, 0] - candles[:, 0] % step_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    out = np.empty((len(starts), 6))
+    out[:, 0] = buckets[starts]
+    out[:, 1] = candles[starts, 1]
+    out[:, 2] = np.maximum.reduceat(candles[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(candles[:, 3], starts)
+    out[:, 4] = candles[ends, 4]
+    out[:, 5] = np.add.reduceat(candles[:, 5], starts)
+    return out
+
+
+def _to_rows(array: np.ndarray) -> List[List]:
+    return [[int(row[0]), *row[1:]] for row in array.tolist()]
+
+
+class _Frame:
+    """Bars of one timeframe; the last one may still be forming"""
+
+    def __init__(self, step_ms: int, max_bars: int, bars: List[List]):
+        self.step_ms = step_ms
+        self.max_bars = max_bars
+        self.bars = bars
+        self.seeded = False
+        self._trim()
+
+    def _trim(self):
+        # Amortized: trim only once the list is twice the limit
+        if len(self.bars) > 2 * self.max_bars:
+            del self.bars[:len(self.bars) - self.max_bars]
+
+    def add(self, candle: List, previous_volume: Optional[float]):
+        """Fold one base candle in; previous_volume is set when it revises the last base candle"""
+        bucket = candle[0] - candle[0] % self.step_ms
+        bars = self.bars
+        if bars and bars[-1][0] == bucket:
+            bar = bars[-1]
+            if candle[2] > bar[2]:
+                bar[2] = candle[2]
+            if candle[3] < bar[3]:
+                bar[3] = candle[3]
+            bar[4] = candle[4]
+            bar[5] += candle[5] - (previous_volume or 0.0)
+        elif not bars or bucket > bars[-1][0]:
+            bars.append([bucket, candle[1], candle[2], candle[3], candle[4], candle[5]])
+            self._trim()
+
+    def seed(self, ohlcv: List[List]):
+        """Prepend exchange bars older than the first bar built from base candles"""
+        first = self.bars[0][0] if self.bars else None
+        self.bars = [list(c) for c in ohlcv if first is None or c[0] < first] + self.bars
+        self.seeded = True
+        self._trim()
+
+
+class _SymbolCandles:
+    def __init__(self, base_ms: int, history: int, max_bars: int):
+        self.base = _Frame(base_ms, history, [])
+        self.frames: Dict[int, _Frame] = {}
+        self.max_bars = max_bars
+        self.fetched_at = 0.0
+
+    def add(self, candle: List):
+        base = self.base.bars
+        previous_volume = None
+        if base:
+            last_ts = base[-1][0]
+            if candle[0] < last_ts:
+                return
+            if candle[0] == last_ts:
+                # Revision of the forming base candle
+                previous_volume = base[-1][5]
+                base[-1] = list(candle[:6])
+            else:
+                base.append(list(candle[:6]))
+                self.base._trim()
+        else:
+            base.append(list(candle[:6]))
+        for frame in self.frames.values():
+            frame.add(candle, previous_volume)
+
+    def frame(self, step_ms: int) -> _Frame:
+        frame = self.frames.get(step_ms)
+        if frame is None:
+            bars = self.base.bars
+            array = np.asarray(bars, dtype=np.float64)[:, :6] if bars else np.empty((0, 6))
+            rows = _to_rows(resample(array, step_ms))
+            if rows and rows[0][0] < bars[0][0]:
+                # Leading bucket only partly covered by base history
+                rows.pop(0)
+            frame = _Frame(step_ms, self.max_bars, rows)
+            self.frames[step_ms] = frame
+        return frame
+
+
+class CandleAggregator:
+    """Per-symbol base series plus every requested higher timeframe, served from memory"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.enabled = bool(config.get('enabled', False))
+        self.base_timeframe = config.get('base_timeframe', '1m')
+        self.base_ms = timeframe_ms(self.base_timeframe)
+        self.history = int(config.get('history', 1000))
+        self.max_bars = int(config.get('max_bars', 500))
+        self.refresh_ms = float(config.get('refresh_ms', 1000))
+        self._symbols: Dict[str, _SymbolCandles] = {}
+
+    def supports(self, timeframe: str) -> bool:
+        """Timeframes that are whole multiples of the base"""
+        try:
+            step = timeframe_ms(timeframe)
+        except ValueError:
+            return False
+        return step >= self.base_ms and step % self.base_ms == 0
+
+    def _symbol(self, symbol: str) -> _SymbolCandles:
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = _SymbolCandles(self.base_ms, self.history, self.max_bars)
+            self._symbols[symbol] = state
+        return state
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        state = self._symbols.get(symbol)
+        return state.base.bars[-1][0] if state and state.base.bars else None
+
+    def needs_refresh(self, symbol: str) -> bool:
+        state = self._symbols.get(symbol)
+        return state is None or (time.monotonic() - state.fetched_at) * 1000 >= self.refresh_ms
+
+    def reset(self, symbol: str):
+        self._symbols.pop(symbol, None)
+
+    def on_candles(self, symbol: str, candles: List[List]):
+        """Merge base candles (oldest first); the last one may be forming"""
+        state = self._symbol(symbol)
+        for candle in candles:
+            state.add(candle)
+        state.fetched_at = time.monotonic()
+
+    def on_trade(self, symbol: str, timestamp_ms: float, price: float, amount: float):
+        """Fold a trade into the forming base candle"""
+        state = self._symbol(symbol)
+        bucket = int(timestamp_ms - timestamp_ms % self.base_ms)
+        last = state.base.bars[-1] if state.base.bars else None
+        if last is not None and last[0] == bucket:
+            candle = [bucket, last[1], max(last[2], price), min(last[3], price), price, last[5] + amount]
+        else:
+            candle = [bucket, price, price, price, price, amount]
+        state.add(candle)
+
+    def needs_seed(self, symbol: str, timeframe: str, limit: int) -> bool:
+        """True while a higher timeframe has fewer than `limit` bars and was never seeded"""
+        step = timeframe_ms(timeframe)
+        state = self._symbols.get(symbol)
+        if state is None or step == self.base_ms:
+            return False
+        frame = state.frame(step)
+        return not frame.seeded and len(frame.bars) < limit
+
+    def seed(self, symbol: str, timeframe: str, ohlcv: List[List]):
+        """Older bars fetched once from the exchange when base history is too short"""
+        self._symbol(symbol).frame(timeframe_ms(timeframe)).seed(ohlcv)
+
+    def get(self, symbol: str, timeframe: str, limit: int = 100) -> List[List]:
+        """Newest `limit` bars at a timeframe, oldest first (last bar may be forming)"""
+        state = self._symbols.get(symbol)
+        if state is None:
+            return []
+        step = timeframe_ms(timeframe)
+        frame = state.base if step == self.base_ms else state.frame(step)
+        return [list(bar) for bar in frame.bars[-limit:]]
+
+    def stats(self) -> Dict:
+        return {
+            "symbols": len(self._symbols),
+            "base_timeframe": self.base_timeframe,
+            "frames": sum(len(s.frames) for s in self._symbols.values()),
+            "base_bars": sum(len(s.base.bars) for s in self._symbols.values()),
+        }
@@ -0,0 +1,500 @@
+"""
+Record/replay cassettes for exchange and Gemini traffic
+Record mode wraps every exchange client and Gemini model. Each call is
+written to a gzip'd JSON-lines file with its arguments, result (or error)
+and latency; streamed completions keep their chunk timings. Replay mode
+serves a session back without network or API keys, at the recorded latency
+or as fast as possible, so full sessions can be benchmarked and profiled
+offline.
+
+Replay matches calls by method and arguments (exchange) or by model, system
+instruction and prompt (Gemini). A call that was never recorded with those
+arguments gets the next unused recording of the same method, in order.
+"""
+
+import asyncio
+import builtins
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+EXCHANGE, LLM = "x", "llm"
+
+# load_markets results are large; only the fields the engine reads are kept
+_MARKET_FIELDS = ('id', 'symbol', 'base', 'quote', 'type', 'spot', 'active', 'precision', 'limits')
+
+
+def _key(*parts: Any) -> str:
+    text = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]
+
+
+def _compact_markets(markets: Any) -> Any:
+    if not isinstance(markets, dict):
+        return markets
+    return {
+        symbol: {k: market.get(k) for k in _MARKET_FIELDS if k in market} if isinstance(market, dict) else market
+        for symbol, market in markets.items()
+    }
+
+
+def _replayed_error(error: List[str]) -> Exception:
+    """Re-create a recorded exception, as its ccxt or builtin type when available"""
+    name, message = error
+    cls = None
+    try:
+        import ccxt
+        cls = getattr(ccxt, name, None)
+    except ImportError:
+        pass
+    cls = cls or getattr(builtins, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        cls = RuntimeError
+    try:
+        return cls(message)
+    except Exception:
+        return RuntimeError(f"{name}: {message}")
+
+
+class Cassette:
+    """One recording file, opened in record or replay mode"""
+
+    def __init__(self, path: str, mode: str, speed: str = "recorded"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.fast = speed == "fast"
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+        self._file = None
+        self._by_key: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._last_by_key: Dict[str, Dict] = {}
+        self._by_method: Dict[tuple, Deque[Dict]] = defaultdict(deque)
+        self._methods: set = set()  # (kind, scope, method) of every recorded call
+        if mode == "record":
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+            self._file.write(json.dumps({"cassette": FORMAT_VERSION, "created": time.time()}) + "\n")
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # === Recording ===
+
+    def _write(self, entry: Dict):
+        line = json.dumps(entry, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded += 1
+            if self.recorded % 100 == 0:
+                self._file.flush()
+
+    def record(self, kind: str, scope: str, method: str, key: str, start: float,
+               result: Any = None, error: Optional[BaseException] = None, **extra):
+        entry = {
+            "k": kind, "s": scope, "m": method, "key": key,
+            "t": round((start - self.started) * 1000, 3),
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        if error is not None:
+            entry["e"] = [type(error).__name__, str(error)]
+        else:
+            entry["r"] = result
+        entry.update(extra)
+        self._write(entry)
+
+    # === Replay ===
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline() or '{}')
+            if header.get("cassette") != FORMAT_VERSION:
+                raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} cassette")
+            for line in f:
+                entry = json.loads(line)
+                entry["used"] = False
+                self._by_key[entry["key"]].append(entry)
+                self._by_method[(entry["k"], entry["s"], entry["m"])].append(entry)
+                self._methods.add((entry["k"], entry["s"], entry["m"]))
+        logger.info(f"Replaying {sum(len(q) for q in self._by_key.values())} calls from {self.path}")
+
+    def next(self, kind: str, scope: str, method: str, key: str) -> Optional[Dict]:
+        """Recorded entry for a call: same arguments first, else the method's next unused one"""
+        with self._lock:
+            queue = self._by_key.get(key)
+            while queue:
+                entry = queue.popleft()
+                if not entry["used"]:
+                    entry["used"] = True
+                    self._last_by_key[key] = entry
+                    self.hits += 1
+                    return entry
+
+            sequence = self._by_method.get((kind, scope, method))
+            while sequence:
+                entry = sequence.popleft()
+                if not entry["used"]:
+                    entry["used"] = True
+                    self.fallbacks += 1
+                    return entry
+
+            # Everything recorded for this call was served: repeat its last response
+            entry = self._last_by_key.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def has_method(self, kind: str, scope: str, method: str) -> bool:
+        """Whether the cassette holds any call of this method"""
+        return (kind, scope, method) in self._methods
+
+    def delay(self, entry: Dict) -> float:
+        return 0.0 if self.fast else entry.get("ms", 0.0) / 1000
+
+    # === Wrappers ===
+
+    def exchange(self, venue_id: str, client: Any = None) -> Any:
+        """Recording proxy around a client, or a replayed client (client is ignored)"""
+        if self.replaying:
+            return ReplayExchange(self, venue_id)
+        return RecordingExchange(self, venue_id, client)
+
+    def genai(self, module: Any = None) -> Any:
+        """Stand-in for the google.generativeai module whose models record or replay"""
+        return _CassetteGenAI(self, module)
+
+    def stats(self) -> Dict:
+        return {"mode": self.mode, "path": self.path, "recorded": self.recorded,
+                "hits": self.hits, "fallbacks": self.fallbacks, "misses": self.misses}
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.close()
+                self._file = None
+            logger.info(f"Recorded {self.recorded} calls to {self.path}")
+
+
+# === Exchange ===
+
+class RecordingExchange:
+    """Passes everything through to the client, recording its coroutine methods"""
+
+    _UNRECORDED = {'close'}
+
+    def __init__(self, cassette: Cassette, venue_id: str, client: Any):
+        self._cassette = cassette
+        self._venue_id = venue_id
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name in self._UNRECORDED or not inspect.iscoroutinefunction(attr):
+            return attr
+        cassette, venue_id = self._cassette, self._venue_id
+
+        async def recorded(*args, **kwargs):
+            key = _key(EXCHANGE, venue_id, name, args, kwargs)
+            start = time.perf_counter()
+            try:
+                result = await attr(*args, **kwargs)
+            except Exception as e:
+                cassette.record(EXCHANGE, venue_id, name, key, start, error=e)
+                raise
+            if name == 'load_markets':
+                # The capability map is read as an attribute, so it rides along with the markets
+                has = getattr(self._client, 'has', None)
+                cassette.record(EXCHANGE, venue_id, name, key, start, result=_compact_markets(result),
+                                has=dict(has) if isinstance(has, dict) else None)
+            else:
+                cassette.record(EXCHANGE, venue_id, name, key, start, result=result)
+            return result
+        return recorded
+
+
+class ReplayExchange:
+    """Exchange client that answers from a cassette
+
+    Only methods the cassette holds calls of resolve; any other attribute
+    raises AttributeError, as it would on a client without it.
+    """
+
+    def __init__(self, cassette: Cassette, venue_id: str):
+        self._cassette = cassette
+        self._venue_id = venue_id
+        self.id = venue_id
+        self.markets: Dict = {}
+        self.has: Dict = {}
+
+    async def close(self):
+        pass
+
+    def __getattr__(self, name: str):
+        cassette, venue_id = self._cassette, self._venue_id
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if not cassette.has_method(EXCHANGE, venue_id, name):
+            raise AttributeError(f"No recorded {name} on {venue_id} in {cassette.path}")
+
+        async def replayed(*args, **kwargs):
+            entry = cassette.next(EXCHANGE, venue_id, name, _key(EXCHANGE, venue_id, name, args, kwargs))
+            if entry is None:
+                raise RuntimeError(f"No recorded {name} on {venue_id} in {cassette.path}")
+            delay = cassette.delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            if "e" in entry:
+                raise _replayed_error(entry["e"])
+            if name == 'load_markets':
+                self.markets = entry["r"] or {}
+                self.has = entry.get("has") or {}
+            return entry["r"]
+        return replayed
+
+
+# === Gemini ===
+
+def _usage(response: Any) -> Optional[Dict]:
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {
+        "prompt_token_count": getattr(usage, 'prompt_token_count', None),
+        "candidates_token_count": getattr(usage, 'candidates_token_count', None),
+    }
+
+
+def _text(chunk: Any) -> Optional[str]:
+    try:
+        return chunk.text
+    except ValueError:
+        return None
+
+
+class _CassetteGenAI:
+    """Only GenerativeModel is used from the SDK module"""
+
+    def __init__(self, cassette: Cassette, module: Any):
+        self._cassette = cassette
+        self._module = module
+
+    def GenerativeModel(self, model_name: str = "", system_instruction: Optional[str] = None, **kwargs):
+        if self._cassette.replaying:
+            return ReplayModel(self._cassette, model_name, system_instruction)
+        model = self._module.GenerativeModel(model_name, system_instruction=system_instruction, **kwargs)
+        return RecordingModel(self._cassette, model, model_name, system_instruction)
+
+
+class _RecordedStream:
+    """Wraps a (sync or async) streamed response, recording chunk timings once it is consumed"""
+
+    def __init__(self, finish, response: Any, start: float):
+        self._finish = finish
+        self._response = response
+        self._start = start
+        self._chunks: List[List] = []
+
+    def _chunk(self, chunk: Any):
+        text = _text(chunk)
+        if text is not None:
+            self._chunks.append([round((time.perf_counter() - self._start) * 1000, 3), text])
+
+    def __iter__(self):
+        try:
+            for chunk in self._response:
+                self._chunk(chunk)
+                yield chunk
+        except Exception as e:
+            self._finish(None, error=e)
+            raise
+        self._finish(self._response, self._chunks)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._response:
+                self._chunk(chunk)
+                yield chunk
+        except Exception as e:
+            self._finish(None, error=e)
+            raise
+        self._finish(self._response, self._chunks)
+
+    def __getattr__(self, name: str):
+        return getattr(self._response, name)
+
+
+class RecordingModel:
+    def __init__(self, cassette: Cassette, model: Any, model_name: str, system_instruction: Optional[str]):
+        self._cassette = cassette
+        self._model = model
+        self._scope = model_name
+        self._system = system_instruction
+
+    def _record(self, message: Any, start: float, stream: bool):
+        key = _key(LLM, self._scope, self._system, message)
+
+        def finish(response: Any, chunks: Optional[List] = None, error: Optional[BaseException] = None):
+            if error is not None:
+                self._cassette.record(LLM, self._scope, 'generate_content', key, start, error=error)
+                return
+            result = None if stream else _text(response)
+            self._cassette.record(LLM, self._scope, 'generate_content', key, start, result=result,
+                                  chunks=chunks, usage=_usage(response))
+        return finish
+
+    def generate_content(self, message: Any, stream: bool = False, **kwargs):
+        start = time.perf_counter()
+        finish = self._record(message, start, stream)
+        try:
+            response = self._model.generate_content(message, stream=stream, **kwargs)
+        except Exception as e:
+            finish(None, error=e)
+            raise
+        if stream:
+            return _RecordedStream(finish, response, start)
+        finish(response)
+        return response
+
+    def __getattr__(self, name: str):
+        # Offer the async client only when the wrapped model has one
+        if name == 'generate_content_async' and hasattr(self._model, name):
+            return self._generate_content_async
+        raise AttributeError(name)
+
+    async def _generate_content_async(self, message: Any, stream: bool = False, **kwargs):
+        start = time.perf_counter()
+        finish = self._record(message, start, stream)
+        try:
+            response = await self._model.generate_content_async(message, stream=stream, **kwargs)
+        except Exception as e:
+            finish(None, error=e)
+            raise
+        if stream:
+            return _RecordedStream(finish, response, start)
+        finish(response)
+        return response
+
+
+class _ReplayedResponse:
+    """Shape of a GenerateContentResponse: text, usage_metadata, iterable of chunks"""
+
+    def __init__(self, entry: Dict, fast: bool):
+        chunks = entry.get("chunks")
+        if chunks is None:
+            chunks = [[entry.get("ms", 0.0), entry.get("r") or ""]]
+        self._chunks = chunks
+        self._fast = fast
+        self.text = "".join(text for _, text in chunks)
+        usage = entry.get("usage")
+        self.usage_metadata = SimpleNamespace(**usage) if usage else None
+
+    def _gaps(self):
+        previous = 0.0
+        for offset, text in self._chunks:
+            yield (0.0 if self._fast else max(0.0, offset - previous) / 1000), text
+            previous = offset
+
+    def __iter__(self):
+        for gap, text in self._gaps():
+            if gap:
+                time.sleep(gap)
+            yield SimpleNamespace(text=text)
+
+    async def __aiter__(self):
+        for gap, text in self._gaps():
+            if gap:
+                await asyncio.sleep(gap)
+            yield SimpleNamespace(text=text)
+
+
+class ReplayModel:
+    def __init__(self, cassette: Cassette, model_name: str, system_instruction: Optional[str]):
+        self._cassette = cassette
+        self._scope = model_name
+        self._system = system_instruction
+
+    def _entry(self, message: Any) -> Dict:
+        key = _key(LLM, self._scope, self._system, message)
+        entry = self._cassette.next(LLM, self._scope, 'generate_content', key)
+        if entry is None:
+            raise RuntimeError(f"No recorded Gemini response for {self._scope} in {self._cassette.path}")
+        if "e" in entry:
+            raise _replayed_error(entry["e"])
+        return entry
+
+    def generate_content(self, message: Any, stream: bool = False, **kwargs):
+        entry = self._entry(message)
+        response = _ReplayedResponse(entry, self._cassette.fast)
+        if not stream and not self._cassette.fast:
+            time.sleep(entry.get("ms", 0.0) / 1000)
+        return response
+
+    async def generate_content_async(self, message: Any, stream: bool = False, **kwargs):
+        entry = self._entry(message)
+        response = _ReplayedResponse(entry, self._cassette.fast)
+        if not stream and not self._cassette.fast:
+            await asyncio.sleep(entry.get("ms", 0.0) / 1000)
+        return response
+
+
+# === Process-wide cassette ===
+
+_active: Optional[Cassette] = None
+
+
+def open_cassette(config: Optional[dict] = None) -> Optional[Cassette]:
+    """Open config['cassette'] ({mode, path, speed}); mode "off" leaves traffic untouched"""
+    global _active
+    config = config or {}
+    mode = config.get('mode', 'off')
+    close_cassette()
+    if mode and mode != 'off':
+        _active = Cassette(config.get('path', 'session.cassette.jsonl.gz'), mode, config.get('speed', 'recorded'))
+        logger.info(f"Cassette {mode}: {_active.path}")
+    return _active
+
+
+def get_cassette() -> Optional[Cassette]:
+    return _active
+
+
+def close_cassette():
+    global _active
+    if _active is not None:
+        _active.close()
+        _active = None
+
+
+def load_genai(api_key: str) -> Any:
+    """google.generativeai, configured, or its recording/replaying stand-in"""
+    cassette = _active
+    if cassette is not None and cassette.replaying:
+        return cassette.genai()
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return cassette.genai(genai) if cassette is not None else genai
+
+
+def llm_available(api_key: str) -> bool:
+    """Gemini is used with an API key, or without one while replaying"""
+    return bool(api_key) or (_active is not None and _active.replaying)
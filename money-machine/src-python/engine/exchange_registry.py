@@ -0,0 +1,222 @@
+"""
+Multi-venue exchange registry
+All ccxt clients share one pooled aiohttp session (keep-alive, DNS cache);
+each venue keeps its own ccxt rate limiter, and cross-venue fan-out calls
+are additionally capped per venue in flight
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from engine.cassette import get_cassette
+from utils.logger import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
+
+
+class Venue:
+    """One configured exchange client and its limits"""
+
+    def __init__(self, venue_id: str, config: dict, client: Any):
+        self.id = venue_id
+        self.config = config
+        self.client = client
+        self.symbols = set(config.get('symbols', []))
+        self.in_flight = asyncio.Semaphore(int(config.get('max_in_flight', 8)))
+        self.errors = 0
+        self.requests = 0
+
+    def has_market(self, symbol: str) -> bool:
+        markets = getattr(self.client, 'markets', None) or {}
+        return symbol in markets
+
+    async def call(self, method: str, *args, **kwargs):
+        async with self.in_flight:
+            self.requests += 1
+            try:
+                return await getattr(self.client, method)(*args, **kwargs)
+            except Exception:
+                self.errors += 1
+                raise
+
+
+class ExchangeRegistry:
+    """Venues built from config['exchanges'] (or the single config['exchange'])
+
+    Symbols route to the venue that lists them explicitly, then to the primary
+    venue if it has the market, then to the first venue that does.
+    """
+
+    def __init__(self, config: dict):
+        venue_configs = config.get('exchanges')
+        if not venue_configs:
+            venue_configs = [config.get('exchange', {})]
+        self.venue_configs: List[dict] = venue_configs
+        self.pool_config = config.get('http_pool', {})
+        self.venues: Dict[str, Venue] = {}
+        self.primary: Optional[Venue] = None
+        self.session = None
+        self._routes: Dict[str, Venue] = {}
+
+    def _get_session(self):
+        """Shared HTTP session for every ccxt venue (created on first use)"""
+        if self.session is None:
+            import aiohttp
+
+            ssl_context = None
+            try:
+                import ssl
+                import certifi
+                ssl_context = ssl.create_default_context(cafile=certifi.where())
+            except ImportError:
+                pass
+
+            connector = aiohttp.TCPConnector(
+                limit=int(self.pool_config.get('limit', 100)),
+                limit_per_host=int(self.pool_config.get('limit_per_host', 20)),
+                ttl_dns_cache=int(self.pool_config.get('dns_cache_ttl', 300)),
+                keepalive_timeout=float(self.pool_config.get('keepalive_timeout', 30)),
+                enable_cleanup_closed=True,
+                ssl=ssl_context,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, trust_env=True)
+        return self.session
+
+    def _create_client(self, venue_config: dict):
+        name = venue_config.get('name', 'binance')
+
+        if name == 'simulator':
+            # Local deterministic market, no network or ccxt required
+            from engine.exchange_simulator import SimulatedExchange
+            return SimulatedExchange(venue_config.get('simulator', {}))
+
+        # Lazy import ccxt to avoid issues if not installed
+        import ccxt.async_support as ccxt
+
+        exchange_class = getattr(ccxt, name, None)
+        if exchange_class is None:
+            logger.error(f"Unknown exchange: {name}")
+            return None
+
+        options = {
+            'apiKey': venue_config.get('api_key', ''),
+            'secret': venue_config.get('secret', ''),
+            'enableRateLimit': True,
+            'sandbox': venue_config.get('sandbox', True),
+            'session': self._get_session(),
+        }
+        if venue_config.get('rate_limit_ms'):
+            options['rateLimit'] = venue_config['rate_limit_ms']
+        return exchange_class(options)
+
+    async def open(self) -> int:
+        """Create every venue and load markets concurrently; returns the number connected"""
+        cassette = get_cassette()
+        candidates = []
+        for venue_config in self.venue_configs:
+            venue_id = venue_config.get('id') or venue_config.get('name', 'binance')
+            if cassette is not None and cassette.replaying:
+                # Served from the recording: no ccxt, session or credentials
+                candidates.append(Venue(venue_id, venue_config, cassette.exchange(venue_id)))
+                continue
+            try:
+                client = self._create_client(venue_config)
+            except ImportError:
+                logger.warning("CCXT not installed. Running in mock mode.")
+                continue
+            if client is not None and cassette is not None:
+                client = cassette.exchange(venue_id, client)
+            if client is not None:
+                candidates.append(Venue(venue_id, venue_config, client))
+
+        results = await asyncio.gather(
+            *(venue.call('load_markets') for venue in candidates), return_exceptions=True
+        )
+        for venue, result in zip(candidates, results):
+            if isinstance(result, Exception):
+                logger.error(f"Exchange initialization error ({venue.id}): {result}")
+                await self._close_client(venue)
+                continue
+            self.venues[venue.id] = venue
+            for symbol in venue.symbols:
+                self._routes.setdefault(symbol, venue)
+
+        if self.venues:
+            self.primary = next(iter(self.venues.values()))
+            logger.info(f"Connected venues: {', '.join(self.venues)}")
+        return len(self.venues)
+
+    def route(self, symbol: str) -> Optional[Venue]:
+        """Venue that handles a symbol"""
+        venue = self._routes.get(symbol)
+        if venue is not None:
+            return venue
+
+        venue = self.primary
+        if venue is not None and not venue.has_market(symbol):
+            venue = next((v for v in self.venues.values() if v.has_market(symbol)), self.primary)
+        if venue is not None:
+            self._routes[symbol] = venue
+        return venue
+
+    def client_for(self, symbol: str) -> Any:
+        venue = self.route(symbol)
+        return venue.client if venue else None
+
+    async def fetch_all(self, method: str, symbol: str, *args, **kwargs) -> Dict[str, Any]:
+        """Call the same method on every venue listing the symbol, concurrently
+
+        Returns {venue_id: result}; venues that failed are left out.
+        """
+        venues = [v for v in self.venues.values() if v.has_market(symbol)]
+        results = await asyncio.gather(
+            *(v.call(method, symbol, *args, **kwargs) for v in venues), return_exceptions=True
+        )
+        out = {}
+        for venue, result in zip(venues, results):
+            if isinstance(result, Exception):
+                hot_path_logger.warning("%s %s failed on %s: %s", method, symbol, venue.id, result)
+                continue
+            out[venue.id] = result
+        return out
+
+    async def best_quotes(self, symbol: str) -> Dict:
+        """Tickers from every venue plus where the best bid and ask are"""
+        tickers = await self.fetch_all('fetch_ticker', symbol)
+        quotes = {
+            venue_id: {"bid": t.get('bid'), "ask": t.get('ask'), "last": t.get('last')}
+            for venue_id, t in tickers.items()
+        }
+        bids = [(q['bid'], v) for v, q in quotes.items() if q['bid']]
+        asks = [(q['ask'], v) for v, q in quotes.items() if q['ask']]
+        return {
+            "symbol": symbol,
+            "quotes": quotes,
+            "best_bid": max(bids)[1] if bids else None,
+            "best_ask": min(asks)[1] if asks else None,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            venue.id: {"requests": venue.requests, "errors": venue.errors}
+            for venue in self.venues.values()
+        }
+
+    @staticmethod
+    async def _close_client(venue: Venue):
+        try:
+            await venue.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing {venue.id}: {e}")
+
+    async def close(self):
+        """Close every venue, then the shared session"""
+        await asyncio.gather(*(self._close_client(v) for v in self.venues.values()))
+        self.venues.clear()
+        self._routes.clear()
+        self.primary = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,531 @@
+"""
+Deterministic local exchange simulator
+Implements the ccxt async methods the engine uses, without network access.
+Select it with exchange name "simulator"; options live under config["exchange"]["simulator"]
+"""
+
+import asyncio
+import copy
+import csv
+import json
+import math
+import random
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+try:
+    # Raise the same exception types as a real ccxt exchange when ccxt is available
+    from ccxt.base.errors import (
+        BadSymbol, ExchangeError, InsufficientFunds, InvalidOrder,
+        NetworkError, OrderNotFound, RateLimitExceeded, RequestTimeout,
+    )
+except ImportError:
+    class ExchangeError(Exception):
+        pass
+
+    class BadSymbol(ExchangeError):
+        pass
+
+    class InsufficientFunds(ExchangeError):
+        pass
+
+    class InvalidOrder(ExchangeError):
+        pass
+
+    class OrderNotFound(ExchangeError):
+        pass
+
+    class NetworkError(Exception):
+        pass
+
+    class RateLimitExceeded(NetworkError):
+        pass
+
+    class RequestTimeout(NetworkError):
+        pass
+
+
+ERRORS = {
+    "network": NetworkError,
+    "timeout": RequestTimeout,
+    "rate_limit": RateLimitExceeded,
+    "insufficient_funds": InsufficientFunds,
+    "invalid_order": InvalidOrder,
+    "exchange": ExchangeError,
+}
+
+TIMEFRAME_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '4h': 14400, '1d': 86400,
+}
+
+DEFAULTS = {
+    "seed": 42,
+    "symbols": ["BTC/USDT", "ETH/USDT", "SOL/USDT"],
+    "start_prices": {"BTC/USDT": 50000.0, "ETH/USDT": 3000.0, "SOL/USDT": 100.0},
+    "start_time_ms": 1_700_000_000_000,
+    "base_timeframe": "1m",     # Generated resolution; coarser timeframes are aggregated from it
+    "history_bars": 5000,       # Base bars available before the simulated clock starts
+    "max_bars": 10000,          # Base bars kept per symbol
+    "volatility": 0.001,        # Per-base-bar log-return stdev
+    "speed": 0.0,               # Simulated seconds per wall second (0 = clock moves only via advance())
+    "ohlcv_files": {},          # symbol -> recorded base-resolution OHLCV (.json list or .csv ts,o,h,l,c,v)
+    "latency_ms": 0.0,
+    "latency_jitter_ms": 0.0,
+    "spread_bps": 2.0,
+    "book_levels": 20,
+    "level_step_bps": 1.0,
+    "level_size_quote": 50000.0,  # Quote notional resting at the best level; deeper levels grow linearly
+    "slippage_bps": 0.0,        # Extra adverse price on every taker fill
+    "fee_rate": 0.001,
+    "rate_limit": 0.0,          # Requests per second (0 = unlimited)
+    "rate_limit_burst": 10,
+    "rate_limit_mode": "throttle",  # "throttle" waits like enableRateLimit, "reject" raises RateLimitExceeded
+    "error_rate": 0.0,          # Probability of a NetworkError on any call
+    "balances": None,           # e.g. {"USDT": 10000}; None = unlimited funds
+}
+
+
+class _Series:
+    """Deterministic base-timeframe candle stream for one symbol, generated on demand"""
+
+    def __init__(self, symbol: str, options: Dict, recorded: Optional[List[List]]):
+        self.step_ms = TIMEFRAME_SECONDS[options['base_timeframe']] * 1000
+        if recorded and len(recorded) > 1:
+            self.step_ms = int(recorded[1][0] - recorded[0][0])
+        self.candles: Deque[List] = deque(maxlen=max(options['max_bars'], options['history_bars']))
+        self.recorded = recorded
+        self.volatility = options['volatility']
+        self.rng = random.Random(options['seed'] ^ zlib.crc32(symbol.encode()))
+        start = options['start_time_ms'] - options['start_time_ms'] % self.step_ms
+        self.next_ts = start - options['history_bars'] * self.step_ms
+        self.next_index = 0
+        self.price = options['start_prices'].get(symbol, 100.0)
+        # (step_ms, limit) -> (last base ts, aggregated bars) for repeated polls of an unchanged market
+        self._aggregated: Dict[Tuple[int, int], Tuple[int, List[List]]] = {}
+
+    def extend_to(self, now_ms: float):
+        """Generate every bar whose open time is at or before now"""
+        while self.next_ts <= now_ms:
+            if self.recorded is not None:
+                if self.next_index >= len(self.recorded):
+                    break
+                candle = list(self.recorded[self.next_index])
+                candle[0] = self.next_ts
+            else:
+                candle = self._synthetic_bar()
+            self.candles.append(candle)
+            self.next_ts += self.step_ms
+            self.next_index += 1
+
+    def _synthetic_bar(self) -> List:
+        rng = self.rng
+        open_p = self.price
+        close = open_p * math.exp(rng.gauss(0, self.volatility))
+        high = max(open_p, close) * (1 + abs(rng.gauss(0, self.volatility / 2)))
+        low = min(open_p, close) * (1 - abs(rng.gauss(0, self.volatility / 2)))
+        volume = rng.lognormvariate(3, 0.5)
+        self.price = close
+        return [self.next_ts, open_p, high, low, close, volume]
+
+    def bars(self, step_ms: int, limit: int, since: Optional[int] = None) -> List[List]:
+        """Candles at a timeframe that is a multiple of the base, aggregated from base bars"""
+        if step_ms <= self.step_ms:
+            source = self.candles if since is None else (c for c in self.candles if c[0] >= since)
+            result = [list(c) for c in source]
+            return result[:limit] if since is not None else result[-limit:]
+
+        if since is None:
+            last_ts = self.candles[-1][0]
+            cached = self._aggregated.get((step_ms, limit))
+            if cached and cached[0] == last_ts:
+                return [list(c) for c in cached[1]]
+            # Only walk as many base bars as the requested window needs
+            first_ts = (self.candles[-1][0] // step_ms - limit + 1) * step_ms
+        else:
+            first_ts = since - since % step_ms
+        result: List[List] = []
+        for c in reversed(self.candles):
+            if c[0] < first_ts:
+                break
+            bucket = c[0] - c[0] % step_ms
+            if result and result[-1][0] == bucket:
+                bar = result[-1]
+                bar[1] = c[1]
+                bar[2] = max(bar[2], c[2])
+                bar[3] = min(bar[3], c[3])
+                bar[5] += c[5]
+            else:
+                result.append([bucket, c[1], c[2], c[3], c[4], c[5]])
+        result.reverse()
+        # Drop a leading bucket that is missing base bars (history edge)
+        if result and self.candles[0][0] > result[0][0]:
+            result.pop(0)
+        if since is not None:
+            return result[:limit]
+
+        result = result[-limit:]
+        self._aggregated[(step_ms, limit)] = (last_ts, result)
+        return [list(c) for c in result]
+
+
+def _load_recorded(path: str) -> List[List]:
+    path = Path(path)
+    if path.suffix == '.csv':
+        with open(path, newline='') as f:
+            return [
+                [float(v) for v in row[:6]]
+                for row in csv.reader(f)
+                if row and not row[0].lstrip().startswith(('#', 't'))
+            ]
+    with open(path) as f:
+        return json.load(f)
+
+
+class SimulatedExchange:
+    """ccxt-compatible async exchange backed by a deterministic simulated market"""
+
+    id = "simulator"
+
+    def __init__(self, options: Optional[Dict] = None):
+        self.options = {**DEFAULTS, **(options or {})}
+        opts = self.options
+
+        self._rng = random.Random(opts['seed'])  # Latency and error injection
+        self._recorded = {symbol: _load_recorded(path) for symbol, path in opts['ohlcv_files'].items()}
+        symbols = list(dict.fromkeys(list(opts['symbols']) + list(self._recorded)))
+        self.markets: Dict[str, Dict] = {}
+        for symbol in symbols:
+            base, quote = symbol.split('/')
+            self.markets[symbol] = {"id": symbol.replace('/', ''), "symbol": symbol,
+                                    "base": base, "quote": quote, "active": True}
+
+        self._series: Dict[str, _Series] = {}
+        self._sim_offset_s = 0.0
+        self._wall_start = time.monotonic()
+
+        self.balances: Optional[Dict[str, float]] = (
+            dict(opts['balances']) if opts['balances'] is not None else None
+        )
+        self.orders: Dict[str, Dict] = {}
+        self._open_orders: Dict[str, Dict] = {}
+        self._order_seq = 0
+
+        self._tokens = float(opts['rate_limit_burst'])
+        self._last_refill = time.monotonic()
+        self._injected: Dict[str, Deque[Exception]] = {}
+
+        self.calls = 0
+        self.rejected_calls = 0
+
+    # === Simulation controls ===
+
+    def now_ms(self) -> float:
+        elapsed = self._sim_offset_s + (time.monotonic() - self._wall_start) * self.options['speed']
+        return self.options['start_time_ms'] + elapsed * 1000
+
+    def advance(self, seconds: float):
+        """Move the simulated clock forward and fill any resting orders the market crossed"""
+        self._sim_offset_s += seconds
+        for order in list(self._open_orders.values()):
+            self._match_resting(order)
+
+    def inject_error(self, method: str, error: str = "network", count: int = 1, message: str = ""):
+        """Make the next `count` calls to `method` (or "*" for any) raise the given error kind"""
+        exc_class = ERRORS[error]
+        queue = self._injected.setdefault(method, deque())
+        for _ in range(count):
+            queue.append(exc_class(message or f"simulated {error} error in {method}"))
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "rejected_calls": self.rejected_calls,
+            "orders": len(self.orders),
+            "open_orders": len(self._open_orders),
+            "sim_time_ms": self.now_ms(),
+        }
+
+    # === Request pipeline: rate limit, latency, errors ===
+
+    async def _request(self, method: str):
+        self.calls += 1
+        await self._rate_limit()
+
+        opts = self.options
+        if opts['latency_ms'] or opts['latency_jitter_ms']:
+            delay = opts['latency_ms'] + self._rng.uniform(0, opts['latency_jitter_ms'])
+            await asyncio.sleep(delay / 1000)
+
+        for key in (method, "*"):
+            queue = self._injected.get(key)
+            if queue:
+                self.rejected_calls += 1
+                raise queue.popleft()
+
+        if opts['error_rate'] and self._rng.random() < opts['error_rate']:
+            self.rejected_calls += 1
+            raise NetworkError(f"simulated network error in {method}")
+
+    async def _rate_limit(self):
+        rate = self.options['rate_limit']
+        if not rate:
+            return
+
+        now = time.monotonic()
+        burst = float(self.options['rate_limit_burst'])
+        self._tokens = min(burst, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        if self.options['rate_limit_mode'] == 'reject':
+            self.rejected_calls += 1
+            raise RateLimitExceeded(f"simulator rate limit {rate:g} req/s exceeded")
+
+        # Reserve the next token and wait for it
+        wait = (1 - self._tokens) / rate
+        self._tokens -= 1
+        await asyncio.sleep(wait)
+
+    def _market(self, symbol: str) -> Dict:
+        market = self.markets.get(symbol)
+        if market is None:
+            raise BadSymbol(f"simulator does not have market symbol {symbol}")
+        return market
+
+    def _series_for(self, symbol: str) -> _Series:
+        series = self._series.get(symbol)
+        if series is None:
+            series = _Series(symbol, self.options, self._recorded.get(symbol))
+            self._series[symbol] = series
+        series.extend_to(self.now_ms())
+        return series
+
+    def _last_price(self, symbol: str) -> float:
+        return self._series_for(symbol).candles[-1][4]
+
+    def _book(self, symbol: str, price: Optional[float] = None) -> Tuple[List[List[float]], List[List[float]]]:
+        """Synthetic depth around the last price: (bids, asks) of [price, amount]"""
+        opts = self.options
+        mid = price or self._last_price(symbol)
+        half_spread = opts['spread_bps'] / 2e4
+        step = opts['level_step_bps'] / 1e4
+        base_size = opts['level_size_quote'] / mid
+        bids, asks = [], []
+        for i in range(opts['book_levels']):
+            size = base_size * (1 + i)
+            bids.append([mid * (1 - half_spread - i * step), size])
+            asks.append([mid * (1 + half_spread + i * step), size])
+        return bids, asks
+
+    # === ccxt market data API ===
+
+    async def load_markets(self, reload: bool = False) -> Dict[str, Dict]:
+        await self._request('load_markets')
+        return self.markets
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict] = None) -> List[List]:
+        await self._request('fetch_ohlcv')
+        self._market(symbol)
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ExchangeError(f"simulator does not support timeframe {timeframe}")
+        series = self._series_for(symbol)
+        return series.bars(TIMEFRAME_SECONDS[timeframe] * 1000, limit or 100, since)
+
+    async def fetch_ticker(self, symbol: str, params: Optional[Dict] = None) -> Dict:
+        await self._request('fetch_ticker')
+        self._market(symbol)
+        return self._ticker(symbol)
+
+    async def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Optional[Dict] = None) -> Dict[str, Dict]:
+        """Tickers for many symbols (default: every market) in one request"""
+        await self._request('fetch_tickers')
+        for symbol in symbols or ():
+            self._market(symbol)
+        return {symbol: self._ticker(symbol) for symbol in symbols or self.markets}
+
+    def _ticker(self, symbol: str) -> Dict:
+        """Ticker from the latest base bar (the simulator keeps no 24h window)"""
+        last = self._series_for(symbol).candles[-1]
+        half_spread = self.options['spread_bps'] / 2e4
+        return {
+            "symbol": symbol, "timestamp": int(self.now_ms()), "last": last[4], "close": last[4],
+            "bid": last[4] * (1 - half_spread), "ask": last[4] * (1 + half_spread),
+            "open": last[1], "high": last[2], "low": last[3],
+            "percentage": (last[4] / last[1] - 1) * 100, "baseVolume": last[5],
+            "quoteVolume": last[5] * last[4],
+        }
+
+    async def fetch_order_book(self, symbol: str, limit: Optional[int] = None,
+                               params: Optional[Dict] = None) -> Dict:
+        await self._request('fetch_order_book')
+        self._market(symbol)
+        bids, asks = self._book(symbol)
+        if limit:
+            bids, asks = bids[:limit], asks[:limit]
+        return {"symbol": symbol, "bids": bids, "asks": asks,
+                "timestamp": int(self.now_ms()), "nonce": self.calls}
+
+    async def fetch_balance(self, params: Optional[Dict] = None) -> Dict:
+        await self._request('fetch_balance')
+        balances = self.balances or {}
+        return {
+            "free": dict(balances),
+            "total": dict(balances),
+            **{currency: {"free": amount, "used": 0.0, "total": amount}
+               for currency, amount in balances.items()},
+        }
+
+    # === ccxt trading API ===
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, params: Optional[Dict] = None) -> Dict:
+        await self._request('create_order')
+        market = self._market(symbol)
+        if side not in ('buy', 'sell'):
+            raise InvalidOrder(f"invalid side {side!r}")
+        if not amount or amount <= 0:
+            raise InvalidOrder("order amount must be positive")
+        if type == 'limit' and not price:
+            raise InvalidOrder("limit order requires a price")
+
+        self._order_seq += 1
+        order = {
+            "id": f"sim_{self._order_seq}",
+            "clientOrderId": (params or {}).get('clientOrderId'),
+            "timestamp": int(self.now_ms()),
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "price": price,
+            "amount": amount,
+            "filled": 0.0,
+            "remaining": amount,
+            "cost": 0.0,
+            "average": None,
+            "status": "open",
+            "fee": {"cost": 0.0, "currency": market['quote']},
+            "trades": [],
+        }
+
+        bids, asks = self._book(symbol)
+        levels = asks if side == 'buy' else bids
+        limit_price = price if type == 'limit' else None
+        self._check_funds(market, side, amount, limit_price or levels[0][0])
+        self._take(order, market, levels, limit_price)
+
+        if order['remaining'] > 1e-12:
+            if type == 'market':
+                # Book exhausted: sweep the rest at the last level (ccxt markets fill completely)
+                self._fill(order, market, levels[-1][0], order['remaining'])
+            else:
+                self._open_orders[order['id']] = order
+
+        self.orders[order['id']] = order
+        return copy.deepcopy(order)
+
+    async def create_market_buy_order(self, symbol: str, amount: float, params: Optional[Dict] = None) -> Dict:
+        return await self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    async def create_market_sell_order(self, symbol: str, amount: float, params: Optional[Dict] = None) -> Dict:
+        return await self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    async def create_limit_buy_order(self, symbol: str, amount: float, price: float,
+                                     params: Optional[Dict] = None) -> Dict:
+        return await self.create_order(symbol, 'limit', 'buy', amount, price, params)
+
+    async def create_limit_sell_order(self, symbol: str, amount: float, price: float,
+                                      params: Optional[Dict] = None) -> Dict:
+        return await self.create_order(symbol, 'limit', 'sell', amount, price, params)
+
+    async def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        await self._request('cancel_order')
+        order = self._open_orders.pop(id, None)
+        if order is None:
+            raise OrderNotFound(f"order {id} is not open")
+        order['status'] = 'canceled'
+        return copy.deepcopy(order)
+
+    async def fetch_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        await self._request('fetch_order')
+        order = self.orders.get(id)
+        if order is None:
+            raise OrderNotFound(f"order {id} not found")
+        if order['status'] == 'open':
+            self._match_resting(order)
+        return copy.deepcopy(order)
+
+    async def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                                limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        await self._request('fetch_open_orders')
+        return [copy.deepcopy(o) for o in self._open_orders.values() if symbol is None or o['symbol'] == symbol]
+
+    async def close(self):
+        pass
+
+    # === Matching ===
+
+    def _check_funds(self, market: Dict, side: str, amount: float, price: float):
+        if self.balances is None:
+            return
+        if side == 'buy':
+            needed, currency = amount * price * (1 + self.options['fee_rate']), market['quote']
+        else:
+            needed, currency = amount, market['base']
+        if self.balances.get(currency, 0.0) + 1e-12 < needed:
+            raise InsufficientFunds(
+                f"simulator: {currency} balance {self.balances.get(currency, 0.0)} < {needed}"
+            )
+
+    def _take(self, order: Dict, market: Dict, levels: List[List[float]], limit_price: Optional[float]):
+        """Walk the book against the order up to its limit price"""
+        buy = order['side'] == 'buy'
+        for level_price, level_size in levels:
+            if order['remaining'] <= 1e-12:
+                break
+            if limit_price is not None and (level_price > limit_price if buy else level_price < limit_price):
+                break
+            self._fill(order, market, level_price, min(level_size, order['remaining']))
+
+    def _fill(self, order: Dict, market: Dict, price: float, amount: float, taker: bool = True):
+        if taker:
+            slip = self.options['slippage_bps'] / 1e4
+            price *= (1 + slip) if order['side'] == 'buy' else (1 - slip)
+        cost = price * amount
+        fee = cost * self.options['fee_rate']
+
+        order['filled'] += amount
+        order['remaining'] = max(0.0, order['amount'] - order['filled'])
+        order['cost'] += cost
+        order['average'] = order['cost'] / order['filled']
+        order['fee']['cost'] += fee
+        order['trades'].append({"price": price, "amount": amount, "cost": cost,
+                                "timestamp": int(self.now_ms())})
+        if order['remaining'] <= 1e-12:
+            order['remaining'] = 0.0
+            order['status'] = 'closed'
+            self._open_orders.pop(order['id'], None)
+
+        if self.balances is not None:
+            base, quote = market['base'], market['quote']
+            sign = 1 if order['side'] == 'buy' else -1
+            self.balances[base] = self.balances.get(base, 0.0) + sign * amount
+            self.balances[quote] = self.balances.get(quote, 0.0) - sign * cost - fee
+
+    def _match_resting(self, order: Dict):
+        """Fill a resting limit order if any bar opened since it was placed traded through its price"""
+        series = self._series_for(order['symbol'])
+        for candle in reversed(series.candles):
+            # The bar the order was placed in may have made its high / low before the order existed
+            if candle[0] < order['timestamp']:
+                break
+            crossed = candle[3] <= order['price'] if order['side'] == 'buy' else candle[2] >= order['price']
+            if crossed:
+                self._fill(order, self.markets[order['symbol']], order['price'], order['remaining'], taker=False)
+                return
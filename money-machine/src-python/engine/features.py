@@ -0,0 +1,160 @@
+"""
+Per-symbol feature snapshots shared by the signal and skill prompts
+Features are computed from closed candles only, so each symbol's snapshot is
+rebuilt once per candle close (or when its portfolio exposure changes) no
+matter how many signal requests and skills read it in between. Snapshots are
+immutable, kept per (symbol, timeframe), and carry a version of their own.
+"""
+
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from engine.indicators import MarketSeries
+from engine.market_snapshot import compute_indicators
+from engine.signal_generator import MarketContext, timeframe_of
+
+RETURN_HORIZONS = (1, 5, 20)
+EMPTY = MappingProxyType({})
+
+
+def _round(value: Optional[float], digits: int = 6) -> Optional[float]:
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def compute_features(series: MarketSeries, window: int = 20) -> Dict[str, Any]:
+    """Indicators, returns, volatility and volume z-score on the last closed bar"""
+    close = series.column('close')
+    volume = series.column('volume')
+    features = compute_indicators(series)
+
+    for horizon in RETURN_HORIZONS:
+        ret = close[-1] / close[-1 - horizon] - 1 if len(close) > horizon and close[-1 - horizon] else None
+        features[f"return_{horizon}"] = _round(ret)
+
+    log_returns = np.diff(np.log(close[-window - 1:])) if len(close) > window else np.empty(0)
+    features["volatility_20"] = _round(log_returns.std()) if len(log_returns) else None
+
+    if len(volume) > window:
+        history = volume[-window - 1:-1]
+        std = history.std()
+        features["volume_z_20"] = _round((volume[-1] - history.mean()) / std, 3) if std else 0.0
+    else:
+        features["volume_z_20"] = None
+    return features
+
+
+@dataclass(frozen=True)
+class FeatureSnapshot:
+    """Features of one symbol and timeframe as of its last closed bar, plus portfolio exposure"""
+    symbol: str
+    version: int
+    bar_timestamp: int  # Open time of the last closed bar (ms)
+    bars: int
+    features: Mapping[str, Any]
+    exposure: Mapping[str, float] = field(default_factory=lambda: EMPTY)
+    timeframe: str = "?"
+
+    def render(self) -> str:
+        """One compact prompt line"""
+        f = self.features
+        parts = [f"features {self.timeframe} v{self.version}:"]
+        for key, label, scale, fmt in (
+            ("rsi_14", "rsi14", 1, ".1f"),
+            ("sma_20", "sma20", 1, ".2f"),
+            ("ema_50", "ema50", 1, ".2f"),
+            ("return_1", "r1", 100, "+.2f"),
+            ("return_5", "r5", 100, "+.2f"),
+            ("return_20", "r20", 100, "+.2f"),
+            ("volatility_20", "vol20", 100, ".2f"),
+            ("volume_z_20", "volz", 1, "+.2f"),
+        ):
+            value = f.get(key)
+            if value is not None:
+                parts.append(f"{label}={value * scale:{fmt}}")
+        e = self.exposure
+        if e:
+            parts.append(
+                f"| exposure pos={e.get('position', 0.0) * 100:+.1f}% "
+                f"gross={e.get('gross', 0.0) * 100:.1f}% open={int(e.get('open_positions', 0))}"
+            )
+        return " ".join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "version": self.version,
+            "bar_timestamp": self.bar_timestamp,
+            "bars": self.bars,
+            "features": dict(self.features),
+            "exposure": dict(self.exposure),
+        }
+
+
+class FeaturePipeline:
+    """Latest FeatureSnapshot per (symbol, timeframe), plus the prompt candle context both AI paths render from"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.window = int(config.get('window', 20))
+        self.context = MarketContext(max_candles=int(config.get('max_candles', 100)))
+        self._snapshots: Dict[Tuple[str, str], FeatureSnapshot] = {}
+        self._latest: Dict[str, str] = {}  # symbol -> timeframe updated last
+        self.computed = 0
+        self.reused = 0
+
+    def get(self, symbol: str, timeframe: Optional[str] = None) -> Optional[FeatureSnapshot]:
+        """Snapshot for a timeframe, by default the one updated last"""
+        return self._snapshots.get((symbol, timeframe or self._latest.get(symbol, "?")))
+
+    def update(
+        self,
+        symbol: str,
+        ohlcv: List[List],
+        exposure: Optional[Dict[str, float]] = None,
+        timeframe: Optional[str] = None
+    ) -> FeatureSnapshot:
+        """Snapshot for the latest candles; the last candle is treated as still forming
+
+        timeframe defaults to the one implied by the candle spacing.
+        """
+        timeframe = timeframe or timeframe_of(ohlcv)
+        self.context.add_market_data(symbol, ohlcv, timeframe)
+
+        exposure = MappingProxyType(dict(exposure)) if exposure else EMPTY
+        closed = ohlcv[:-1]
+        bar_timestamp = int(closed[-1][0]) if closed else 0
+        key = (symbol, timeframe)
+        self._latest[symbol] = timeframe
+        current = self._snapshots.get(key)
+
+        if current is not None and current.bar_timestamp == bar_timestamp:
+            self.reused += 1
+            if current.exposure == exposure:
+                return current
+            # Same bar, new position or fills: only the exposure part changes
+            snapshot = replace(current, version=current.version + 1, exposure=exposure)
+        else:
+            self.computed += 1
+            series = MarketSeries.from_ohlcv(closed)
+            features = compute_features(series, self.window) if closed else {}
+            snapshot = FeatureSnapshot(
+                symbol=symbol,
+                version=current.version + 1 if current else 1,
+                bar_timestamp=bar_timestamp,
+                bars=len(closed),
+                features=MappingProxyType(features),
+                exposure=exposure,
+                timeframe=timeframe,
+            )
+        self._snapshots[key] = snapshot
+        return snapshot
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self._latest), "series": len(self._snapshots),
+                "computed": self.computed, "reused": self.reused}
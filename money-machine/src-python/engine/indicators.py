@@ -0,0 +1,121 @@
+"""
+Technical indicators over columnar candle arrays
+All functions operate along the last axis, so (symbols x bars) arrays work too
+"""
+
+from typing import Callable, Dict, List, Optional, Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _rolling(x: np.ndarray, n: int, reducer: Callable) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= n:
+        out[..., n - 1:] = reducer(sliding_window_view(x, n, axis=-1), axis=-1)
+    return out
+
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling(x, n, np.mean)
+
+
+def highest(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling(x, n, np.max)
+
+
+def lowest(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling(x, n, np.min)
+
+
+def stdev(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling(x, n, np.std)
+
+
+def ema(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < n:
+        return out
+    alpha = 2.0 / (n + 1)
+    prev = np.nanmean(x[..., :n], axis=-1)
+    out[..., n - 1] = prev
+    for t in range(n, x.shape[-1]):
+        cur = x[..., t]
+        prev = np.where(np.isnan(prev), cur, alpha * cur + (1 - alpha) * prev)
+        out[..., t] = prev
+    return out
+
+
+def _wilder(x: np.ndarray, n: int) -> np.ndarray:
+    """Wilder's smoothing (RMA), seeded with the simple mean of the first n values"""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < n:
+        return out
+    prev = x[..., :n].mean(axis=-1)
+    out[..., n - 1] = prev
+    for t in range(n, x.shape[-1]):
+        prev = (prev * (n - 1) + x[..., t]) / n
+        out[..., t] = prev
+    return out
+
+
+def rsi(x: np.ndarray, n: int = 14) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] <= n:
+        return out
+    delta = np.diff(x, axis=-1)
+    avg_gain = _wilder(np.clip(delta, 0, None), n)
+    avg_loss = _wilder(np.clip(-delta, 0, None), n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        value = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, value)
+    return out
+
+
+def roc(x: np.ndarray, n: int = 1) -> np.ndarray:
+    """Percent change over n bars"""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] > n:
+        out[..., n:] = (x[..., n:] / x[..., :-n] - 1.0) * 100.0
+    return out
+
+
+def prev(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] > n:
+        out[..., n:] = x[..., :-n]
+    return out
+
+
+def crosses_above(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a, b = np.broadcast_arrays(a, b)
+    return (a > b) & (prev(a, 1) <= prev(b, 1))
+
+
+def crosses_below(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a, b = np.broadcast_arrays(a, b)
+    return (a < b) & (prev(a, 1) >= prev(b, 1))
+
+
+class MarketSeries:
+    """Columnar OHLCV arrays plus a memo of indicator results shared by all skills"""
+
+    COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, columns: Dict[str, np.ndarray], features: Optional[Dict[str, Any]] = None):
+        self.columns = columns
+        self.features = features or {}
+        self.memo: Dict[str, Any] = {}
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv: List[List], features: Optional[Dict[str, Any]] = None) -> 'MarketSeries':
+        data = np.asarray([c[:6] for c in ohlcv], dtype=float).reshape(-1, 6)
+        data.setflags(write=False)
+        return cls({name: data[:, i] for i, name in enumerate(cls.COLUMNS)}, features)
+
+    def __len__(self) -> int:
+        return self.columns['close'].shape[-1]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
@@ -0,0 +1,133 @@
+"""
+Incremental JSON object parser for streamed model output
+Top-level fields of one JSON object are decoded as soon as their value is
+complete, so e.g. `action` and `confidence` are usable while `reasoning` is
+still arriving. Text before the opening brace (such as a code fence) is skipped.
+"""
+
+import json
+from typing import Any, Dict
+
+_WHITESPACE = ' \t\r\n'
+
+
+class StreamingJSONObject:
+    """Feed chunks of one JSON object; completed top-level fields appear in `fields`"""
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False  # Closing brace seen
+        self.failed = False  # Not a parseable object; callers fall back to the full text
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+        self._start = 0  # Index where the current key or value began
+        self._depth = 0  # Nesting inside an object/array value
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Consume a chunk and return the fields it completed"""
+        if not chunk or self.done or self.failed:
+            self.text += chunk or ""
+            return {}
+        self.text += chunk
+        completed: Dict[str, Any] = {}
+        try:
+            self._scan(completed)
+        except ValueError:
+            self.failed = True
+        self.fields.update(completed)
+        return completed
+
+    def _scan(self, completed: Dict[str, Any]):
+        text = self.text
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+            state = self._state
+
+            if state == 'start':
+                if c == '{':
+                    self._state = 'key'
+                i += 1
+
+            elif state == 'key':
+                if c == '"':
+                    self._state, self._start, self._escaped = 'key_string', i, False
+                elif c == '}':
+                    self.done = True
+                    break
+                elif c not in _WHITESPACE and c != ',':
+                    raise ValueError(f"Unexpected {c!r} before key")
+                i += 1
+
+            elif state == 'key_string':
+                if self._escaped:
+                    self._escaped = False
+                elif c == '\\':
+                    self._escaped = True
+                elif c == '"':
+                    self._key = json.loads(text[self._start:i + 1])
+                    self._state = 'colon'
+                i += 1
+
+            elif state == 'colon':
+                if c == ':':
+                    self._state = 'value'
+                elif c not in _WHITESPACE:
+                    raise ValueError(f"Expected ':' after key, got {c!r}")
+                i += 1
+
+            elif state == 'value':
+                if c in _WHITESPACE:
+                    i += 1
+                    continue
+                self._start = i
+                if c == '"':
+                    self._state, self._escaped = 'string', False
+                elif c in '{[':
+                    self._state, self._depth, self._in_string, self._escaped = 'container', 1, False, False
+                else:
+                    self._state = 'scalar'
+                i += 1
+
+            elif state == 'string':
+                if self._escaped:
+                    self._escaped = False
+                elif c == '\\':
+                    self._escaped = True
+                elif c == '"':
+                    completed[self._key] = json.loads(text[self._start:i + 1])
+                    self._state = 'key'
+                i += 1
+
+            elif state == 'container':
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif c == '\\':
+                        self._escaped = True
+                    elif c == '"':
+                        self._in_string = False
+                elif c == '"':
+                    self._in_string = True
+                elif c in '{[':
+                    self._depth += 1
+                elif c in '}]':
+                    self._depth -= 1
+                    if self._depth == 0:
+                        completed[self._key] = json.loads(text[self._start:i + 1])
+                        self._state = 'key'
+                i += 1
+
+            else:  # scalar: number, true, false or null, ended by a delimiter
+                if c in _WHITESPACE or c in ',}':
+                    completed[self._key] = json.loads(text[self._start:i])
+                    self._state = 'key'
+                    continue  # Re-read the delimiter in the 'key' state
+                i += 1
+
+        self._pos = i
@@ -0,0 +1,326 @@
+"""
+Local model tier in front of Gemini signal generation
+A multinomial logistic regression over the closed-bar feature snapshot,
+trained offline on logged Gemini decisions. Confident predictions are
+answered locally in microseconds; low-confidence predictions, and feature
+values far outside the training distribution (a regime shift), escalate to
+Gemini. Every Nth confident prediction is escalated anyway (shadow), so
+agreement with Gemini is also measured where the local tier answers.
+
+Training runs fully offline from a decision log, e.g. one written while
+replaying a cassette:
+    python -m engine.local_model train decisions.jsonl -o local_model.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURES = (
+    "rsi_14", "return_1", "return_5", "return_20", "volatility_20", "volume_z_20",
+    "price_vs_sma_20", "price_vs_ema_50", "position",
+)
+ACTIONS = ("BUY", "SELL", "HOLD")
+
+
+def feature_vector(
+    features: Mapping[str, Any],
+    exposure: Optional[Mapping[str, float]] = None,
+    names: Sequence[str] = FEATURES
+) -> List[float]:
+    """Model inputs from a feature snapshot, in the order of names; NaN marks a missing value"""
+    price = features.get("price")
+    sma_20 = features.get("sma_20")
+    ema_50 = features.get("ema_50")
+    derived = {
+        "price_vs_sma_20": price / sma_20 - 1 if price and sma_20 else None,
+        "price_vs_ema_50": price / ema_50 - 1 if price and ema_50 else None,
+        "position": (exposure or {}).get("position"),
+    }
+    values = []
+    for key in names:
+        value = derived[key] if key in derived else features.get(key)
+        values.append(math.nan if value is None else float(value))
+    return values
+
+
+@dataclass
+class LocalPrediction:
+    action: str
+    confidence: float
+    escalate: Optional[str] = None  # Reason to ask Gemini, None when answered locally
+    latency_us: float = 0.0
+
+
+class LogisticModel:
+    """Softmax regression on standardized features"""
+
+    def __init__(self, classes: Sequence[str], features: Sequence[str], mean: np.ndarray, std: np.ndarray,
+                 weights: np.ndarray, bias: np.ndarray, info: Optional[Dict] = None):
+        self.classes = list(classes)
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = np.asarray(bias, dtype=float)
+        unknown = [name for name in self.features if name not in FEATURES]
+        if unknown:
+            raise ValueError(f"model uses unknown features: {', '.join(unknown)}")
+        n = len(self.features)
+        if self.mean.shape != (n,) or self.std.shape != (n,) or self.weights.shape != (n, len(self.classes)) \
+                or self.bias.shape != (len(self.classes),):
+            raise ValueError(f"model arrays do not match its {n} features and {len(self.classes)} classes")
+        self.info = info or {}
+        # Plain lists for single predictions: faster than NumPy at this size
+        self._rows = list(zip(self.mean.tolist(), self.std.tolist(), self.weights.tolist()))
+        self._bias = self.bias.tolist()
+
+    def predict_one(self, x: Sequence[float]) -> Tuple[List[float], float]:
+        """Class probabilities for one feature vector (in self.features order), plus its largest |z-score|"""
+        logits = list(self._bias)
+        max_z = 0.0
+        for value, (mean, std, weights) in zip(x, self._rows):
+            if value != value:  # NaN: missing, at the training mean
+                continue
+            z = (value - mean) / std
+            if abs(z) > max_z:
+                max_z = abs(z)
+            for i, w in enumerate(weights):
+                logits[i] += z * w
+        top = max(logits)
+        exps = [math.exp(v - top) for v in logits]
+        total = sum(exps)
+        return [e / total for e in exps], max_z
+
+    def standardize(self, x: np.ndarray) -> np.ndarray:
+        z = (x - self.mean) / self.std
+        return np.where(np.isnan(z), 0.0, z)  # Missing values sit at the training mean
+
+    def probabilities(self, z: np.ndarray) -> np.ndarray:
+        logits = z @ self.weights + self.bias
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=-1, keepdims=True)
+
+    def to_dict(self) -> Dict:
+        return {
+            "classes": self.classes,
+            "features": self.features,
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+            "weights": self.weights.tolist(),
+            "bias": self.bias.tolist(),
+            "info": self.info,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LogisticModel':
+        return cls(data["classes"], data["features"], data["mean"], data["std"],
+                   data["weights"], data["bias"], data.get("info"))
+
+    def save(self, path: str):
+        Path(path).write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: str) -> 'LogisticModel':
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+
+def train_logistic(
+    x: np.ndarray,
+    labels: Sequence[str],
+    l2: float = 1e-3,
+    epochs: int = 500,
+    learning_rate: float = 0.5
+) -> LogisticModel:
+    """Full-batch gradient descent on the cross-entropy loss"""
+    classes = [a for a in ACTIONS if a in set(labels)]
+    y = np.zeros((len(labels), len(classes)))
+    y[np.arange(len(labels)), [classes.index(label) for label in labels]] = 1.0
+
+    mean = np.nanmean(x, axis=0)
+    std = np.nanstd(x, axis=0)
+    mean = np.where(np.isnan(mean), 0.0, mean)
+    std = np.where(np.isnan(std) | (std < 1e-12), 1.0, std)
+
+    model = LogisticModel(classes, FEATURES, mean, std,
+                          np.zeros((x.shape[1], len(classes))), np.zeros(len(classes)))
+    z = model.standardize(x)
+    for _ in range(epochs):
+        grad = (model.probabilities(z) - y) / len(z)
+        model.weights -= learning_rate * (z.T @ grad + l2 * model.weights)
+        model.bias -= learning_rate * grad.sum(axis=0)
+    # Rebuilt so predict_one's cached rows carry the trained weights
+    return LogisticModel(classes, FEATURES, mean, std, model.weights, model.bias)
+
+
+class DecisionLog:
+    """Append-only JSON lines of Gemini decisions with the features they were made on"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self.written = 0
+
+    def append(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        self.written += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def load_decisions(paths: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    rows, labels = [], []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                action = str(record.get("action", "")).upper()
+                if action not in ACTIONS:
+                    continue
+                rows.append(feature_vector(record.get("features") or {}, record.get("exposure")))
+                labels.append(action)
+    return np.asarray(rows, dtype=float).reshape(-1, len(FEATURES)), labels
+
+
+class LocalTier:
+    """Answers confident cases locally and tracks escalation rate and agreement with Gemini"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.enabled = bool(config.get('enabled', False))
+        self.min_confidence = float(config.get('min_confidence', 0.8))
+        self.regime_z = float(config.get('regime_z', 4.0))
+        self.shadow_every = int(config.get('shadow_every', 20))
+        self.model: Optional[LogisticModel] = None
+        model_path = config.get('model_path') or ''
+        if self.enabled and model_path:
+            try:
+                self.model = LogisticModel.load(model_path)
+                logger.info(f"Local model loaded from {model_path} ({self.model.info.get('samples', '?')} samples)")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Local model unavailable ({model_path}): {e}")
+        log_path = config.get('log_path') or ''
+        self.log: Optional[DecisionLog] = DecisionLog(log_path) if log_path else None
+
+        self.requests = 0
+        self.local = 0
+        self.escalations: Dict[str, int] = {}
+        self.compared = 0
+        self.agreed = 0
+        self.total_us = 0.0
+        self._confident = 0
+
+    def predict(self, features: Mapping[str, Any], exposure: Optional[Mapping[str, float]] = None) -> LocalPrediction:
+        start = time.perf_counter()
+        self.requests += 1
+        if self.model is None:
+            return self._escalate(LocalPrediction("HOLD", 0.0), "no_model")
+
+        p, max_z = self.model.predict_one(feature_vector(features, exposure, self.model.features))
+        best = p.index(max(p))
+        prediction = LocalPrediction(self.model.classes[best], p[best])
+        prediction.latency_us = (time.perf_counter() - start) * 1e6
+        self.total_us += prediction.latency_us
+
+        if max_z > self.regime_z:
+            return self._escalate(prediction, "regime_shift")
+        if prediction.confidence < self.min_confidence:
+            return self._escalate(prediction, "low_confidence")
+        self._confident += 1
+        if self.shadow_every and self._confident % self.shadow_every == 0:
+            return self._escalate(prediction, "shadow")
+        self.local += 1
+        return prediction
+
+    def _escalate(self, prediction: LocalPrediction, reason: str) -> LocalPrediction:
+        prediction.escalate = reason
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        return prediction
+
+    def observe(self, snapshot: Any, action: str, confidence: float, prediction: Optional[LocalPrediction]):
+        """Gemini's answer for an escalated request: agreement, plus a training record"""
+        if prediction is not None and prediction.escalate != "no_model":
+            self.compared += 1
+            self.agreed += prediction.action == action
+        if self.log is not None and snapshot is not None:
+            self.log.append({
+                "ts": time.time(),
+                "symbol": snapshot.symbol,
+                "bar": snapshot.bar_timestamp,
+                "features": dict(snapshot.features),
+                "exposure": dict(snapshot.exposure),
+                "action": action,
+                "confidence": confidence,
+            })
+
+    def flush(self):
+        if self.log is not None:
+            self.log.flush()
+
+    def stats(self) -> Dict:
+        escalated = sum(self.escalations.values())
+        return {
+            "enabled": self.enabled,
+            "model_loaded": self.model is not None,
+            "requests": self.requests,
+            "answered_locally": self.local,
+            "escalated": escalated,
+            "escalation_rate": escalated / self.requests if self.requests else 0.0,
+            "escalations": dict(self.escalations),
+            "agreement": self.agreed / self.compared if self.compared else None,
+            "compared": self.compared,
+            "avg_latency_us": self.total_us / max(self.requests - self.escalations.get("no_model", 0), 1),
+            "logged_decisions": self.log.written if self.log else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local signal model from Gemini decision logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train")
+    train.add_argument("logs", nargs="+", help="Decision logs (JSON lines)")
+    train.add_argument("-o", "--output", default="local_model.json")
+    train.add_argument("--l2", type=float, default=1e-3)
+    train.add_argument("--epochs", type=int, default=500)
+    train.add_argument("--holdout", type=float, default=0.2, help="Newest share of records kept for evaluation")
+    args = parser.parse_args()
+
+    x, labels = load_decisions(args.logs)
+    if not labels:
+        raise SystemExit("No decisions found")
+    split = max(1, int(len(labels) * (1 - args.holdout)))
+    model = train_logistic(x[:split], labels[:split], l2=args.l2, epochs=args.epochs)
+
+    def accuracy(rows: np.ndarray, expected: Sequence[str]) -> Optional[float]:
+        if not len(expected):
+            return None
+        predicted = model.probabilities(model.standardize(rows)).argmax(axis=1)
+        return float(np.mean([model.classes[i] == label for i, label in zip(predicted, expected)]))
+
+    model.info = {
+        "samples": split,
+        "trained_at": time.time(),
+        "train_accuracy": accuracy(x[:split], labels[:split]),
+        "holdout_accuracy": accuracy(x[split:], labels[split:]),
+        "class_counts": {a: labels.count(a) for a in ACTIONS},
+    }
+    model.save(args.output)
+    print(json.dumps({"output": args.output, **model.info}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Immutable per-symbol market snapshot shared by every skill evaluated on a bar
+"""
+
+import copy
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from engine.indicators import MarketSeries, rsi, sma, ema
+
+if TYPE_CHECKING:
+    from engine.features import FeatureSnapshot
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverse of _freeze, for JSON serialization"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _last(values: np.ndarray) -> Any:
+    if not len(values) or np.isnan(values[-1]):
+        return None
+    return float(values[-1])
+
+
+_INDICATOR_KEYS = ("rsi_14", "sma_20", "ema_50", "volume_sma_20", "price")
+
+
+def compute_indicators(series: MarketSeries) -> Dict[str, Any]:
+    """Standard indicator values on the latest bar"""
+    close = series.column('close')
+    return {
+        "rsi_14": _last(rsi(close, 14)),
+        "sma_20": _last(sma(close, 20)),
+        "ema_50": _last(ema(close, 50)),
+        "volume_sma_20": _last(sma(series.column('volume'), 20)),
+        "price": _last(close),
+    }
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """Candles, standard indicators and portfolio state captured once per symbol"""
+    symbol: str
+    candles: Tuple[Tuple[float, ...], ...]
+    portfolio: Mapping[str, Any]
+    indicators: Mapping[str, Any]
+    series: MarketSeries = field(repr=False, compare=False)
+    timestamp: float = 0.0
+    book: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    features: Optional['FeatureSnapshot'] = None
+
+    @classmethod
+    def build(
+        cls,
+        symbol: str,
+        ohlcv: List[List],
+        balance: float,
+        positions: Dict,
+        book: Optional[Mapping[str, float]] = None,
+        indicators: Optional[Dict[str, Any]] = None,
+        features: Optional['FeatureSnapshot'] = None
+    ) -> 'MarketSnapshot':
+        # Order-book features are shared read-only and double as rule variables
+        book = book if book is not None else MappingProxyType({})
+        series = MarketSeries.from_ohlcv(ohlcv or [], features=book)
+        if indicators is None and features is not None:
+            # Closed-bar indicators, computed once per bar by the feature pipeline
+            indicators = {key: features.features.get(key) for key in _INDICATOR_KEYS}
+        return cls(
+            symbol=symbol,
+            candles=tuple(tuple(c) for c in (ohlcv or [])),
+            portfolio=_freeze({"balance": balance, "positions": copy.deepcopy(positions)}),
+            indicators=MappingProxyType(indicators if indicators is not None else compute_indicators(series)),
+            series=series,
+            timestamp=datetime.now().timestamp(),
+            book=book,
+            features=features,
+        )
+
+    @property
+    def market_data(self) -> List[List]:
+        """Candles in the list-of-lists shape the exchange returns"""
+        return [list(c) for c in self.candles]
+
+    @property
+    def positions(self) -> Mapping[str, Any]:
+        return self.portfolio['positions']
+
+    def portfolio_state(self) -> Dict:
+        """Mutable copy of the portfolio part, for prompts and JSON"""
+        return _thaw(self.portfolio)
@@ -0,0 +1,344 @@
+"""
+Incremental L2 order books
+Snapshot-plus-delta maintenance into compact array-backed price levels, with
+sequence-gap detection, resync, and O(1) top-of-book / depth features
+
+The engine currently runs the books snapshot-only: OrderBookManager refreshes
+them from fetch_order_book when they go stale (ccxt's REST clients have no
+depth stream). apply_delta is the entry point for a streamed diff feed and is
+exercised by the tests; nothing in the engine calls it yet.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from types import MappingProxyType
+from typing import Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from utils.logger import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
+
+
+class _BookSide:
+    """Price levels for one side, best first
+
+    Prices are stored as sort keys (negated for bids) in a contiguous array of
+    doubles, so updates are a binary search plus a memmove and totals are kept
+    incrementally. Only max_levels are kept; once deeper levels have been cut
+    off, the side is `exhausted` when removals leave fewer than half of them,
+    since whatever sits behind the kept levels is unknown.
+    """
+
+    __slots__ = ('descending', 'max_levels', 'keys', 'sizes', 'total_size', 'total_notional', 'truncated')
+
+    def __init__(self, descending: bool, max_levels: int):
+        self.descending = descending
+        self.max_levels = max_levels
+        self.clear()
+
+    def clear(self):
+        self.keys = array('d')
+        self.sizes = array('d')
+        self.total_size = 0.0
+        self.total_notional = 0.0
+        self.truncated = False  # Levels beyond max_levels exist but are not tracked
+
+    def _price(self, key: float) -> float:
+        return -key if self.descending else key
+
+    def set(self, price: float, size: float):
+        """Insert, update or (size 0) remove a level"""
+        key = -price if self.descending else price
+        keys, sizes = self.keys, self.sizes
+        i = bisect_left(keys, key)
+
+        if i < len(keys) and keys[i] == key:
+            old = sizes[i]
+            if size > 0:
+                sizes[i] = size
+            else:
+                del keys[i]
+                del sizes[i]
+            self.total_size += size - old
+            self.total_notional += (size - old) * price
+            return
+
+        if size <= 0:
+            return
+        if i >= self.max_levels:
+            self.truncated = True
+            return
+
+        keys.insert(i, key)
+        sizes.insert(i, size)
+        self.total_size += size
+        self.total_notional += size * price
+
+        if len(keys) > self.max_levels:
+            # Keep only the tracked depth; the dropped level is the worst one
+            self.truncated = True
+            dropped_size = sizes.pop()
+            dropped_price = self._price(keys.pop())
+            self.total_size -= dropped_size
+            self.total_notional -= dropped_size * dropped_price
+
+    def load(self, levels: Sequence[Sequence[float]]):
+        self.clear()
+        for price, size, *_ in levels:
+            self.set(float(price), float(size))
+        # A snapshot cut at the tracked depth (the usual fetch_order_book limit) has more behind it
+        self.truncated = self.truncated or len(self.keys) >= self.max_levels
+
+    def exhausted(self) -> bool:
+        """Truncated depth used up by removals: the book needs a new snapshot"""
+        return self.truncated and len(self.keys) < max(1, self.max_levels // 2)
+
+    def best(self) -> Tuple[Optional[float], float]:
+        if not self.keys:
+            return None, 0.0
+        return self._price(self.keys[0]), self.sizes[0]
+
+    def levels(self, n: Optional[int] = None) -> List[List[float]]:
+        n = len(self.keys) if n is None else min(n, len(self.keys))
+        return [[self._price(self.keys[i]), self.sizes[i]] for i in range(n)]
+
+
+class L2OrderBook:
+    """One symbol's book, kept in sync from a snapshot and ordered deltas"""
+
+    def __init__(self, symbol: str, max_levels: int = 50, buffer_size: int = 1000):
+        self.symbol = symbol
+        self.bids = _BookSide(descending=True, max_levels=max_levels)
+        self.asks = _BookSide(descending=False, max_levels=max_levels)
+        self.sequence = -1
+        self.synced = False
+        self.updated_at = 0.0
+        self.gaps = 0
+        self.updates = 0
+        # Deltas that arrive while waiting for a snapshot
+        self._pending: Deque[Tuple] = deque(maxlen=buffer_size)
+        self._version = 0
+        self._features_version = -1
+        self._features: Mapping[str, float] = MappingProxyType({})
+
+    def apply_snapshot(self, bids: Sequence, asks: Sequence, sequence: int):
+        """Replace the book, then replay buffered deltas newer than the snapshot"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.sequence = sequence
+        self.synced = True
+        self._touch()
+
+        pending, self._pending = list(self._pending), deque(maxlen=self._pending.maxlen)
+        for i, delta in enumerate(pending):
+            if delta[2] > self.sequence and not self.apply_delta(*delta):
+                # Still a gap: keep the rest for the next snapshot
+                self._pending.extend(pending[i + 1:])
+                break
+
+    def apply_delta(
+        self,
+        bids: Sequence,
+        asks: Sequence,
+        sequence: int,
+        first_sequence: Optional[int] = None
+    ) -> bool:
+        """Apply level updates (size 0 removes a level)
+
+        `sequence` is the last update id covered by the delta and `first_sequence`
+        the first (defaults to `sequence`). Returns False when the book is out of
+        sync and needs a new snapshot.
+        """
+        if not self.synced:
+            self._pending.append((bids, asks, sequence, first_sequence))
+            return False
+
+        if sequence <= self.sequence:
+            return True  # Already covered by the snapshot or an earlier delta
+
+        first = sequence if first_sequence is None else first_sequence
+        if first > self.sequence + 1:
+            self.gaps += 1
+            self.synced = False
+            self._pending.append((bids, asks, sequence, first_sequence))
+            hot_path_logger.warning(
+                "Order book gap for %s: expected %s, got %s", self.symbol, self.sequence + 1, first
+            )
+            return False
+
+        for price, size, *_ in bids:
+            self.bids.set(float(price), float(size))
+        for price, size, *_ in asks:
+            self.asks.set(float(price), float(size))
+        self.sequence = sequence
+        self.updates += 1
+        self._touch()
+
+        bid, _ = self.bids.best()
+        ask, _ = self.asks.best()
+        if bid is not None and ask is not None and bid >= ask:
+            # A crossed book means a missed update
+            self.synced = False
+            return False
+        if self.bids.exhausted() or self.asks.exhausted():
+            # Removals used up the tracked depth; what lies behind it is unknown
+            self.synced = False
+            return False
+        return True
+
+    def _touch(self):
+        self._version += 1
+        self.updated_at = time.monotonic()
+
+    def top(self) -> Tuple[Optional[float], float, Optional[float], float]:
+        """(best bid, bid size, best ask, ask size)"""
+        bid, bid_size = self.bids.best()
+        ask, ask_size = self.asks.best()
+        return bid, bid_size, ask, ask_size
+
+    def features(self) -> Mapping[str, float]:
+        """Microstructure features from the top of book and running depth totals
+
+        Recomputed only after the book changed; the returned mapping is shared and read-only.
+        """
+        if self._features_version == self._version:
+            return self._features
+
+        bid, bid_size, ask, ask_size = self.top()
+        features: Dict[str, float] = {}
+        if bid is not None and ask is not None:
+            mid = (bid + ask) / 2
+            top_total = bid_size + ask_size
+            bid_depth, ask_depth = self.bids.total_size, self.asks.total_size
+            features = {
+                "best_bid": bid,
+                "best_ask": ask,
+                "mid": mid,
+                "spread": ask - bid,
+                "spread_bps": (ask - bid) / mid * 1e4 if mid else 0.0,
+                "microprice": (bid * ask_size + ask * bid_size) / top_total if top_total else mid,
+                "top_imbalance": (bid_size - ask_size) / top_total if top_total else 0.0,
+                "bid_depth": bid_depth,
+                "ask_depth": ask_depth,
+                "imbalance": (
+                    (bid_depth - ask_depth) / (bid_depth + ask_depth) if bid_depth + ask_depth else 0.0
+                ),
+                "bid_notional": self.bids.total_notional,
+                "ask_notional": self.asks.total_notional,
+            }
+
+        self._features = MappingProxyType(features)
+        self._features_version = self._version
+        return self._features
+
+    def to_dict(self, depth: int = 10) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "sequence": self.sequence,
+            "synced": self.synced,
+            "bids": self.bids.levels(depth),
+            "asks": self.asks.levels(depth),
+            "features": dict(self.features()),
+        }
+
+
+def format_book_features(features: Mapping[str, float]) -> str:
+    """One compact prompt line"""
+    if not features:
+        return ""
+    return (
+        f"book: bid={features['best_bid']:.2f} ask={features['best_ask']:.2f} "
+        f"spread_bps={features['spread_bps']:.2f} microprice={features['microprice']:.2f} "
+        f"imbalance={features['imbalance']:+.2f} top_imbalance={features['top_imbalance']:+.2f}"
+    )
+
+
+class OrderBookManager:
+    """Per-symbol books for an engine, resynced from the exchange's REST snapshot
+
+    Snapshot-only today: get_features re-fetches a book older than max_age_ms.
+    apply_delta is ready for a streamed feed and resyncs on gaps, crossed
+    books and exhausted depth.
+    """
+
+    def __init__(self, engine, config: Optional[dict] = None):
+        config = config or {}
+        self.engine = engine
+        self.enabled = bool(config.get('enabled', False))
+        self.max_levels = int(config.get('depth', 50))
+        # Polling mode: a snapshot older than this is refreshed on read
+        self.max_age = float(config.get('max_age_ms', 1000)) / 1000
+        self.books: Dict[str, L2OrderBook] = {}
+        self._resyncs: Dict[str, asyncio.Task] = {}
+        self.resync_count = 0
+
+    def book(self, symbol: str) -> L2OrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = L2OrderBook(symbol, self.max_levels)
+        return book
+
+    async def resync(self, symbol: str) -> Optional[L2OrderBook]:
+        """Load a fresh snapshot from the exchange"""
+        exchange = self.engine.exchange_for(symbol)
+        if exchange is None or not hasattr(exchange, 'fetch_order_book'):
+            return None
+        try:
+            snapshot = await exchange.fetch_order_book(symbol, self.max_levels)
+        except Exception as e:
+            hot_path_logger.error("Order book snapshot failed for %s: %s", symbol, e)
+            return None
+
+        book = self.book(symbol)
+        sequence = snapshot.get('nonce')
+        if sequence is None:
+            # No exchange sequence: treat every snapshot as the newest state
+            sequence = book.sequence + 1
+        book.apply_snapshot(snapshot.get('bids', []), snapshot.get('asks', []), sequence)
+        self.resync_count += 1
+        return book
+
+    def apply_delta(self, symbol: str, bids: Sequence, asks: Sequence,
+                    sequence: int, first_sequence: Optional[int] = None) -> bool:
+        """Feed a streamed delta; a gap schedules a background resync"""
+        book = self.book(symbol)
+        if book.apply_delta(bids, asks, sequence, first_sequence):
+            return True
+
+        task = self._resyncs.get(symbol)
+        if task is None or task.done():
+            try:
+                self._resyncs[symbol] = asyncio.get_running_loop().create_task(self.resync(symbol))
+            except RuntimeError:
+                pass  # No running loop; the next get_features call resyncs
+        return False
+
+    async def get_features(self, symbol: str) -> Optional[Mapping[str, float]]:
+        """Current features, refreshing a missing, stale or out-of-sync book"""
+        if not self.enabled:
+            return None
+
+        book = self.books.get(symbol)
+        if book is None or not book.synced or time.monotonic() - book.updated_at > self.max_age:
+            book = await self.resync(symbol)
+            if book is None:
+                return None
+        return book.features()
+
+    def stats(self) -> Dict:
+        return {
+            "books": len(self.books),
+            "resyncs": self.resync_count,
+            "gaps": sum(book.gaps for book in self.books.values()),
+            "out_of_sync": sum(1 for book in self.books.values() if not book.synced),
+        }
+
+    async def close(self):
+        for task in self._resyncs.values():
+            task.cancel()
+        self._resyncs.clear()
@@ -0,0 +1,301 @@
+"""
+Paper-trading matching engine
+Per-symbol limit order books with price-time priority, matched against candles and ticks
+"""
+
+import heapq
+import itertools
+import math
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class PaperOrder:
+    """A paper order and its fill progress"""
+    id: str
+    symbol: str
+    side: str
+    amount: float
+    price: Optional[float]
+    seq: int
+    timestamp: float  # Creation time (ms); market data from before it never fills the order
+    remaining: float = 0.0
+    filled: float = 0.0
+    cost: float = 0.0
+    fee: float = 0.0
+    status: str = "open"
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.cost / self.filled if self.filled else None
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['average'] = self.average
+        return data
+
+
+@dataclass
+class PaperFill:
+    """One execution against a paper order"""
+    order_id: str
+    symbol: str
+    side: str
+    amount: float
+    price: float
+    fee: float
+    remaining: float
+    status: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class PaperOrderBook:
+    """Resting limit orders for one symbol
+
+    Each side is a heap keyed by (price priority, arrival sequence); cancelled or
+    filled orders are dropped lazily when they surface at the top.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids: List[Tuple[float, int, PaperOrder]] = []  # (-price, seq, order)
+        self.asks: List[Tuple[float, int, PaperOrder]] = []  # (price, seq, order)
+        self.open_count = 0
+
+    def add(self, order: PaperOrder):
+        if order.side == 'buy':
+            heapq.heappush(self.bids, (-order.price, order.seq, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.seq, order))
+        self.open_count += 1
+
+    def _top(self, heap: List) -> Optional[PaperOrder]:
+        while heap and heap[0][2].status != "open":
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self) -> Optional[float]:
+        order = self._top(self.bids)
+        return order.price if order else None
+
+    def best_ask(self) -> Optional[float]:
+        order = self._top(self.asks)
+        return order.price if order else None
+
+    def crossing(self, price: float, touch: bool, traded_at: float = math.inf):
+        """Yield resting orders the trade price reaches, best price then earliest first
+
+        Orders created after `traded_at` (ms) are passed over: the print predates them.
+        """
+        for heap, side in ((self.bids, 'buy'), (self.asks, 'sell')):
+            skipped = []
+            try:
+                while True:
+                    order = self._top(heap)
+                    if order is None:
+                        break
+                    crossed = (
+                        (price < order.price or (touch and price == order.price)) if side == 'buy'
+                        else (price > order.price or (touch and price == order.price))
+                    )
+                    if not crossed:
+                        break
+                    if order.timestamp > traded_at:
+                        skipped.append(heapq.heappop(heap))
+                        continue
+                    yield order
+                    if order.status == "open":
+                        # Capacity ran out before the order filled completely
+                        break
+            finally:
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+
+
+class PaperTradingEngine:
+    """Simulated execution: market orders fill at the reference price, limit orders
+    rest in per-symbol books and fill as market data trades through them"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.maker_fee = float(config.get('maker_fee', 0.001))
+        self.taker_fee = float(config.get('taker_fee', 0.001))
+        self.slippage_bps = float(config.get('slippage_bps', 1.0))
+        # Fraction of each candle/tick volume resting orders may take (None = unlimited)
+        self.max_participation = config.get('max_participation', 1.0)
+        # Fill when price touches the limit, or only when it trades through
+        self.fill_on_touch = bool(config.get('fill_on_touch', True))
+
+        self.books: Dict[str, PaperOrderBook] = {}
+        self.orders: Dict[str, PaperOrder] = {}
+        self._seq = itertools.count(1)
+        # (symbol, timeframe) -> (ts, high, low, volume) of the last candle seen, which may
+        # still be forming. Each timeframe has its own cursor: a 1h fetch must not rewind the 5m one
+        self._feed: Dict[Tuple[str, Optional[str]], Tuple[float, float, float, float]] = {}
+        self.fills_count = 0
+        self.ticks_processed = 0
+
+    def _book(self, symbol: str) -> PaperOrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = PaperOrderBook(symbol)
+        return book
+
+    # === Orders ===
+
+    def submit(
+        self,
+        symbol: str,
+        side: str,
+        amount: float,
+        price: Optional[float],
+        reference_price: float,
+        timestamp: float = 0.0
+    ) -> Tuple[PaperOrder, List[PaperFill]]:
+        """Place an order; marketable orders fill immediately as taker, the rest rest in the book"""
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Invalid side: {side}")
+        if amount <= 0:
+            raise ValueError("Order amount must be positive")
+
+        seq = next(self._seq)
+        order = PaperOrder(f"paper_{seq}", symbol, side, amount, price, seq, timestamp, remaining=amount)
+        self.orders[order.id] = order
+        fills: List[PaperFill] = []
+
+        marketable = price is None or (
+            price >= reference_price if side == 'buy' else price <= reference_price
+        )
+        if marketable:
+            slip = self.slippage_bps / 1e4
+            fill_price = reference_price * (1 + slip) if side == 'buy' else reference_price * (1 - slip)
+            if price is not None:
+                fill_price = min(fill_price, price) if side == 'buy' else max(fill_price, price)
+            fills.append(self._fill(order, order.remaining, fill_price, self.taker_fee))
+        else:
+            self._book(symbol).add(order)
+
+        return order, fills
+
+    def cancel(self, order_id: str) -> Optional[PaperOrder]:
+        order = self.orders.get(order_id)
+        if order is None or order.status != "open":
+            return None
+        order.status = "canceled"
+        self.orders.pop(order_id)
+        self.books[order.symbol].open_count -= 1
+        return order
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[PaperOrder]:
+        return [
+            o for o in self.orders.values()
+            if o.status == "open" and (symbol is None or o.symbol == symbol)
+        ]
+
+    def _fill(self, order: PaperOrder, amount: float, price: float, fee_rate: float) -> PaperFill:
+        fee = amount * price * fee_rate
+        order.filled += amount
+        order.remaining -= amount
+        order.cost += amount * price
+        order.fee += fee
+        if order.remaining <= 1e-12:
+            order.remaining = 0.0
+            order.status = "closed"
+            # Completed orders are not kept; the fill carries the final state
+            self.orders.pop(order.id, None)
+        self.fills_count += 1
+        return PaperFill(order.id, order.symbol, order.side, amount, price, fee, order.remaining, order.status)
+
+    # === Market data ===
+
+    def on_tick(self, symbol: str, price: float, volume: Optional[float] = None) -> List[PaperFill]:
+        """Match resting orders against one trade print"""
+        capacity = math.inf
+        if volume is not None and self.max_participation is not None:
+            capacity = volume * self.max_participation
+        fills, _ = self._match(symbol, price, capacity)
+        return fills
+
+    def on_candles(self, symbol: str, candles: List[List], timeframe: Optional[str] = None) -> List[PaperFill]:
+        """Match resting orders against OHLCV bars not seen before on this timeframe
+
+        Closed bars are replayed as the path open -> nearer extreme -> farther extreme -> close.
+        The last bar may still be forming, so only its movement since the previous call counts.
+        A bar only fills orders created at or before its open time, except for the last close,
+        which is the current price.
+        """
+        if not candles:
+            return []
+
+        book = self.books.get(symbol)
+        key = (symbol, timeframe)
+        state = self._feed.get(key)
+        last = candles[-1]
+        self._feed[key] = (last[0], last[2], last[3], last[5])
+        if state is None or book is None or not book.open_count:
+            return []
+
+        fills: List[PaperFill] = []
+        for candle in candles:
+            ts, open_p, high, low, close, volume = candle[:6]
+            if ts < state[0]:
+                continue
+            if ts == state[0]:
+                # Same (previously forming) bar: only new extremes and the latest close
+                path = []
+                if high > state[1]:
+                    path.append(high)
+                if low < state[2]:
+                    path.append(low)
+                path.append(close)
+                volume = max(volume - state[3], 0.0)
+            elif abs(open_p - low) <= abs(high - open_p):
+                path = [open_p, low, high, close]
+            else:
+                path = [open_p, high, low, close]
+
+            capacity = math.inf
+            if self.max_participation is not None:
+                capacity = volume * self.max_participation
+            for i, price in enumerate(path):
+                current = candle is last and i == len(path) - 1
+                new_fills, capacity = self._match(symbol, price, capacity, math.inf if current else ts)
+                fills.extend(new_fills)
+                if capacity <= 0:
+                    break
+        return fills
+
+    def _match(
+        self,
+        symbol: str,
+        price: float,
+        capacity: float,
+        traded_at: float = math.inf
+    ) -> Tuple[List[PaperFill], float]:
+        self.ticks_processed += 1
+        book = self.books.get(symbol)
+        if book is None or not book.open_count:
+            return [], capacity
+
+        fills = []
+        for order in book.crossing(price, self.fill_on_touch, traded_at):
+            if capacity <= 0:
+                break
+            amount = min(order.remaining, capacity)
+            capacity -= amount
+            # Resting orders execute at their own limit price
+            fill = self._fill(order, amount, order.price, self.maker_fee)
+            if fill.status == "closed":
+                book.open_count -= 1
+            fills.append(fill)
+        return fills, capacity
+
+    def stats(self) -> Dict:
+        return {
+            "open_orders": sum(book.open_count for book in self.books.values()),
+            "fills": self.fills_count,
+            "ticks_processed": self.ticks_processed,
+        }
@@ -0,0 +1,249 @@
+"""
+Monte Carlo position sizing
+Forward price paths are bootstrapped from the recent closed-bar log returns,
+vectorized over all paths at once. Each path exits at the first close through
+the stop (filled at that close, so gaps are paid in full), at the take profit,
+or at the horizon. The per-unit return distribution then gives the stop / take
+probabilities, the tail loss and a fractional Kelly size. Sizes are notional
+as a share of equity. Kelly is first capped by the per-trade risk budget (over
+the tail loss and over the simulated loss at the stop, gaps and fees included)
+and then by the exposure room left under the gross and per-asset limits.
+
+Resampled history has next to no drift, so on its own it sees no edge in any
+trade once fees are paid. How the signal's confidence enters is set by
+`confidence_weighting`:
+  "odds"  - the paths are reweighted by exit class so that take-profit exits
+            have probability min(confidence, max_take_odds) and stop and
+            timeout exits share the rest in their simulated proportions: the
+            simulation supplies the payoff shape, the signal the odds. The
+            model's confidence then drives the Kelly size, so max_take_odds
+            bounds how much edge it can claim.
+  "scale" - Kelly comes from the unweighted paths and is multiplied by the
+            confidence; the model can shrink a size but never create an edge.
+  "off"   - confidence is ignored.
+The tail loss (CVaR) is always taken from the unweighted paths, and the risk
+caps below apply in every mode.
+
+Paths for a symbol depend only on its closed bars, so they are simulated once
+per new bar and reused for every signal (and every stop / take pair) until
+the next one closes. Resample indices are drawn once per sizer, so successive
+bars are compared on common random numbers.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class SizingResult:
+    amount_pct: float  # Position notional as a share of equity
+    binding: str  # Limit that set the size: kelly, cvar, stop, exposure or no_edge
+    p_win: float  # Share of simulated paths with a positive return, before reweighting
+    loss_at_stop: float  # Mean per-unit loss of the paths that exit at the stop, fees included
+    p_stop: float
+    p_take: float
+    p_timeout: float
+    expected_return: float  # Mean per-unit return after fees, as weighted for Kelly
+    take_odds: float  # P(take) behind expected_return: the capped confidence in "odds" mode
+    var: float  # Per-unit loss quantile at cvar_alpha
+    cvar: float  # Mean per-unit loss beyond var
+    loss_at_size: float  # cvar * amount_pct: expected tail loss as a share of equity
+    stop_loss: float
+    take_profit: float
+    paths: int
+    horizon: int
+    elapsed_ms: float
+
+    def to_dict(self) -> Dict:
+        return {key: round(value, 6) if isinstance(value, float) else value
+                for key, value in asdict(self).items()}
+
+
+class PositionSizer:
+    """Sizes BUY / SELL signals from simulated forward paths under the risk limits"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.enabled = bool(config.get('enabled', True))
+        self.paths = max(100, int(config.get('paths', 20000)))
+        self.horizon = max(1, int(config.get('horizon_bars', 32)))
+        self.lookback = max(10, int(config.get('lookback_bars', 256)))
+        self.kelly_fraction = float(config.get('kelly_fraction', 0.5))
+        self.cvar_alpha = float(config.get('cvar_alpha', 0.95))
+        self.fee = float(config.get('round_trip_fee', 0.002))
+        self.default_stop_pct = float(config.get('default_stop_pct', 0.02))
+        self.default_take_pct = float(config.get('default_take_pct', 0.04))
+        self.confidence_weighting = config.get('confidence_weighting', 'odds')
+        if self.confidence_weighting not in ('odds', 'scale', 'off'):
+            raise ValueError(f"Unknown confidence_weighting: {self.confidence_weighting}")
+        self.max_take_odds = float(config.get('max_take_odds', 0.6))
+        self.max_cached = max(1, int(config.get('max_cached_symbols', 8)))
+
+        self.max_risk_per_trade = float(config.get('max_risk_per_trade', 0.02))
+        self.max_gross_exposure = float(config.get('max_gross_exposure', 1.0))
+        self.max_asset_exposure = float(config.get('max_asset_exposure', 0.5))
+
+        rng = np.random.default_rng(config.get('seed'))
+        # Bars along axis 0: every step is one contiguous add across all paths
+        self._index = rng.integers(0, self.lookback, (self.horizon, self.paths))
+        self._columns = np.arange(self.paths)
+        self._cache: "OrderedDict[str, Tuple[tuple, np.ndarray]]" = OrderedDict()
+
+        self.calls = 0
+        self.simulated = 0
+        self.total_ms = 0.0
+
+    def simulate(self, symbol: str, closes: List[float], key: tuple) -> Optional[np.ndarray]:
+        """Cumulative log returns (horizon x paths) for the symbol, reused while key is unchanged"""
+        cached = self._cache.get(symbol)
+        if cached is not None and cached[0] == key:
+            self._cache.move_to_end(symbol)
+            return cached[1]
+
+        prices = np.asarray(closes[-(self.lookback + 1):], dtype=np.float64)
+        prices = prices[prices > 0]
+        if len(prices) < 11:
+            return None
+        returns = np.diff(np.log(prices)).astype(np.float32)
+        index = self._index if len(returns) == self.lookback else self._index % len(returns)
+
+        paths = np.take(returns, index)
+        for t in range(1, self.horizon):
+            np.add(paths[t - 1], paths[t], out=paths[t])
+
+        self._cache[symbol] = (key, paths)
+        self._cache.move_to_end(symbol)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        self.simulated += 1
+        return paths
+
+    def size(
+        self,
+        symbol: str,
+        action: str,
+        ohlcv: List[List],
+        entry: Optional[float] = None,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        exposure: Optional[Mapping[str, float]] = None,
+        confidence: Optional[float] = None
+    ) -> Optional[SizingResult]:
+        """Size a BUY / SELL on the symbol's candles (the last one still forming); None if it cannot be sized"""
+        start = time.perf_counter()
+        side = 1.0 if action == 'BUY' else -1.0 if action == 'SELL' else 0.0
+        closed = ohlcv[:-1]
+        if not side or len(closed) < 11:
+            return None
+        entry = entry or closed[-1][4]
+        if not entry or entry <= 0:
+            return None
+
+        # A stop or target on the wrong side of the entry is replaced by the default distance
+        if not stop_loss or (stop_loss - entry) * side >= 0:
+            stop_loss = entry * (1 - side * self.default_stop_pct)
+        if not take_profit or (take_profit - entry) * side <= 0:
+            take_profit = entry * (1 + side * self.default_take_pct)
+        stop_loss, take_profit = float(stop_loss), float(take_profit)
+
+        key = (closed[-1][0], len(closed))
+        paths = self.simulate(symbol, [c[4] for c in closed[-(self.lookback + 1):]], key)
+        if paths is None:
+            return None
+
+        # Per-unit outcome of every path, in price terms relative to the entry
+        lower = math.log(min(stop_loss, take_profit) / entry)
+        upper = math.log(max(stop_loss, take_profit) / entry)
+        crossed = (paths <= lower) | (paths >= upper)
+        first = crossed.argmax(axis=0)
+        exited = crossed[first, self._columns]
+        log_exit = np.where(exited, paths[first, self._columns], paths[-1])
+        hit_upper = exited & (log_exit >= upper)
+        hit_lower = exited & ~hit_upper
+        hit_take, hit_stop = (hit_upper, hit_lower) if side > 0 else (hit_lower, hit_upper)
+
+        returns = side * np.expm1(log_exit.astype(np.float64))
+        returns[hit_take] = side * (take_profit / entry - 1)  # Limit order: filled at the target
+        returns -= self.fee
+
+        losses = -returns
+        k = min(int(self.cvar_alpha * len(losses)), len(losses) - 1)
+        tail = np.partition(losses, k)[k:]
+        var = float(tail[0])
+        cvar = float(tail.mean())
+        p_win = float((returns > 0).mean())
+        squares = returns * returns
+        n_take = int(hit_take.sum())
+        n_other = len(returns) - n_take
+        take_odds = n_take / len(returns)
+        mean = float(returns.mean())
+        second_moment = float(squares.mean())
+        scale = 1.0  # Confidence as a multiplier on Kelly ("scale" mode)
+        if confidence is not None and self.confidence_weighting == 'scale':
+            scale = min(max(float(confidence), 0.0), 1.0)
+        elif confidence is not None and self.confidence_weighting == 'odds' \
+                and 0 < confidence < 1 and n_take and n_other:
+            # Take-profit exits carry the capped confidence; stops and timeouts share the rest
+            take_odds = min(float(confidence), self.max_take_odds)
+            weights = np.where(hit_take, take_odds / n_take, (1 - take_odds) / n_other)
+            mean = float(weights @ returns)
+            second_moment = float(weights @ squares)
+
+        # Loss per unit when the stop is hit: the fill is at the crossing close, so gaps count
+        stop_distance = abs(entry - stop_loss) / entry + self.fee
+        loss_at_stop = max(stop_distance, float(losses[hit_stop].mean())) if hit_stop.any() else stop_distance
+
+        # Candidate sizes as a share of equity. Kelly is held to the per-trade risk
+        # budget first (tail and stop), then to the exposure room; the smallest binds
+        position = float((exposure or {}).get('position', 0.0))
+        gross = float((exposure or {}).get('gross', 0.0))
+        candidates = {
+            "kelly": scale * self.kelly_fraction * mean / second_moment if second_moment > 0 else 0.0,
+            "cvar": self.max_risk_per_trade / cvar if cvar > 0 else math.inf,
+            "stop": self.max_risk_per_trade / loss_at_stop,
+        }
+        binding = min(candidates, key=candidates.get)
+        amount = candidates[binding]
+        room = min(self.max_asset_exposure - side * position, self.max_gross_exposure - gross)
+        if room < amount:
+            binding, amount = "exposure", room
+        amount = max(0.0, amount)
+        if mean <= 0:
+            binding = "no_edge"
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        return SizingResult(
+            amount_pct=round(amount, 4),
+            binding=binding,
+            p_win=p_win,
+            loss_at_stop=loss_at_stop,
+            p_stop=float(hit_stop.mean()),
+            p_take=float(hit_take.mean()),
+            p_timeout=float(1.0 - exited.mean()),
+            expected_return=mean,
+            take_odds=take_odds,
+            var=var,
+            cvar=cvar,
+            loss_at_size=cvar * amount,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            paths=self.paths,
+            horizon=self.horizon,
+            elapsed_ms=elapsed_ms,
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "simulated": self.simulated,
+            "reused": self.calls - self.simulated,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+        }
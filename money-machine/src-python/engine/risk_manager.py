@@ -0,0 +1,185 @@
+"""
+Pre-trade risk gate with incrementally maintained exposure aggregates
+Every check is O(1): nothing iterates over positions or orders on the order path
+"""
+
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+@dataclass
+class RiskCheck:
+    """Result of a pre-trade check"""
+    approved: bool
+    reason: str = ""
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _base_asset(symbol: str) -> str:
+    return symbol.split('/')[0]
+
+
+class RiskManager:
+    """Tracks exposure, open orders and daily loss, and gates new orders against limits"""
+
+    def __init__(self, config: dict, equity: float):
+        self.max_risk_per_trade = float(config.get('max_risk_per_trade', 0.02))
+        self.max_daily_loss = float(config.get('max_daily_loss', 0.05))
+        self.max_open_positions = int(config.get('max_open_positions', 10))
+        self.max_gross_exposure = float(config.get('max_gross_exposure', 1.0))
+        self.max_asset_exposure = float(config.get('max_asset_exposure', 0.5))
+
+        # Per-symbol state
+        self.position_amount: Dict[str, float] = {}
+        self.mark_price: Dict[str, float] = {}
+        self.symbol_notional: Dict[str, float] = {}  # signed amount * mark
+
+        # Running aggregates
+        self.asset_net: Dict[str, float] = {}
+        self.asset_gross: Dict[str, float] = {}
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.open_positions = 0
+        self.open_orders: Dict[str, float] = {}
+        self.open_order_notional = 0.0
+        self.version = 0  # Bumped whenever anything in snapshot() changes
+
+        self._day = self._utc_day()
+        self.day_start_equity = equity
+        self.daily_realized_pnl = 0.0
+
+    @staticmethod
+    def _utc_day() -> int:
+        return datetime.now(timezone.utc).toordinal()
+
+    def _roll_day(self, equity: float):
+        today = self._utc_day()
+        if today != self._day:
+            self._day = today
+            self.day_start_equity = equity
+            self.daily_realized_pnl = 0.0
+            self.version += 1
+
+    def check_order(
+        self,
+        symbol: str,
+        side: str,
+        amount: float,
+        price: Optional[float],
+        equity: float,
+        stop_loss: Optional[float] = None
+    ) -> RiskCheck:
+        """Validate an order against per-trade, exposure, position-count and daily-loss limits"""
+        self._roll_day(equity)
+
+        if not amount or amount <= 0:
+            return RiskCheck(False, "Order amount must be positive")
+        if not price or price <= 0:
+            return RiskCheck(False, f"No reference price for {symbol}")
+
+        signed = amount if side == 'buy' else -amount
+        current = self.position_amount.get(symbol, 0.0)
+
+        # Orders that only shrink an existing position are always allowed
+        if current and signed * current < 0 and amount <= abs(current):
+            return RiskCheck(True, "Reduces existing position")
+
+        if -self.daily_realized_pnl >= self.max_daily_loss * self.day_start_equity:
+            return RiskCheck(False, f"Daily loss limit reached ({self.daily_realized_pnl:.2f})")
+
+        notional = amount * price
+        risk_amount = amount * abs(price - stop_loss) if stop_loss else notional
+        if risk_amount > self.max_risk_per_trade * equity:
+            return RiskCheck(
+                False,
+                f"Trade risk {risk_amount:.2f} exceeds {self.max_risk_per_trade:.1%} of equity"
+            )
+
+        if not current and self.open_positions >= self.max_open_positions:
+            return RiskCheck(False, f"Max open positions reached ({self.max_open_positions})")
+
+        # Exposure after the order, valued at the order price
+        old_notional = self.symbol_notional.get(symbol, 0.0)
+        new_notional = (current + signed) * price
+        gross_after = (
+            self.gross_exposure - abs(old_notional) + abs(new_notional) + self.open_order_notional
+        )
+        if gross_after > self.max_gross_exposure * equity:
+            return RiskCheck(False, f"Gross exposure {gross_after:.2f} would exceed limit")
+
+        asset = _base_asset(symbol)
+        asset_after = abs(self.asset_net.get(asset, 0.0) - old_notional + new_notional)
+        if asset_after > self.max_asset_exposure * equity:
+            return RiskCheck(False, f"{asset} exposure {asset_after:.2f} would exceed limit")
+
+        return RiskCheck(True)
+
+    def on_fill(self, symbol: str, new_position_amount: float, price: float, realized_pnl: float = 0.0):
+        """Apply a fill: the resulting position, fill price and realized PnL"""
+        self.daily_realized_pnl += realized_pnl
+        self.version += 1
+
+        old_amount = self.position_amount.get(symbol, 0.0)
+        if not old_amount and new_position_amount:
+            self.open_positions += 1
+        elif old_amount and not new_position_amount:
+            self.open_positions -= 1
+
+        if new_position_amount:
+            self.position_amount[symbol] = new_position_amount
+        else:
+            self.position_amount.pop(symbol, None)
+
+        self.mark(symbol, price)
+
+    def mark(self, symbol: str, price: float):
+        """Revalue a symbol's exposure at a new price"""
+        if not price:
+            return
+        self.mark_price[symbol] = price
+
+        old_notional = self.symbol_notional.get(symbol, 0.0)
+        new_notional = self.position_amount.get(symbol, 0.0) * price
+        if old_notional == new_notional:
+            return
+        self.version += 1
+
+        self.gross_exposure += abs(new_notional) - abs(old_notional)
+        self.net_exposure += new_notional - old_notional
+
+        asset = _base_asset(symbol)
+        self.asset_net[asset] = self.asset_net.get(asset, 0.0) + new_notional - old_notional
+        self.asset_gross[asset] = self.asset_gross.get(asset, 0.0) + abs(new_notional) - abs(old_notional)
+
+        if new_notional:
+            self.symbol_notional[symbol] = new_notional
+        else:
+            self.symbol_notional.pop(symbol, None)
+
+    def on_order_open(self, order_id: str, notional: float):
+        """Track notional of a resting order"""
+        self.on_order_closed(order_id)
+        self.open_orders[order_id] = notional
+        self.open_order_notional += notional
+        self.version += 1
+
+    def on_order_closed(self, order_id: str):
+        """Release notional of an order that filled or was cancelled"""
+        notional = self.open_orders.pop(order_id, None)
+        if notional is not None:
+            self.open_order_notional -= notional
+            self.version += 1
+
+    def snapshot(self) -> Dict:
+        """Current aggregates for status reporting"""
+        return {
+            "gross_exposure": self.gross_exposure,
+            "net_exposure": self.net_exposure,
+            "open_positions": self.open_positions,
+            "open_order_notional": self.open_order_notional,
+            "daily_realized_pnl": self.daily_realized_pnl,
+            "asset_net_exposure": dict(self.asset_net),
+        }
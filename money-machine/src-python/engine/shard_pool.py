@@ -0,0 +1,325 @@
+"""
+Sharded per-symbol analytics workers
+Symbols are pinned to worker processes that own their candle stores, indicator
+state, compact prompt context and compiled skill rules. The main process keeps
+IPC, exchange I/O and order routing, and exchanges small messages over pipes
+(only candles a worker has not seen are sent).
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.executors import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+# === Worker process ===
+
+def _merge_candles(store: List[List], candles: List[List], max_candles: int):
+    """Append new bars and replace the still-forming last bar in place"""
+    for candle in candles:
+        if store and candle[0] == store[-1][0]:
+            store[-1] = candle
+        elif not store or candle[0] > store[-1][0]:
+            store.append(candle)
+    if len(store) > max_candles:
+        del store[:len(store) - max_candles]
+
+
+def _worker_main(conn, max_candles: int, token_budget: int):
+    """Serve requests until told to stop; runs in the worker process"""
+    # Imported here so the parent does not pay for numpy work it delegates
+    from engine.indicators import MarketSeries
+    from engine.market_snapshot import compute_indicators
+    from engine.signal_generator import MarketContext
+    from skills.rule_engine import CompiledRules
+
+    logging.disable(logging.INFO)
+    candles: Dict[str, List[List]] = {}
+    context = MarketContext(max_candles=max_candles, token_budget=token_budget)
+    rules: Dict[str, Any] = {}
+
+    def analyze(item: Dict) -> Dict:
+        symbol = item['symbol']
+        if item.get('reset'):
+            candles.pop(symbol, None)
+        store = candles.setdefault(symbol, [])
+        _merge_candles(store, item['candles'], max_candles)
+
+        series = MarketSeries.from_ohlcv(store, features=item.get('features') or {})
+        result = {"indicators": compute_indicators(series), "decisions": {}, "context": None}
+        if item.get('context'):
+            context.add_market_data(symbol, store)
+            result['context'] = context.get_compact_context(symbol)
+
+        for name in item.get('skills', ()):
+            compiled = rules.get(name)
+            if compiled is None:
+                continue
+            try:
+                result['decisions'][name] = compiled.evaluate(
+                    series,
+                    position_amount=item.get('position_amount', 0.0),
+                    open_positions=item.get('open_positions', 0),
+                    entry_price=item.get('entry_price')
+                )
+            except Exception as e:
+                result['decisions'][name] = {"error": str(e), "decision": "HOLD"}
+        return result
+
+    while True:
+        try:
+            op, request_id, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if op == 'stop':
+            break
+        try:
+            if op == 'rules':
+                rules = {name: CompiledRules(spec) for name, spec in payload.items()}
+                reply = len(rules)
+            elif op == 'analyze':
+                reply = [analyze(item) for item in payload]
+            elif op == 'ping':
+                reply = payload
+            else:
+                raise ValueError(f"Unknown shard op: {op}")
+            conn.send((request_id, True, reply))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+# === Main-process side ===
+
+class _Shard:
+    """One worker process, its pipe and the reader thread resolving replies"""
+
+    def __init__(self, index: int, ctx, max_candles: int, token_budget: int):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, max_candles, token_budget),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()  # Pipe writes from pool threads must not interleave
+        self.alive = True
+        self.requests = 0
+        self.busy_seconds = 0.0
+        self.reader = threading.Thread(target=self._read_loop, name=f"shard-{index}-reader", daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        while True:
+            try:
+                request_id, ok, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                entry = self.pending.pop(request_id, None)
+            if entry is not None:
+                loop, future = entry
+                loop.call_soon_threadsafe(_resolve, future, ok, payload)
+
+        # Worker gone: fail whatever is still waiting
+        self.alive = False
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for loop, future in pending.values():
+            loop.call_soon_threadsafe(_resolve, future, False, f"shard {self.index} exited")
+
+    def send(self, message: Tuple):
+        """Blocking pipe write; called from an I/O pool thread"""
+        with self.send_lock:
+            self.conn.send(message)
+
+    def stop(self, timeout: float = 2.0):
+        try:
+            self.send(('stop', 0, None))
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+def _resolve(future: asyncio.Future, ok: bool, payload: Any):
+    if future.done():
+        return
+    if ok:
+        future.set_result(payload)
+    else:
+        future.set_exception(RuntimeError(payload))
+
+
+class ShardPool:
+    """Fixed pool of analytics workers; each symbol always goes to the same worker"""
+
+    def __init__(self, workers: int, max_candles: int = 100, token_budget: int = 120):
+        self.workers = max(1, int(workers))
+        self.max_candles = max_candles
+        self.token_budget = token_budget
+        # spawn: no inherited event loop, sockets or threads from the parent
+        self._ctx = multiprocessing.get_context('spawn')
+        self._shards: List[Optional[_Shard]] = [None] * self.workers
+        self._ids = itertools.count(1)
+        self._sent_ts: Dict[str, float] = {}  # symbol -> newest candle timestamp the worker has
+        self._rules_signature: List[Optional[frozenset]] = [None] * self.workers
+        self.restarts = 0
+
+    def start(self):
+        for i in range(self.workers):
+            self._spawn(i)
+        logger.info(f"Started {self.workers} analytics shard worker(s)")
+
+    def _spawn(self, index: int):
+        self._shards[index] = _Shard(index, self._ctx, self.max_candles, self.token_budget)
+        self._rules_signature[index] = None
+        # The new worker has no candles: resend full history for its symbols
+        for symbol in [s for s in self._sent_ts if self.shard_for(s) == index]:
+            del self._sent_ts[symbol]
+
+    def shard_for(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode()) % self.workers
+
+    def _live_shard(self, index: int) -> _Shard:
+        shard = self._shards[index]
+        if shard is None or not shard.alive or not shard.process.is_alive():
+            if shard is not None:
+                logger.warning(f"Shard {index} died; restarting")
+                self.restarts += 1
+                shard.stop(timeout=0)
+            self._spawn(index)
+            shard = self._shards[index]
+        return shard
+
+    async def _request(self, index: int, op: str, payload: Any) -> Any:
+        shard = self._live_shard(index)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        with shard.lock:
+            shard.pending[request_id] = (loop, future)
+        start = time.perf_counter()
+        try:
+            # Pickling and writing a large batch would block the loop until the worker drains the pipe
+            await run_blocking('io', shard.send, (op, request_id, payload))
+        except BaseException:
+            with shard.lock:
+                shard.pending.pop(request_id, None)
+            # The reader may already have failed it (worker exited); the send error wins
+            if future.done() and not future.cancelled():
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        try:
+            return await future
+        finally:
+            shard.requests += 1
+            shard.busy_seconds += time.perf_counter() - start
+
+    async def ensure_rules(self, specs: Dict[str, Tuple[str, Dict]]) -> Dict[int, Exception]:
+        """Push {skill name: (content hash, rules spec)} to workers whose copy is stale
+
+        Returns the workers the push failed on, with the error.
+        """
+        signature = frozenset((name, content_hash) for name, (content_hash, _) in specs.items())
+        payload = {name: spec for name, (_, spec) in specs.items()}
+        stale = [i for i in range(self.workers) if self._rules_signature[i] != signature
+                 or self._shards[i] is None or not self._shards[i].alive]
+        replies = await asyncio.gather(*(self._request(i, 'rules', payload) for i in stale), return_exceptions=True)
+        failed = {}
+        for i, reply in zip(stale, replies):
+            if isinstance(reply, Exception):
+                self._rules_signature[i] = None
+                failed[i] = reply
+            else:
+                self._rules_signature[i] = signature
+        return failed
+
+    async def analyze(self, items: List[Dict], rules: Optional[Dict[str, Tuple[str, Dict]]] = None) -> List[Dict]:
+        """Indicators, compact context and rule decisions per item, computed in parallel
+
+        Each item: symbol, ohlcv, skills (rule skill names), position_amount,
+        entry_price, open_positions, features, context (bool). `rules` is passed to ensure_rules.
+        Items whose worker failed get {"error": ..., "indicators": None,
+        "decisions": {}, "context": None}; the other items are unaffected.
+        """
+        # Restart dead workers first, so their symbols get full history below
+        for index in {self.shard_for(item['symbol']) for item in items}:
+            self._live_shard(index)
+        failed = await self.ensure_rules(rules) if rules is not None else {}
+
+        batches: Dict[int, List[Tuple[int, Dict]]] = {}
+        for position, item in enumerate(items):
+            symbol = item['symbol']
+            ohlcv = item.get('ohlcv') or []
+            last_sent = self._sent_ts.get(symbol)
+            message = {k: v for k, v in item.items() if k != 'ohlcv'}
+            if last_sent is None:
+                message['candles'] = ohlcv
+                message['reset'] = True
+            else:
+                # The worker keeps history; send the forming bar and anything newer
+                message['candles'] = [c for c in ohlcv if c[0] >= last_sent]
+            if ohlcv:
+                self._sent_ts[symbol] = ohlcv[-1][0]
+            batches.setdefault(self.shard_for(symbol), []).append((position, message))
+
+        async def request(index: int, batch: List[Tuple[int, Dict]]):
+            if index in failed:
+                # Without current rules the worker would skip skills silently
+                raise failed[index]
+            return await self._request(index, 'analyze', [m for _, m in batch])
+
+        replies = await asyncio.gather(
+            *(request(index, batch) for index, batch in batches.items()),
+            return_exceptions=True
+        )
+
+        results: List[Optional[Dict]] = [None] * len(items)
+        for (index, batch), reply in zip(batches.items(), replies):
+            if isinstance(reply, BaseException):
+                logger.warning(f"Shard {index} analysis failed for {len(batch)} symbol(s): {reply}")
+                for position, message in batch:
+                    # Forget what the worker had so the next call resends full history
+                    self._sent_ts.pop(message['symbol'], None)
+                    results[position] = {"error": f"Shard {index} failed: {reply}",
+                                         "indicators": None, "decisions": {}, "context": None}
+                continue
+            for (position, _), result in zip(batch, reply):
+                results[position] = result
+        return results
+
+    def stats(self) -> Dict:
+        shards = []
+        for shard in self._shards:
+            if shard is None:
+                continue
+            shards.append({
+                "pid": shard.process.pid,
+                "alive": shard.alive and shard.process.is_alive(),
+                "requests": shard.requests,
+                "busy_ms": round(shard.busy_seconds * 1000, 1),
+            })
+        return {"workers": self.workers, "symbols": len(self._sent_ts), "restarts": self.restarts, "shards": shards}
+
+    def stop(self):
+        for shard in self._shards:
+            if shard is not None:
+                shard.stop()
+        self._shards = [None] * self.workers
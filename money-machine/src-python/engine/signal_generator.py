@@ -4,13 +4,28 @@ Signal Generator - AI-powered trading signal generation using Google Gemini API
 
 import json
 import asyncio
+import bisect
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Any, Sequence, Tuple
 from dataclasses import dataclass, asdict
 import logging
 import os
+import time
+
+from engine.cassette import llm_available, load_genai
+from engine.json_stream import StreamingJSONObject
+from engine.local_model import LocalPrediction, LocalTier
+from engine.position_sizing import PositionSizer
+from engine.signal_history import SignalHistory
+from utils.executors import run_blocking
+from utils.logger import RateLimitedLogger
+
+if TYPE_CHECKING:
+    from engine.features import FeaturePipeline, FeatureSnapshot
 
 logger = logging.getLogger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
 
 
 @dataclass
@@ -22,9 +37,10 @@ class TradingSignal:
     entry_price: Optional[float] = None
     stop_loss: Optional[float] = None
     take_profit: Optional[float] = None
-    amount: Optional[float] = None
+    amount: Optional[float] = None  # Position notional as a fraction of portfolio equity
     reasoning: str = ""
     timestamp: float = 0.0
+    sizing: Optional[Dict] = None  # Monte Carlo sizing behind amount, when sized
     
     def __post_init__(self):
         if self.timestamp == 0.0:
@@ -34,38 +50,246 @@ class TradingSignal:
         return asdict(self)
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def _format_volume(volume: float) -> str:
+    """Three significant figures with k/M suffix"""
+    for divisor, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'k')):
+        if abs(volume) >= divisor:
+            return f"{volume / divisor:.3g}{suffix}"
+    return f"{volume:.3g}"
+
+
+def _format_interval(ms: float) -> str:
+    seconds = int(ms / 1000)
+    for unit_seconds, suffix in ((86400, 'd'), (3600, 'h'), (60, 'm')):
+        if seconds >= unit_seconds and seconds % unit_seconds == 0:
+            return f"{seconds // unit_seconds}{suffix}"
+    return f"{seconds}s"
+
+
+def timeframe_of(ohlcv: List[List]) -> str:
+    """Timeframe label ("5m", "1h") from candle spacing; "?" with fewer than two candles"""
+    return _format_interval(ohlcv[-1][0] - ohlcv[-2][0]) if len(ohlcv) > 1 else "?"
+
+
+class _SymbolRows:
+    """Pre-formatted rows for one symbol, appended to as new candles arrive"""
+    
+    def __init__(self, max_candles: int):
+        self.timestamps: deque = deque(maxlen=max_candles)
+        self.closes: deque = deque(maxlen=max_candles)
+        self.prev_closes: deque = deque(maxlen=max_candles)
+        self.table_rows: deque = deque(maxlen=max_candles)
+        self.compact_rows: deque = deque(maxlen=max_candles)
+    
+    def pop(self):
+        for rows in (self.timestamps, self.closes, self.prev_closes, self.table_rows, self.compact_rows):
+            rows.pop()
+    
+    def append(self, candle: List):
+        timestamp, open_p, high, low, close, volume = candle[:6]
+        prev_close = self.closes[-1] if self.closes else close
+        
+        time_str = datetime.fromtimestamp(timestamp / 1000).strftime('%H:%M')
+        self.table_rows.append(
+            f"| {time_str} | {open_p:.2f} | {high:.2f} | {low:.2f} | {close:.2f} | {volume:.0f} |"
+        )
+        
+        # Basis points: close vs previous close, high above / low below close
+        if close and prev_close:
+            change_bp = round((close / prev_close - 1) * 1e4)
+            high_bp = round((high / close - 1) * 1e4)
+            low_bp = round((1 - low / close) * 1e4)
+        else:
+            change_bp = high_bp = low_bp = 0
+        self.compact_rows.append(f"{change_bp:+d} {high_bp} {low_bp} {_format_volume(volume)}")
+        
+        self.timestamps.append(timestamp)
+        self.closes.append(close)
+        self.prev_closes.append(prev_close)
+
+
+class PromptStats:
+    """Running prompt size and latency figures for Gemini calls"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.estimated_tokens = 0
+        self.total_latency_ms = 0.0
+        self.decisions = 0
+        self.total_decision_ms = 0.0
+        self.last: Dict[str, Any] = {}
+    
+    def record(self, prompt: str, response: Any, latency_ms: float, decision_ms: Optional[float] = None) -> None:
+        usage = getattr(response, 'usage_metadata', None)
+        reported = getattr(usage, 'prompt_token_count', None) if usage else None
+        estimated = estimate_tokens(prompt)
+        
+        self.calls += 1
+        self.prompt_tokens += reported or estimated
+        self.estimated_tokens += estimated
+        self.total_latency_ms += latency_ms
+        if decision_ms is not None:
+            self.decisions += 1
+            self.total_decision_ms += decision_ms
+        self.last = {
+            "prompt_tokens": reported or estimated,
+            "estimated_tokens": estimated,
+            "latency_ms": latency_ms,
+            "decision_ms": decision_ms,
+        }
+    
+    def to_dict(self) -> Dict:
+        calls = max(self.calls, 1)
+        return {
+            "calls": self.calls,
+            "avg_prompt_tokens": self.prompt_tokens / calls,
+            "avg_latency_ms": self.total_latency_ms / calls,
+            # Time until the decision fields were parsed from the stream
+            "avg_decision_ms": self.total_decision_ms / self.decisions if self.decisions else None,
+            "last": self.last,
+        }
+
+
+@dataclass
+class StreamResult:
+    """Outcome of a streamed JSON completion"""
+    parser: StreamingJSONObject
+    response: Any
+    latency_ms: float  # Until the stream ended
+    decision_ms: Optional[float] = None  # Until every decision key was parsed
+
+
+def _chunk_text(chunk) -> Optional[str]:
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunk without text parts (e.g. only safety metadata)
+        return None
+
+
+async def stream_json_completion(
+    model,
+    message: str,
+    decision_keys: Sequence[str],
+    on_decision: Optional[Callable[[Dict], Any]] = None,
+    **kwargs
+) -> StreamResult:
+    """Stream a completion, parsing the JSON as chunks arrive
+    
+    Uses the model's native async client when it has one, otherwise runs the
+    blocking stream on the "llm" executor pool.
+    
+    on_decision(fields) runs on the event loop as soon as every key in
+    decision_keys is complete, before the rest of the response has streamed.
+    """
+    loop = asyncio.get_running_loop()
+    parser = StreamingJSONObject()
+    start = time.perf_counter()
+    decision_ms: Optional[float] = None
+    
+    def on_chunk(text: str):
+        nonlocal decision_ms
+        parser.feed(text)
+        if decision_ms is None and all(key in parser.fields for key in decision_keys):
+            decision_ms = (time.perf_counter() - start) * 1000
+            if on_decision:
+                try:
+                    on_decision(dict(parser.fields))
+                except Exception as e:
+                    hot_path_logger.error("Early decision callback failed: %s", e)
+    
+    if hasattr(model, 'generate_content_async'):
+        # Native async client: no worker thread involved
+        response = await model.generate_content_async(message, stream=True, **kwargs)
+        async for chunk in response:
+            text = _chunk_text(chunk)
+            if text is not None:
+                on_chunk(text)
+    else:
+        def consume():
+            # Blocking stream iterator; chunks are handed to the loop in order
+            response = model.generate_content(message, stream=True, **kwargs)
+            for chunk in response:
+                text = _chunk_text(chunk)
+                if text is not None:
+                    loop.call_soon_threadsafe(on_chunk, text)
+            return response
+        
+        response = await run_blocking('llm', consume)
+    return StreamResult(parser, response, (time.perf_counter() - start) * 1000, decision_ms)
+
+
 class MarketContext:
     """Manages market data context window for Gemini"""
     
-    def __init__(self, max_candles: int = 100):
+    COMPACT_HEADER = (
+        "Rows oldest->newest: close change vs previous close (bp), "
+        "high above close (bp), low below close (bp), volume"
+    )
+    
+    def __init__(self, max_candles: int = 100, token_budget: int = 600):
         self.max_candles = max_candles
-        self.data_cache: Dict[str, List] = {}
+        self.token_budget = token_budget
+        # Keyed by (symbol, timeframe): hourly and 5m candles of one symbol never mix
+        self.data_cache: Dict[Tuple[str, str], List] = {}
+        self._rows: Dict[Tuple[str, str], _SymbolRows] = {}
+        self._latest: Dict[str, str] = {}  # symbol -> timeframe added last
     
-    def add_market_data(self, symbol: str, ohlcv: List[List]) -> None:
-        """Add OHLCV data to context cache"""
-        self.data_cache[symbol] = ohlcv[-self.max_candles:]
+    def _key(self, symbol: str, timeframe: Optional[str]) -> Tuple[str, str]:
+        return symbol, timeframe or self._latest.get(symbol, "?")
     
-    def get_context_string(self, symbol: str) -> str:
-        """Format market data for Gemini context window"""
-        if symbol not in self.data_cache:
-            return "No market data available"
+    def add_market_data(self, symbol: str, ohlcv: List[List], timeframe: Optional[str] = None) -> None:
+        """Add OHLCV data to context cache, formatting only candles not seen before
         
-        data = self.data_cache[symbol]
+        timeframe defaults to the one implied by the candle spacing.
+        """
+        ohlcv = ohlcv[-self.max_candles:]
+        timeframe = timeframe or timeframe_of(ohlcv)
+        key = (symbol, timeframe)
+        self._latest[symbol] = timeframe
+        self.data_cache[key] = ohlcv
+        
+        rows = self._rows.get(key)
+        start = 0
+        if rows is not None and rows.timestamps and ohlcv:
+            # The last known candle may still be forming, so it is re-formatted
+            last_ts = rows.timestamps[-1]
+            start = bisect.bisect_left(ohlcv, last_ts, key=lambda c: c[0])
+            if start < len(ohlcv) and ohlcv[start][0] == last_ts:
+                rows.pop()
+            else:
+                rows = None  # No overlap with what was formatted before
+        
+        if rows is None or not ohlcv:
+            rows = _SymbolRows(self.max_candles)
+            start = 0
+        self._rows[key] = rows
+        
+        for candle in ohlcv[start:]:
+            rows.append(candle)
+    
+    def get_context_string(self, symbol: str, timeframe: Optional[str] = None) -> str:
+        """Format market data for Gemini context window (latest timeframe added by default)"""
+        key = self._key(symbol, timeframe)
+        data = self.data_cache.get(key)
         if not data:
             return "No market data available"
         
         # Get last N candles
         recent_data = data[-20:]
+        table_rows = list(self._rows[key].table_rows)[-len(recent_data):]
         
         # Format as readable table
         lines = [f"## {symbol} Market Data (Last {len(recent_data)} candles)"]
         lines.append("| Time | Open | High | Low | Close | Volume |")
         lines.append("|------|------|------|-----|-------|--------|")
-        
-        for candle in recent_data:
-            timestamp, open_p, high, low, close, volume = candle[:6]
-            time_str = datetime.fromtimestamp(timestamp / 1000).strftime('%H:%M')
-            lines.append(f"| {time_str} | {open_p:.2f} | {high:.2f} | {low:.2f} | {close:.2f} | {volume:.0f} |")
+        lines.extend(table_rows)
         
         # Add summary statistics
         closes = [c[4] for c in recent_data]
@@ -78,6 +302,37 @@ class MarketContext:
         lines.append(f"**Avg Volume:** {avg_volume:.0f}")
         
         return "\n".join(lines)
+    
+    def get_compact_context(self, symbol: str, token_budget: Optional[int] = None,
+                            timeframe: Optional[str] = None) -> str:
+        """Compact numeric encoding of as many recent candles as fit the token budget"""
+        rows = self._rows.get(self._key(symbol, timeframe))
+        if not rows or not rows.timestamps:
+            return "No market data available"
+        
+        timestamps = rows.timestamps
+        interval = _format_interval(timestamps[-1] - timestamps[-2]) if len(timestamps) > 1 else "?"
+        last_close = rows.closes[-1]
+        
+        # Reserve room for the header and summary lines, then fill with the newest rows
+        remaining = (token_budget or self.token_budget) * 4 - len(self.COMPACT_HEADER) - len(symbol) - 80
+        selected = []
+        for row in reversed(rows.compact_rows):
+            remaining -= len(row) + 1
+            if remaining < 0:
+                break
+            selected.append(row)
+        selected.reverse()
+        
+        base_close = rows.prev_closes[len(rows.prev_closes) - len(selected)] if selected else last_close
+        change = (last_close / base_close - 1) * 100 if base_close else 0.0
+        
+        return "\n".join([
+            f"{symbol} {interval} candles, n={len(selected)}, base close={base_close:.2f}",
+            self.COMPACT_HEADER,
+            *selected,
+            f"last={last_close:.2f} change={change:+.2f}%",
+        ])
 
 
 class SignalGenerator:
@@ -100,7 +355,8 @@ You MUST respond with a valid JSON object containing:
     "entry_price": number or null,
     "stop_loss": number or null,
     "take_profit": number or null,
-    "amount_pct": 0.0-0.02 (max 2% of portfolio),
+    "amount_pct": 0.0-1.0 (position notional as a fraction of portfolio equity; size it so that
+                   the loss if stop_loss is hit stays within 2% of the portfolio),
     "reasoning": "brief explanation"
 }
 
@@ -110,16 +366,35 @@ You MUST respond with a valid JSON object containing:
 - Reasoning should be 1-2 sentences maximum
 """
 
-    def __init__(self, api_key: str = ""):
+    # Static framing of the user message, kept identical across calls so the
+    # prompt prefix stays cacheable
+    USER_PROMPT_PREFIX = "Analyze the following market data and generate a trading signal.\n\n"
+    USER_PROMPT_SUFFIX = "\n\nGenerate a trading signal based on this data."
+    
+    def __init__(self, api_key: str = "", token_budget: int = 600, prompt_format: str = "compact",
+                 history_config: Optional[dict] = None, features: Optional['FeaturePipeline'] = None,
+                 local_model_config: Optional[dict] = None, sizing_config: Optional[dict] = None):
         self.api_key = api_key
         self.model = None
-        self.context = MarketContext()
+        # Local fast tier: answers confident cases, escalates the rest to Gemini
+        self.local = LocalTier(local_model_config)
+        # Sizes every BUY / SELL from simulated paths instead of the model's amount_pct
+        self.sizer = PositionSizer(sizing_config)
+        if features is None:
+            from engine.features import FeaturePipeline  # Builds on MarketContext from this module
+            features = FeaturePipeline()
+        # Candle context and features are shared with the skill executor
+        self.features = features
+        self.context = features.context
+        self.token_budget = token_budget
+        self.prompt_format = prompt_format
         self.last_signals: Dict[str, TradingSignal] = {}
+        self.history = SignalHistory(history_config)
+        self.prompt_stats = PromptStats()
         
-        if api_key:
+        if llm_available(api_key):
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=api_key)
+                genai = load_genai(api_key)
                 
                 # Use Gemini 2.0 Flash or 1.5 Flash (Generic fallback)
                 # Note: 'gemini-2.0-flash-exp' is the latest if available, else 'gemini-1.5-flash'
@@ -141,46 +416,101 @@ You MUST respond with a valid JSON object containing:
         symbol: str,
         market_data: List[List],
         portfolio_balance: float = 10000.0,
-        additional_context: str = ""
+        additional_context: str = "",
+        on_decision: Optional[Callable[[Dict], Any]] = None,
+        features: Optional['FeatureSnapshot'] = None
     ) -> TradingSignal:
-        """Generate a trading signal for the given symbol"""
+        """Generate a trading signal for the given symbol
         
-        # Update context with market data
-        self.context.add_market_data(symbol, market_data)
+        With Gemini, on_decision({"symbol", "action", "confidence"}) is called as
+        soon as those fields have streamed in, so a trade can be staged while
+        the reasoning is still being generated. features is the snapshot the
+        caller already took for market_data (e.g. TradingEngine.get_features).
+        """
+        signal = await self._generate_signal(
+            symbol, market_data, portfolio_balance, additional_context, on_decision, features
+        )
+        if self.sizer.enabled and signal.action in ('BUY', 'SELL'):
+            self._size_signal(signal, market_data, features or self.features.get(symbol))
+        self.history.record(signal)
+        return signal
+    
+    def _size_signal(self, signal: TradingSignal, market_data: List[List], features: Optional['FeatureSnapshot']):
+        """Replace the model's amount with the Monte Carlo size under the risk limits"""
+        result = self.sizer.size(
+            signal.symbol, signal.action, market_data, signal.entry_price,
+            signal.stop_loss, signal.take_profit, features.exposure if features else None,
+            signal.confidence
+        )
+        if result is None:
+            return
+        signal.sizing = {**result.to_dict(), "requested": signal.amount}
+        signal.amount = result.amount_pct
+        # The size assumes these exits: defaults replace a missing or wrong-side stop / target
+        signal.stop_loss = result.stop_loss
+        signal.take_profit = result.take_profit
+    
+    async def _generate_signal(
+        self,
+        symbol: str,
+        market_data: List[List],
+        portfolio_balance: float,
+        additional_context: str,
+        on_decision: Optional[Callable[[Dict], Any]],
+        features: Optional['FeatureSnapshot'] = None
+    ) -> TradingSignal:
+        # Update context and features with market data (recomputed only on a new closed bar)
+        if features is None:
+            features = self.features.update(symbol, market_data)
         
         if not self.model:
             # Fallback to rule-based signal
             return self._generate_rule_based_signal(symbol, market_data)
         
+        local: Optional[LocalPrediction] = None
+        if self.local.enabled:
+            local = self.local.predict(features.features, features.exposure)
+            if local.escalate is None:
+                signal = self._signal_from_local(symbol, local, market_data)
+                self.last_signals[symbol] = signal
+                return signal
+        
         try:
             # Build user message
-            market_context = self.context.get_context_string(symbol)
+            if self.prompt_format == "markdown":
+                market_context = self.context.get_context_string(symbol, features.timeframe)
+            else:
+                market_context = self.context.get_compact_context(symbol, self.token_budget, features.timeframe)
             
-            user_message = f"""Analyze the following market data and generate a trading signal.
-
-{market_context}
-
-**Portfolio Balance:** ${portfolio_balance:.2f}
-**Max Risk Per Trade:** 2%
-
-{additional_context}
-
-Generate a trading signal based on this data."""
+            user_message = (
+                self.USER_PROMPT_PREFIX
+                + market_context
+                + f"\n{features.render()}"
+                + f"\n\nPortfolio Balance: ${portfolio_balance:.2f}\nMax Risk Per Trade: 2%"
+                + (f"\n\n{additional_context}" if additional_context else "")
+                + self.USER_PROMPT_SUFFIX
+            )
 
-            # Call Gemini API
-            # Note: run_in_executor needed because Gemini SDK is synchronous
-            start_time = datetime.now()
-            response = await asyncio.to_thread(
-                self.model.generate_content, 
-                user_message
+            # Call Gemini API, streamed so the decision is known before the reasoning ends
+            early = None
+            if on_decision:
+                early = lambda fields: on_decision({"symbol": symbol, **fields})
+            result = await stream_json_completion(
+                self.model, user_message, ('action', 'confidence'), on_decision=early
             )
             
             # Parse response
-            response_text = response.text
-            signal = self._parse_json_response(symbol, response_text, market_data)
+            data = result.parser.fields if result.parser.done else self._load_json(result.parser.text)
+            decoded = self._decode_signal(symbol, data, market_data)
+            signal = decoded or self._unparsed_signal(symbol)
             
-            latency = (datetime.now() - start_time).total_seconds() * 1000
-            logger.debug(f"Gemini generation took {latency:.0f}ms")
+            self.prompt_stats.record(user_message, result.response, result.latency_ms, result.decision_ms)
+            logger.debug(f"Gemini generation took {result.latency_ms:.0f}ms "
+                         f"(decision after {result.decision_ms or 0:.0f}ms)")
+            # Only real Gemini decisions are compared with the local tier or logged for training
+            if decoded is not None and decoded.action in ('BUY', 'SELL', 'HOLD') \
+                    and (self.local.enabled or self.local.log is not None):
+                self.local.observe(features, signal.action, signal.confidence, local)
             
             # Cache the signal
             self.last_signals[symbol] = signal
@@ -188,7 +518,7 @@ Generate a trading signal based on this data."""
             return signal
             
         except Exception as e:
-            logger.error(f"Gemini API error: {e}")
+            hot_path_logger.error("Gemini API error: %s", e)
             return self._generate_rule_based_signal(symbol, market_data)
     
     def _parse_json_response(
@@ -198,25 +528,52 @@ Generate a trading signal based on this data."""
         market_data: List[List]
     ) -> TradingSignal:
         """Parse JSON response into a TradingSignal"""
+        return self._signal_from_data(symbol, self._load_json(response_text), market_data)
+    
+    @staticmethod
+    def _load_json(response_text: str) -> Optional[Dict]:
         try:
-            data = json.loads(response_text)
-            
-            current_price = market_data[-1][4] if market_data else 0
-            
-            return TradingSignal(
-                symbol=symbol,
-                action=data.get('action', 'HOLD').upper(),
-                confidence=float(data.get('confidence', 0.5)),
-                entry_price=data.get('entry_price') or current_price,
-                stop_loss=data.get('stop_loss'),
-                take_profit=data.get('take_profit'),
-                amount=data.get('amount_pct'),
-                reasoning=data.get('reasoning', '')
-            )
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            logger.warning(f"Failed to parse Gemini response: {e}. Raw: {response_text[:100]}...")
-        
-        # Fallback
+            return json.loads(response_text)
+        except json.JSONDecodeError as e:
+            hot_path_logger.warning("Failed to parse Gemini response: %s. Raw: %s...", e, response_text[:100])
+            return None
+    
+    def _signal_from_data(
+        self,
+        symbol: str,
+        data: Optional[Dict],
+        market_data: List[List]
+    ) -> TradingSignal:
+        """Build a TradingSignal from decoded response fields, or the HOLD fallback"""
+        return self._decode_signal(symbol, data, market_data) or self._unparsed_signal(symbol)
+    
+    def _decode_signal(
+        self,
+        symbol: str,
+        data: Optional[Dict],
+        market_data: List[List]
+    ) -> Optional[TradingSignal]:
+        """TradingSignal from decoded response fields; None when they are unusable"""
+        if data is not None:
+            try:
+                current_price = market_data[-1][4] if market_data else 0
+                
+                return TradingSignal(
+                    symbol=symbol,
+                    action=data.get('action', 'HOLD').upper(),
+                    confidence=float(data.get('confidence', 0.5)),
+                    entry_price=data.get('entry_price') or current_price,
+                    stop_loss=data.get('stop_loss'),
+                    take_profit=data.get('take_profit'),
+                    amount=data.get('amount_pct'),
+                    reasoning=data.get('reasoning', '')
+                )
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                hot_path_logger.warning("Failed to parse Gemini response: %s. Raw: %s...", e, str(data)[:100])
+        return None
+    
+    @staticmethod
+    def _unparsed_signal(symbol: str) -> TradingSignal:
         return TradingSignal(
             symbol=symbol,
             action='HOLD',
@@ -224,6 +581,21 @@ Generate a trading signal based on this data."""
             reasoning=f"Could not parse AI response"
         )
     
+    def _signal_from_local(self, symbol: str, prediction: LocalPrediction, market_data: List[List]) -> TradingSignal:
+        """Signal answered by the local tier, with the rule-based stop and target distances"""
+        current = market_data[-1][4] if market_data else None
+        action = prediction.action
+        trade = current and action in ('BUY', 'SELL')
+        return TradingSignal(
+            symbol=symbol,
+            action=action,
+            confidence=prediction.confidence,
+            entry_price=current if trade else None,
+            stop_loss=(current * 0.98 if action == 'BUY' else current * 1.02) if trade else None,
+            take_profit=(current * 1.04 if action == 'BUY' else current * 0.96) if trade else None,
+            reasoning=f"Local model: {action} p={prediction.confidence:.2f}"
+        )
+    
     def _generate_rule_based_signal(
         self,
         symbol: str,
@@ -0,0 +1,264 @@
+"""
+Per-symbol signal history
+Signals are stored as fixed-size records in a NumPy ring buffer per symbol.
+Every record has a global index (0 for the first signal of a symbol), which
+doubles as the streaming cursor. When spilling is enabled, the oldest part of
+a full ring is appended to a flat record file, so older history stays
+queryable through a memory map and survives restarts.
+"""
+
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('HOLD', 'BUY', 'SELL')
+_ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+REASONING_BYTES = 200  # UTF-8, longer reasoning is truncated
+
+SIGNAL_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('action', 'u1'),
+    ('confidence', '<f4'),
+    ('entry_price', '<f8'),
+    ('stop_loss', '<f8'),
+    ('take_profit', '<f8'),
+    ('amount', '<f8'),
+    ('reasoning', f'S{REASONING_BYTES}'),
+])
+
+
+def records_to_dicts(symbol: str, records: np.ndarray) -> List[Dict]:
+    """Same shape as TradingSignal.to_dict(), converted column by column"""
+    columns = {}
+    for field in ('entry_price', 'stop_loss', 'take_profit', 'amount'):
+        values = records[field]
+        columns[field] = [None if missing else value
+                          for value, missing in zip(values.tolist(), np.isnan(values).tolist())]
+    confidences = np.round(records['confidence'].astype(np.float64), 6).tolist()
+    return [
+        {
+            "symbol": symbol,
+            "action": ACTIONS[action],
+            "confidence": confidence,
+            "entry_price": entry,
+            "stop_loss": stop,
+            "take_profit": target,
+            "amount": amount,
+            "reasoning": reasoning.decode('utf-8', errors='ignore'),
+            "timestamp": timestamp,
+        }
+        for action, confidence, entry, stop, target, amount, reasoning, timestamp in zip(
+            records['action'].tolist(), confidences, columns['entry_price'], columns['stop_loss'],
+            columns['take_profit'], columns['amount'], records['reasoning'].tolist(),
+            records['timestamp'].tolist()
+        )
+    ]
+
+
+class _SymbolHistory:
+    """Ring of records for one symbol, plus its spill file if any"""
+
+    def __init__(self, capacity: int, spill_path: Optional[Path]):
+        self.records = np.zeros(capacity, dtype=SIGNAL_DTYPE)
+        self.capacity = capacity
+        self.start = 0  # Ring slot of the oldest in-memory record
+        self.count = 0
+        self.spill_path = spill_path
+        self.spilled = 0  # Records on disk; also the global index of the oldest in-memory record
+        self.dropped = 0  # Records evicted without spilling
+        self.last_timestamp = float('-inf')
+        self._disk: Optional[np.memmap] = None
+
+        if spill_path is not None and spill_path.exists():
+            size = spill_path.stat().st_size
+            self.spilled = size // SIGNAL_DTYPE.itemsize
+            if size % SIGNAL_DTYPE.itemsize:
+                # Torn write from a crash: drop the partial record
+                with open(spill_path, 'r+b') as f:
+                    f.truncate(self.spilled * SIGNAL_DTYPE.itemsize)
+            if self.spilled:
+                self.last_timestamp = float(self._disk_view()[-1]['timestamp'])
+
+    @property
+    def first_index(self) -> int:
+        """Global index of the oldest record still available"""
+        return 0 if self.spill_path is not None else self.dropped
+
+    @property
+    def total(self) -> int:
+        return self.spilled + self.dropped + self.count
+
+    def append(self, signal) -> None:
+        if self.count == self.capacity:
+            self._evict()
+
+        # Keep timestamps non-decreasing so range queries can binary search
+        timestamp = max(signal.timestamp, self.last_timestamp)
+        self.last_timestamp = timestamp
+
+        record = self.records[(self.start + self.count) % self.capacity]
+        record['timestamp'] = timestamp
+        record['action'] = _ACTION_CODES.get(signal.action, 0)
+        record['confidence'] = signal.confidence
+        for field in ('entry_price', 'stop_loss', 'take_profit', 'amount'):
+            value = getattr(signal, field)
+            record[field] = np.nan if value is None else value
+        record['reasoning'] = (signal.reasoning or '').encode('utf-8')[:REASONING_BYTES]
+        self.count += 1
+
+    def _evict(self) -> None:
+        if self.spill_path is None:
+            self.start = (self.start + 1) % self.capacity
+            self.count -= 1
+            self.dropped += 1
+            return
+
+        # Spill the oldest quarter in one append
+        self.spill(max(1, self.capacity // 4))
+
+    def spill(self, batch: int) -> None:
+        """Move the oldest `batch` in-memory records to the spill file"""
+        self._disk = None
+        with open(self.spill_path, 'ab') as f:
+            for segment in self._segments(batch):
+                segment.tofile(f)
+        self.start = (self.start + batch) % self.capacity
+        self.count -= batch
+        self.spilled += batch
+
+    def _segments(self, count: Optional[int] = None) -> List[np.ndarray]:
+        """The oldest `count` in-memory records, oldest first, as at most two views"""
+        count = self.count if count is None else count
+        end = self.start + count
+        if end <= self.capacity:
+            return [self.records[self.start:end]]
+        return [self.records[self.start:], self.records[:end - self.capacity]]
+
+    def _disk_view(self) -> np.ndarray:
+        if self._disk is None or len(self._disk) != self.spilled:
+            self._disk = np.memmap(self.spill_path, dtype=SIGNAL_DTYPE, mode='r', shape=(self.spilled,))
+        return self._disk
+
+    def _sources(self) -> List[Tuple[int, np.ndarray]]:
+        """(global index of first record, records) for disk then memory, in order"""
+        sources = []
+        if self.spilled:
+            sources.append((0, self._disk_view()))
+        base = self.spilled + self.dropped
+        for segment in self._segments():
+            if len(segment):
+                sources.append((base, segment))
+                base += len(segment)
+        return sources
+
+    def index_of(self, timestamp: float, side: str) -> int:
+        """Global index of the first record with timestamp >= (side='left') or > (side='right') the value"""
+        sources = self._sources()
+        for base, records in sources:
+            position = int(np.searchsorted(records['timestamp'], timestamp, side=side))
+            if position < len(records):
+                return base + position
+        return self.total
+
+    def read(self, lo: int, hi: int) -> np.ndarray:
+        """Records with global index in [lo, hi), oldest first"""
+        parts = []
+        for base, records in self._sources():
+            a, b = max(lo - base, 0), min(hi - base, len(records))
+            if a < b:
+                parts.append(records[a:b])
+        if len(parts) == 1:
+            return np.array(parts[0])
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=SIGNAL_DTYPE)
+
+
+class SignalHistory:
+    """Bounded per-symbol signal history with time-range and cursor queries"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.capacity = max(4, int(config.get('capacity', 1000)))
+        spill_dir = config.get('spill_dir') or ''
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self._symbols: Dict[str, _SymbolHistory] = {}
+
+    def _spill_path(self, symbol: str) -> Optional[Path]:
+        if self.spill_dir is None:
+            return None
+        return self.spill_dir / (re.sub(r'[^A-Za-z0-9_.-]', '_', symbol) + '.sig')
+
+    def _history(self, symbol: str) -> _SymbolHistory:
+        history = self._symbols.get(symbol)
+        if history is None:
+            history = _SymbolHistory(self.capacity, self._spill_path(symbol))
+            self._symbols[symbol] = history
+        return history
+
+    def record(self, signal) -> None:
+        try:
+            self._history(signal.symbol).append(signal)
+        except OSError as e:
+            logger.error(f"Signal history spill failed for {signal.symbol}: {e}")
+
+    def query(
+        self,
+        symbol: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None
+    ) -> Dict:
+        """Signals with start <= timestamp <= end, oldest first, at most `limit` per page
+
+        Pass the returned `next_cursor` back (with the same end) to continue;
+        it is None once the range is exhausted.
+        """
+        spill_path = self._spill_path(symbol)
+        if symbol not in self._symbols and (spill_path is None or not spill_path.exists()):
+            return {"symbol": symbol, "signals": [], "next_cursor": None, "first_index": 0, "total": 0}
+        history = self._history(symbol)
+
+        lo = history.first_index
+        if cursor is not None:
+            lo = max(lo, int(cursor))
+        elif start is not None:
+            lo = max(lo, history.index_of(start, 'left'))
+        hi = history.total if end is None else history.index_of(end, 'right')
+
+        page_end = min(hi, lo + max(1, limit))
+        signals = records_to_dicts(symbol, history.read(lo, page_end)) if lo < page_end else []
+        return {
+            "symbol": symbol,
+            "signals": signals,
+            "next_cursor": page_end if page_end < hi else None,
+            "first_index": history.first_index,
+            "total": history.total,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "symbols": len(self._symbols),
+            "in_memory": sum(h.count for h in self._symbols.values()),
+            "spilled": sum(h.spilled for h in self._symbols.values()),
+            "dropped": sum(h.dropped for h in self._symbols.values()),
+            "memory_bytes": len(self._symbols) * self.capacity * SIGNAL_DTYPE.itemsize,
+        }
+
+    def flush(self) -> None:
+        """Spill everything still in memory (on shutdown, so a restart keeps it)"""
+        if self.spill_dir is None:
+            return
+        for symbol, history in self._symbols.items():
+            try:
+                if history.count:
+                    history.spill(history.count)
+            except OSError as e:
+                logger.error(f"Signal history flush failed for {symbol}: {e}")
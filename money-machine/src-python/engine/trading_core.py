@@ -5,8 +5,24 @@ Core trading engine with CCXT integration
 import asyncio
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+import logging
 import os
 
+from engine.candle_aggregator import CandleAggregator
+from engine.exchange_registry import ExchangeRegistry
+from engine.features import FeaturePipeline, FeatureSnapshot
+from engine.order_book import OrderBookManager
+from engine.paper_trading import PaperTradingEngine, PaperFill
+from engine.risk_manager import RiskManager, RiskCheck
+from engine.scanner import UniverseScanner
+from utils.logger import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+# Market data errors repeat on every poll while an exchange is down
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
+
+CLOSED_ORDER_STATUSES = ('closed', 'canceled', 'cancelled', 'expired', 'rejected')
+
 
 class Portfolio:
     """Manages portfolio state, balance, and positions"""
@@ -15,6 +31,7 @@ class Portfolio:
         self.balance = initial_balance
         self.trades: List[Dict] = []
         self.positions: Dict[str, Any] = {}
+        self.version = 0  # Bumped on every change to balance, positions or trades
     
     def get_balance(self) -> float:
         return self.balance
@@ -34,6 +51,51 @@ class Portfolio:
         # Update balance based on trade result
         if 'pnl' in trade:
             self.balance += trade['pnl']
+        self.version += 1
+    
+    def apply_fill(self, symbol: str, side: str, amount: float, price: float, fee: float = 0.0) -> float:
+        """Update the position for a fill and return the realized PnL"""
+        position = self.positions.get(symbol) or {"amount": 0.0, "entry_price": 0.0, "pnl": 0.0}
+        old_amount = position['amount']
+        signed = amount if side == 'buy' else -amount
+        new_amount = old_amount + signed
+        realized = 0.0
+        
+        if old_amount == 0 or old_amount * signed > 0:
+            # Opening or adding: volume-weighted entry price
+            position['entry_price'] = (
+                abs(old_amount) * position['entry_price'] + amount * price
+            ) / abs(new_amount)
+        else:
+            # Reducing, closing or flipping
+            closed = min(amount, abs(old_amount))
+            direction = 1 if old_amount > 0 else -1
+            realized = closed * (price - position['entry_price']) * direction
+            if new_amount * old_amount < 0:
+                position['entry_price'] = price
+        
+        realized -= fee
+        position['amount'] = new_amount
+        position['pnl'] += realized
+        
+        if abs(new_amount) < 1e-12:
+            self.positions.pop(symbol, None)
+            new_amount = 0.0
+        else:
+            self.positions[symbol] = position
+        
+        self.balance += realized
+        self.trades.append({
+            "symbol": symbol,
+            "side": side,
+            "amount": amount,
+            "price": price,
+            "fee": fee,
+            "realized_pnl": realized,
+            "timestamp": datetime.now().timestamp()
+        })
+        self.version += 1
+        return realized
 
 
 class TradingEngine:
@@ -42,59 +104,209 @@ class TradingEngine:
     def __init__(self, config: dict):
         self.config = config
         self.exchange = None
+        self.exchanges = ExchangeRegistry(config)
         self.portfolio = Portfolio(config.get('initial_balance', 10000.0))
         self.trading_active = False
+        self.risk = RiskManager(config, self.portfolio.get_balance())
+        # Paper mode: market data from the exchange, execution simulated locally
+        self.paper: Optional[PaperTradingEngine] = None
+        if config.get('trading_mode') == 'paper':
+            self.paper = PaperTradingEngine(config.get('paper', {}))
+        self.last_prices: Dict[str, float] = {}
+        # Live resting orders: fills booked so far, reconciled by polling fetch_order
+        self.live_orders: Dict[str, Dict] = {}
+        self.order_poll_interval = float(config.get('order_poll_ms', 2000)) / 1000
+        self._order_sync: Optional[asyncio.Task] = None
+        self.order_books = OrderBookManager(self, config.get('order_book', {}))
+        # One base candle stream per symbol; other timeframes are aggregated locally
+        self.candles = CandleAggregator(config.get('candles', {}))
+        self._candle_fetches: Dict[str, asyncio.Task] = {}
+        # Closed-bar features shared by signal generation and skills
+        self.features = FeaturePipeline(config.get('features', {}))
+        # Bulk screening of the whole universe ahead of signal generation
+        self.scanner = UniverseScanner(self, config.get('scanner', {}))
         self.market_data_cache = {}
         self.start_time = datetime.now()
         self._connected = False
     
     async def initialize(self):
-        """Initialize exchange connection"""
+        """Initialize exchange connections"""
         try:
-            # Lazy import ccxt to avoid issues if not installed
-            import ccxt.async_support as ccxt
-            
-            exchange_config = self.config.get('exchange', {})
-            exchange_name = exchange_config.get('name', 'binance')
-            
-            # Create exchange instance
-            exchange_class = getattr(ccxt, exchange_name, None)
-            if exchange_class:
-                self.exchange = exchange_class({
-                    'apiKey': exchange_config.get('api_key', ''),
-                    'secret': exchange_config.get('secret', ''),
-                    'enableRateLimit': True,
-                    'sandbox': exchange_config.get('sandbox', True),
-                })
-                
-                # Load markets
-                await self.exchange.load_markets()
-                self._connected = True
-        except ImportError:
-            print("CCXT not installed. Running in mock mode.")
-            self._connected = False
+            await self.exchanges.open()
         except Exception as e:
-            print(f"Exchange initialization error: {e}")
+            logger.error(f"Exchange initialization error: {e}")
+        
+        # Primary venue, used whenever no symbol-specific route applies
+        if self.exchanges.primary:
+            self.exchange = self.exchanges.primary.client
+            self._connected = True
+        else:
             self._connected = False
     
+    def exchange_for(self, symbol: str):
+        """Exchange client that serves a symbol"""
+        return self.exchanges.client_for(symbol) or self.exchange
+    
     async def get_market_data(self, symbol: str = "BTC/USDT", 
-                             timeframe: str = "5m") -> List[List]:
+                             timeframe: str = "5m", limit: int = 100) -> List[List]:
         """Fetch OHLCV data"""
-        if not self.exchange:
+        exchange = self.exchange_for(symbol)
+        if not exchange:
             # Return mock data
-            return [[datetime.now().timestamp() * 1000, 50000, 50100, 49900, 50050, 100]]
+            ohlcv = [[datetime.now().timestamp() * 1000, 50000, 50100, 49900, 50050, 100]]
+            self._on_market_data(symbol, ohlcv, timeframe)
+            return ohlcv
+        
+        if self.candles.enabled and self.candles.supports(timeframe):
+            return await self._get_aggregated(exchange, symbol, timeframe, limit)
         
         try:
-            ohlcv = await self.exchange.fetch_ohlcv(symbol, timeframe, limit=100)
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            if ohlcv:
+                self._on_market_data(symbol, ohlcv, timeframe)
             return ohlcv
         except Exception as e:
-            print(f"Error fetching market data: {e}")
+            hot_path_logger.error("Error fetching market data for %s: %s", symbol, e)
             return []
     
+    async def _get_aggregated(self, exchange, symbol: str, timeframe: str, limit: int) -> List[List]:
+        """Serve any timeframe from the local base stream, refreshing it at most every refresh_ms"""
+        try:
+            if self.candles.needs_refresh(symbol):
+                # Concurrent callers for the same symbol share one base fetch
+                task = self._candle_fetches.get(symbol)
+                if task is None:
+                    task = asyncio.ensure_future(self._refresh_base(exchange, symbol))
+                    self._candle_fetches[symbol] = task
+                    task.add_done_callback(lambda _: self._candle_fetches.pop(symbol, None))
+                await asyncio.shield(task)
+            
+            if self.candles.needs_seed(symbol, timeframe, limit):
+                # Base history too short for this many bars: backfill the older part once
+                self.candles.seed(symbol, timeframe, await exchange.fetch_ohlcv(symbol, timeframe, limit=limit))
+        except Exception as e:
+            hot_path_logger.error("Error fetching market data for %s: %s", symbol, e)
+        
+        return self.candles.get(symbol, timeframe, limit)
+    
+    async def _refresh_base(self, exchange, symbol: str):
+        since = self.candles.last_timestamp(symbol)
+        page = self.candles.history
+        ohlcv = await exchange.fetch_ohlcv(symbol, self.candles.base_timeframe, since=since, limit=page)
+        if since is not None and len(ohlcv) >= page:
+            # Too far behind to catch up from `since`: start over from the latest window
+            self.candles.reset(symbol)
+            ohlcv = await exchange.fetch_ohlcv(symbol, self.candles.base_timeframe, limit=page)
+        self.candles.on_candles(symbol, ohlcv)
+        if ohlcv:
+            self._on_market_data(symbol, ohlcv, self.candles.base_timeframe)
+    
+    def get_features(self, symbol: str, ohlcv: List[List], timeframe: Optional[str] = None) -> FeatureSnapshot:
+        """Feature snapshot for freshly fetched candles, with the symbol's portfolio exposure"""
+        equity = self.portfolio.get_balance()
+        position = self.portfolio.get_positions().get(symbol) or {}
+        close = ohlcv[-2][4] if len(ohlcv) > 1 else None
+        exposure = None
+        if equity > 0 and close:
+            # Valued at the closed bar, rounded so price ticks alone do not bump the version
+            exposure = {
+                "position": round(float(position.get('amount', 0) or 0) * close / equity, 4),
+                "gross": round(self.risk.gross_exposure / equity, 3),
+                "open_positions": self.risk.open_positions,
+            }
+        return self.features.update(symbol, ohlcv, exposure, timeframe)
+    
+    async def get_order_book_features(self, symbol: str):
+        """Spread, imbalance and microprice for a symbol, or None when order books are disabled"""
+        return await self.order_books.get_features(symbol)
+    
+    def _on_market_data(self, symbol: str, ohlcv: List[List], timeframe: Optional[str] = None):
+        self._update_price(symbol, ohlcv[-1][4])
+        if self.paper:
+            self._apply_paper_fills(self.paper.on_candles(symbol, ohlcv, timeframe))
+    
+    def _update_price(self, symbol: str, price: float):
+        self.last_prices[symbol] = price
+        self.risk.mark(symbol, price)
+    
+    def check_risk(self, trade_params: dict) -> RiskCheck:
+        """Pre-trade risk gate (O(1) against running aggregates)"""
+        symbol = trade_params.get('symbol', '')
+        return self.risk.check_order(
+            symbol,
+            trade_params.get('order_type', ''),
+            trade_params.get('amount', 0),
+            trade_params.get('price') or self.last_prices.get(symbol),
+            equity=self.portfolio.get_balance(),
+            stop_loss=trade_params.get('stop_loss')
+        )
+    
+    def _record_fill(self, symbol: str, side: str, amount: float, price: float, fee: float = 0.0):
+        """Apply a fill to the portfolio and the risk aggregates"""
+        realized = self.portfolio.apply_fill(symbol, side, amount, price, fee)
+        position = self.portfolio.get_positions().get(symbol)
+        self.risk.on_fill(symbol, position['amount'] if position else 0.0, price, realized)
+    
+    def _apply_paper_fills(self, fills: List[PaperFill]):
+        """Book paper fills into the portfolio and keep resting-order exposure current"""
+        for fill in fills:
+            self._record_fill(fill.symbol, fill.side, fill.amount, fill.price, fill.fee)
+            if fill.status == "closed":
+                self.risk.on_order_closed(fill.order_id)
+            else:
+                order = self.paper.orders[fill.order_id]
+                self.risk.on_order_open(fill.order_id, fill.remaining * order.price)
+    
+    def _execute_paper(self, trade_params: dict) -> dict:
+        symbol = trade_params['symbol']
+        price = trade_params.get('price')
+        reference = self.last_prices.get(symbol) or price
+        if not reference:
+            return {"success": False, "error": f"No market price for {symbol}"}
+        
+        try:
+            order, fills = self.paper.submit(
+                symbol,
+                trade_params['order_type'],
+                trade_params['amount'],
+                price,
+                reference,
+                timestamp=self.get_server_time() * 1000  # ms, like candle timestamps
+            )
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        
+        self._apply_paper_fills(fills)
+        if order.status == "open":
+            self.risk.on_order_open(order.id, order.remaining * order.price)
+        
+        return {
+            "success": True,
+            "order_id": order.id,
+            "status": order.status,
+            "filled": order.filled,
+            "average": order.average
+        }
+    
     async def execute_trade(self, trade_params: dict) -> dict:
         """Execute a trade based on params"""
-        if not self.exchange:
-            # Mock execution
+        check = self.check_risk(trade_params)
+        if not check.approved:
+            return {"success": False, "error": f"Risk check failed: {check.reason}"}
+        
+        if self.paper:
+            return self._execute_paper(trade_params)
+        
+        exchange = self.exchange_for(trade_params['symbol'])
+        if not exchange:
+            # Mock execution - fill instantly at the reference price
+            symbol = trade_params['symbol']
+            self._record_fill(
+                symbol,
+                trade_params['order_type'],
+                trade_params['amount'],
+                trade_params.get('price') or self.last_prices[symbol]
+            )
             return {
                 "success": True, 
                 "order_id": f"mock_{datetime.now().timestamp()}",
@@ -109,23 +321,121 @@ class TradingEngine:
             
             if order_type == 'buy':
                 if price:
-                    order = await self.exchange.create_limit_buy_order(symbol, amount, price)
+                    order = await exchange.create_limit_buy_order(symbol, amount, price)
                 else:
-                    order = await self.exchange.create_market_buy_order(symbol, amount)
+                    order = await exchange.create_market_buy_order(symbol, amount)
             else:
                 if price:
-                    order = await self.exchange.create_limit_sell_order(symbol, amount, price)
+                    order = await exchange.create_limit_sell_order(symbol, amount, price)
                 else:
-                    order = await self.exchange.create_market_sell_order(symbol, amount)
+                    order = await exchange.create_market_sell_order(symbol, amount)
             
-            # Update portfolio
-            self.portfolio.add_trade(order)
+            # Book whatever filled; anything still resting is tracked until it closes
+            self.live_orders[order['id']] = {
+                "symbol": symbol, "side": order_type, "amount": amount,
+                "price": price or self.last_prices.get(symbol) or 0.0,
+                "filled": 0.0, "cost": 0.0, "fee": 0.0,
+            }
+            if not self._apply_order_update(order['id'], order):
+                self._ensure_order_sync()
             
             return {"success": True, "order_id": order['id']}
         
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _apply_order_update(self, order_id: str, order: dict) -> bool:
+        """Book new fills of a live order from its exchange state; True once it is done"""
+        tracked = self.live_orders.get(order_id)
+        if tracked is None:
+            return True
+        symbol = tracked['symbol']
+        
+        filled = float(order.get('filled') or 0.0)
+        new = filled - tracked['filled']
+        if new > 1e-12:
+            cost = order.get('cost')
+            if cost:
+                fill_price = (cost - tracked['cost']) / new
+            else:
+                fill_price = order.get('average') or order.get('price') or tracked['price'] \
+                    or self.last_prices.get(symbol)
+            fee_total = (order.get('fee') or {}).get('cost') or 0.0
+            if fill_price:
+                self._record_fill(symbol, tracked['side'], new, fill_price, max(0.0, fee_total - tracked['fee']))
+            tracked.update(filled=filled, cost=cost or tracked['cost'] + new * (fill_price or 0.0), fee=fee_total)
+        
+        remaining = order.get('remaining')
+        if remaining is None:
+            remaining = tracked['amount'] - filled
+        status = order.get('status')
+        if status in CLOSED_ORDER_STATUSES or (status is None and remaining <= 0):
+            self.live_orders.pop(order_id, None)
+            self.risk.on_order_closed(order_id)
+            return True
+        if new > 1e-12 or order_id not in self.risk.open_orders:
+            self.risk.on_order_open(order_id, remaining * tracked['price'])
+        return False
+    
+    async def sync_orders(self):
+        """Fetch every tracked live order once and book fills / closes"""
+        for order_id, tracked in list(self.live_orders.items()):
+            exchange = self.exchange_for(tracked['symbol'])
+            if exchange is None:
+                continue
+            try:
+                order = await exchange.fetch_order(order_id, tracked['symbol'])
+            except Exception as e:
+                hot_path_logger.warning("Order sync failed for %s: %s", order_id, e)
+                continue
+            self._apply_order_update(order_id, order)
+    
+    def _ensure_order_sync(self):
+        if self._order_sync is None or self._order_sync.done():
+            self._order_sync = asyncio.ensure_future(self._order_sync_loop())
+    
+    async def _order_sync_loop(self):
+        while self.live_orders:
+            await asyncio.sleep(self.order_poll_interval)
+            await self.sync_orders()
+    
+    async def cancel_order(self, order_id: str, symbol: Optional[str] = None) -> dict:
+        """Cancel a resting order"""
+        if self.paper:
+            order = self.paper.cancel(order_id)
+            if order is None:
+                return {"success": False, "error": f"Order {order_id} is not open"}
+        elif self.exchange:
+            exchange = self.exchange_for(symbol) if symbol else self.exchange
+            try:
+                await exchange.cancel_order(order_id, symbol)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            tracked = self.live_orders.get(order_id)
+            if tracked is not None:
+                # Book fills that landed before the cancel
+                try:
+                    self._apply_order_update(order_id, await exchange.fetch_order(order_id, tracked['symbol']))
+                except Exception as e:
+                    hot_path_logger.warning("Final order sync failed for %s: %s", order_id, e)
+                self.live_orders.pop(order_id, None)
+        else:
+            return {"success": False, "error": "No exchange connected"}
+        
+        self.risk.on_order_closed(order_id)
+        return {"success": True, "order_id": order_id}
+    
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict]:
+        """Resting paper orders (live orders are tracked by the exchange)"""
+        if not self.paper:
+            return []
+        return [order.to_dict() for order in self.paper.open_orders(symbol)]
+    
+    @property
+    def state_version(self) -> int:
+        """Monotonic version of portfolio and risk state; moves whenever either changes"""
+        return self.portfolio.version + self.risk.version
+    
     def get_server_time(self) -> float:
         return datetime.now().timestamp()
     
@@ -141,5 +451,9 @@ class TradingEngine:
     
     async def close(self):
         """Cleanup resources"""
-        if self.exchange:
-            await self.exchange.close()
+        if self._order_sync is not None:
+            self._order_sync.cancel()
+        await self.order_books.close()
+        # Always: the shared HTTP session outlives venues that failed to connect
+        await self.exchanges.close()
+        self.exchange = None
@@ -7,19 +7,30 @@ import asyncio
 import json
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add current directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from engine.cassette import close_cassette, get_cassette, open_cassette
 from engine.trading_core import TradingEngine
 from engine.signal_generator import SignalGenerator
+from engine.order_book import format_book_features
+from engine.shard_pool import ShardPool
 from skills.skill_executor import SkillExecutor
-from utils.ipc_server import IPCServer
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.executors import configure_executors, executor_stats, run_blocking, shutdown_executors
+from utils.ipc_server import EncodedResult, IPCServer
 from utils.hot_reload import HotReloadManager
-from utils.logger import setup_logger
+from utils.logger import RateLimitedLogger, setup_logger, dropped_log_records
+from utils.loop_monitor import LoopLagMonitor
+from utils.process_stats import current_rss_bytes
+from utils.profiler import SamplingProfiler, enter_command, exit_command
+from utils.versioned_state import VersionedState
 
 logger = setup_logger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
 
 
 class MoneyMachineApp:
@@ -29,6 +40,13 @@ class MoneyMachineApp:
         self.signal_generator = None
         self.hot_reload = None
         self.ipc_server = None
+        self.shards = None
+        self.loop_monitor = LoopLagMonitor()
+        self.profiler = SamplingProfiler()
+        # Polled state: versioned, with delta replies and cached encodings
+        self.portfolio_state = VersionedState(extra_delta=self._new_trades)
+        self.status_state = VersionedState()
+        self.admission = AdmissionController()
         self.running = True
         self.config = None
     
@@ -40,19 +58,50 @@ class MoneyMachineApp:
         from utils.config import load_config
         self.config = load_config()
         
+        # Record or replay exchange and Gemini traffic (before any client is created)
+        open_cassette(self.config.get('cassette', {}))
+        
+        # Dedicated pools for blocking LLM, file and CPU work
+        configure_executors(self.config)
+        
+        # Command priorities, limits and timeouts for the IPC server
+        self.admission = AdmissionController(self.config.get('admission', {}))
+        
         # Initialize trading engine
         self.engine = TradingEngine(self.config)
         await self.engine.initialize()
         
+        # Optional analytics workers (sharded by symbol)
+        if self.config.get('shard_workers', 0) > 0:
+            self.shards = ShardPool(
+                self.config['shard_workers'],
+                token_budget=self.config.get('skill_prompt_token_budget', 120)
+            )
+            self.shards.start()
+        
         # Initialize skill executor
         self.skill_executor = SkillExecutor(
             engine=self.engine,
-            api_key=self.config.get('gemini_api_key', '')
+            api_key=self.config.get('gemini_api_key', ''),
+            max_ai_concurrency=self.config.get('skill_ai_concurrency', 4),
+            token_budget=self.config.get('skill_prompt_token_budget', 120),
+            shards=self.shards
         )
         
         # Initialize signal generator (Phase 3: The Brain)
         self.signal_generator = SignalGenerator(
-            api_key=self.config.get('gemini_api_key', '')
+            api_key=self.config.get('gemini_api_key', ''),
+            token_budget=self.config.get('prompt_token_budget', 600),
+            prompt_format=self.config.get('prompt_format', 'compact'),
+            history_config=self.config.get('signal_history', {}),
+            features=self.engine.features,
+            local_model_config=self.config.get('local_model', {}),
+            sizing_config={
+                "max_risk_per_trade": self.config.get('max_risk_per_trade', 0.02),
+                "max_gross_exposure": self.config.get('max_gross_exposure', 1.0),
+                "max_asset_exposure": self.config.get('max_asset_exposure', 0.5),
+                **self.config.get('sizing', {}),
+            }
         )
         
         # Initialize hot-reload system
@@ -70,6 +119,7 @@ class MoneyMachineApp:
         
         # Start hot-reload system
         self.hot_reload.start()
+        self.loop_monitor.start()
         
         # Start IPC server (listens for Rust commands)
         self.ipc_server = IPCServer(self.handle_command, port=port)
@@ -86,25 +136,47 @@ class MoneyMachineApp:
             "STOP_TRADING": self.cmd_stop_trading,
             "GET_PORTFOLIO": self.cmd_get_portfolio,
             "EXECUTE_SKILL": self.cmd_execute_skill,
+            "EXECUTE_SKILLS": self.cmd_execute_skills,
             "UPDATE_CONFIG": self.cmd_update_config,
             "GET_STATUS": self.cmd_get_status,
             "PING": self.cmd_ping,
             # Phase 3: AI Commands
             "GENERATE_SIGNAL": self.cmd_generate_signal,
             "GET_LAST_SIGNAL": self.cmd_get_last_signal,
+            "GET_SIGNAL_HISTORY": self.cmd_get_signal_history,
             "RELOAD_SKILLS": self.cmd_reload_skills,
+            # Orders
+            "GET_OPEN_ORDERS": self.cmd_get_open_orders,
+            "CANCEL_ORDER": self.cmd_cancel_order,
+            "GET_ORDER_BOOK": self.cmd_get_order_book,
+            "GET_QUOTES": self.cmd_get_quotes,
+            "GET_CANDLES": self.cmd_get_candles,
+            "SCAN_UNIVERSE": self.cmd_scan_universe,
+            # Diagnostics
+            "PROFILE_START": self.cmd_profile_start,
+            "PROFILE_STOP": self.cmd_profile_stop,
         }
         
         handler = handlers.get(command)
         if not handler:
             return {"error": f"Unknown command: {command}"}
         
+        token = enter_command(command)
         try:
-            result = await handler(payload)
+            result = await self.admission.run(command, handler, payload)
+            if isinstance(result, EncodedResult):
+                return result
             return {"result": result, "error": None}
+        except AdmissionRejected as e:
+            return {"error": str(e), "retry_after_ms": e.retry_after_ms}
+        except asyncio.TimeoutError:
+            hot_path_logger.warning("Command timed out: %s", command)
+            return {"error": f"{command} timed out"}
         except Exception as e:
             logger.error(f"Command error: {e}")
             return {"error": str(e)}
+        finally:
+            exit_command(token)
     
     async def cmd_ping(self, payload: dict) -> dict:
         """Health check"""
@@ -122,15 +194,84 @@ class MoneyMachineApp:
         logger.info("Trading STOPPED")
         return {"status": "trading_stopped"}
     
-    async def cmd_get_portfolio(self, payload: dict) -> dict:
-        """Return current portfolio state"""
+    async def cmd_get_portfolio(self, payload: dict) -> EncodedResult:
+        """Return current portfolio state, or only what changed since payload["since_version"]"""
+        self.portfolio_state.refresh(self.engine.state_version, self._portfolio_sections)
+        return self.portfolio_state.reply(payload.get("since_version"),
+                                          {"timestamp": self.engine.get_server_time()})
+    
+    def _portfolio_sections(self) -> dict:
+        portfolio = self.engine.portfolio
         return {
-            "balance": self.engine.portfolio.get_balance(),
-            "positions": self.engine.portfolio.get_positions(),
-            "pnl": self.engine.portfolio.calculate_pnl(),
-            "timestamp": self.engine.get_server_time()
+            "balance": portfolio.get_balance(),
+            # Positions are updated in place, so each version keeps its own copy
+            "positions": {symbol: dict(p) for symbol, p in portfolio.get_positions().items()},
+            "pnl": portfolio.calculate_pnl(),
+            "trade_count": len(portfolio.trades),
+            "risk": self.engine.risk.snapshot(),
+            "trading_mode": "paper" if self.engine.paper else "live",
         }
     
+    def _new_trades(self, old: dict, new: dict) -> dict:
+        """Trades are append-only: a delta carries the ones recorded since the old version"""
+        if new["trade_count"] <= old["trade_count"]:
+            return {}
+        return {"trades": self.engine.portfolio.trades[old["trade_count"]:new["trade_count"]]}
+    
+    async def cmd_get_open_orders(self, payload: dict) -> dict:
+        """Return resting paper orders"""
+        orders = self.engine.get_open_orders(payload.get("symbol"))
+        return {"orders": orders, "count": len(orders)}
+    
+    async def cmd_get_order_book(self, payload: dict) -> dict:
+        """Return top levels and microstructure features for a symbol"""
+        symbol = payload.get("symbol", "BTC/USDT")
+        if await self.engine.get_order_book_features(symbol) is None:
+            raise ValueError("Order book unavailable (set order_book.enabled)")
+        return self.engine.order_books.book(symbol).to_dict(payload.get("depth", 10))
+    
+    async def cmd_get_quotes(self, payload: dict) -> dict:
+        """Quote a symbol on every connected venue concurrently"""
+        symbol = payload.get("symbol", "BTC/USDT")
+        return await self.engine.exchanges.best_quotes(symbol)
+    
+    async def cmd_get_candles(self, payload: dict) -> dict:
+        """OHLCV for any timeframe (aggregated locally when candles.enabled)"""
+        symbol = payload.get("symbol", "BTC/USDT")
+        timeframe = payload.get("timeframe", "5m")
+        limit = min(int(payload.get("limit", 100)), 1000)
+        ohlcv = await self.engine.get_market_data(symbol, timeframe, limit=limit)
+        return {"symbol": symbol, "timeframe": timeframe, "ohlcv": ohlcv}
+    
+    async def cmd_profile_start(self, payload: dict) -> dict:
+        """Sample the event loop (and optionally allocations) for a bounded window"""
+        self.profiler.set_handlers({
+            name[4:].upper(): getattr(self, name) for name in dir(self) if name.startswith('cmd_')
+        })
+        return self.profiler.start(
+            duration_s=payload.get("duration_s", 30),
+            interval_ms=payload.get("interval_ms", 5),
+            memory=payload.get("memory", True),
+            traceback_frames=payload.get("traceback_frames", 16)
+        )
+    
+    async def cmd_profile_stop(self, payload: dict) -> dict:
+        """Stop profiling (if still running) and report top functions and allocation sites"""
+        await run_blocking('io', self.profiler.stop)
+        # Snapshot comparison can take a while; keep it off the loop
+        return await run_blocking(
+            'cpu', self.profiler.report,
+            top=int(payload.get("top", 25)),
+            collapsed=bool(payload.get("collapsed", False))
+        )
+    
+    async def cmd_cancel_order(self, payload: dict) -> dict:
+        """Cancel a resting order"""
+        order_id = payload.get("order_id")
+        if not order_id:
+            raise ValueError("order_id is required")
+        return await self.engine.cancel_order(order_id, payload.get("symbol"))
+    
     async def cmd_execute_skill(self, payload: dict) -> dict:
         """Execute a specific skill"""
         skill_name = payload.get("skill")
@@ -138,19 +279,73 @@ class MoneyMachineApp:
         
         return await self.skill_executor.execute_skill(skill_name, params)
     
+    async def cmd_execute_skills(self, payload: dict) -> dict:
+        """Execute all applicable skills over one shared snapshot per symbol"""
+        symbols = payload.get("symbols") or [payload.get("symbol", "BTC/USDT")]
+        
+        return await self.skill_executor.execute_skills(
+            symbols,
+            skill_names=payload.get("skills"),
+            params=payload.get("params", {})
+        )
+    
     async def cmd_update_config(self, payload: dict) -> dict:
         """Update configuration"""
         await self.engine.update_config(payload)
         return {"status": "config_updated"}
     
-    async def cmd_get_status(self, payload: dict) -> dict:
-        """Get engine status"""
+    async def cmd_get_status(self, payload: dict) -> EncodedResult:
+        """Get engine status, or only the sections that changed since payload["since_version"]"""
+        self.status_state.publish(self._status_sections())
+        return self.status_state.reply(payload.get("since_version"), {
+            "uptime_seconds": self.engine.get_uptime(),
+            "live": self._live_status(),
+        })
+    
+    def _status_sections(self) -> dict:
+        """Versioned status: only what changes on real events, so idle polls stay unchanged"""
         return {
             "trading_active": self.engine.trading_active,
             "connected": self.engine.is_connected(),
             "skills_loaded": len(self.skill_executor.loaded_skills),
-            "uptime_seconds": self.engine.get_uptime(),
-            "ai_enabled": self.signal_generator.model is not None
+            "ai_enabled": self.signal_generator.model is not None,
+            "trading_mode": "paper" if self.engine.paper else "live",
+        }
+    
+    def _live_status(self) -> dict:
+        """Telemetry that moves on every poll; sent with each reply, never versioned"""
+        return {
+            "loop_lag": self.loop_monitor.stats(),
+            "memory": {
+                "rss_bytes": current_rss_bytes(),
+                "signals_cached": len(self.signal_generator.last_signals),
+                "signal_history": self.signal_generator.history.stats(),
+                "trades_recorded": len(self.engine.portfolio.trades),
+            },
+            "ipc": {
+                "open_connections": self.ipc_server.open_connections if self.ipc_server else 0,
+                "total_connections": self.ipc_server.total_connections if self.ipc_server else 0,
+            },
+            "order_books": self.engine.order_books.stats(),
+            "venues": self.engine.exchanges.stats(),
+            "candles": self.engine.candles.stats(),
+            "features": self.engine.features.stats(),
+            "shards": self.shards.stats() if self.shards else None,
+            "executors": executor_stats(),
+            "admission": self.admission.stats(),
+            "cassette": get_cassette().stats() if get_cassette() else None,
+            "dropped_log_records": dropped_log_records(),
+            "local_model": self.signal_generator.local.stats(),
+            "sizing": self.signal_generator.sizer.stats(),
+            "scanner": self.engine.scanner.stats(),
+            "prompt_stats": {
+                "signals": self.signal_generator.prompt_stats.to_dict(),
+                "skills": self.skill_executor.prompt_stats.to_dict()
+            },
+            "polling": {
+                "portfolio": self.portfolio_state.stats(),
+                "status": self.status_state.stats(),
+            }
         }
     
     # === Phase 3: AI Signal Commands ===
@@ -160,17 +355,49 @@ class MoneyMachineApp:
         symbol = payload.get("symbol", "BTC/USDT")
         
         # Get market data
-        market_data = await self.engine.get_market_data(symbol)
+        timeframe = payload.get("timeframe", "5m")
+        market_data = await self.engine.get_market_data(symbol, timeframe)
+        
+        book = await self.engine.get_order_book_features(symbol)
         
         # Generate signal using AI
         signal = await self.signal_generator.generate_signal(
             symbol=symbol,
             market_data=market_data,
-            portfolio_balance=self.engine.portfolio.get_balance()
+            portfolio_balance=self.engine.portfolio.get_balance(),
+            additional_context=format_book_features(book) if book else "",
+            features=self.engine.get_features(symbol, market_data, timeframe)
         )
         
         return signal.to_dict()
     
+    async def cmd_scan_universe(self, payload: dict) -> dict:
+        """Screen the whole universe and generate signals for the top K symbols only"""
+        scan = await self.engine.scanner.scan(payload.get("top_k"), payload.get("symbols"))
+        result = scan.to_dict()
+        if not payload.get("generate", True):
+            return result
+        
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.config.get('scanner', {}).get('signal_concurrency', 4))
+        balance = self.engine.portfolio.get_balance()
+        
+        async def generate(symbol: str):
+            async with semaphore:
+                ohlcv = scan.ohlcv[symbol]
+                signal = await self.signal_generator.generate_signal(
+                    symbol=symbol,
+                    market_data=ohlcv,
+                    portfolio_balance=balance,
+                    features=self.engine.get_features(symbol, ohlcv)
+                )
+                return signal.to_dict()
+        
+        symbols = [r["symbol"] for r in scan.ranked]
+        result["signals"] = dict(zip(symbols, await asyncio.gather(*(generate(s) for s in symbols))))
+        result["timings_ms"]["signals"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+    
     async def cmd_get_last_signal(self, payload: dict) -> dict:
         """Get the last generated signal for a symbol"""
         symbol = payload.get("symbol", "BTC/USDT")
@@ -180,10 +407,20 @@ class MoneyMachineApp:
             return signal.to_dict()
         return {"error": "No signal found for symbol"}
     
+    async def cmd_get_signal_history(self, payload: dict) -> dict:
+        """Past signals for a symbol in a time range (seconds), paged by cursor"""
+        return self.signal_generator.history.query(
+            payload.get("symbol", "BTC/USDT"),
+            start=payload.get("start"),
+            end=payload.get("end"),
+            limit=min(int(payload.get("limit", 100)), 1000),
+            cursor=payload.get("cursor")
+        )
+    
     async def cmd_reload_skills(self, payload: dict) -> dict:
         """Manually trigger skill reload"""
         old_count = len(self.skill_executor.loaded_skills)
-        self.skill_executor.reload_skills()
+        await run_blocking('cpu', self.skill_executor.reload_skills)
         new_count = len(self.skill_executor.loaded_skills)
         
         return {
@@ -207,6 +444,14 @@ async def main():
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         sys.exit(1)
+    finally:
+        if app.shards:
+            app.shards.stop()
+        if app.signal_generator:
+            app.signal_generator.history.flush()
+            app.signal_generator.local.flush()
+        shutdown_executors()
+        close_cassette()
 
 
 if __name__ == "__main__":
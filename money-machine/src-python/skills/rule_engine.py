@@ -0,0 +1,277 @@
+"""
+Rule Engine - declarative AIX entry/exit/risk rules compiled to NumPy evaluators
+Rules are compiled once at skill load and evaluated without any LLM call
+"""
+
+import ast
+import operator
+from typing import Callable, Dict, List, Optional, Any
+
+import numpy as np
+
+from engine.indicators import (
+    MarketSeries, sma, ema, rsi, roc, prev, highest, lowest, stdev,
+    crosses_above, crosses_below,
+)
+
+
+class RuleCompileError(ValueError):
+    """Raised when a skill rule expression is invalid"""
+
+
+# Single-series indicators: fn(source, [period])
+INDICATORS: Dict[str, Callable] = {
+    'sma': sma, 'ema': ema, 'rsi': rsi, 'roc': roc, 'prev': prev,
+    'highest': highest, 'lowest': lowest, 'stdev': stdev,
+}
+# Indicators that default to the close series when called with only a period
+CLOSE_DEFAULT = {'rsi', 'roc', 'sma', 'ema'}
+PAIRWISE = {'crosses_above': crosses_above, 'crosses_below': crosses_below}
+SERIES_NAMES = {'open', 'high', 'low', 'close', 'volume'}
+ALIASES = {'price': 'close'}
+
+_BINOPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_CMPOPS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+Evaluator = Callable[[MarketSeries], Any]
+
+
+def compile_expression(expr: str) -> Evaluator:
+    """Compile a rule expression such as 'rsi(14) < 30' into an evaluator"""
+    try:
+        tree = ast.parse(str(expr), mode='eval')
+    except SyntaxError as e:
+        raise RuleCompileError(f"Invalid rule '{expr}': {e.msg}")
+    return _compile_node(tree.body, expr)
+
+
+def _compile_node(node: ast.AST, expr: str) -> Evaluator:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda s: value
+
+    if isinstance(node, ast.Name):
+        name = ALIASES.get(node.id, node.id)
+        if name in SERIES_NAMES:
+            return lambda s: s.column(name)
+        return lambda s: _feature(s, name, expr)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+        op = _BINOPS[type(node.op)]
+        left, right = _compile_node(node.left, expr), _compile_node(node.right, expr)
+        return lambda s: op(left(s), right(s))
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, expr)
+        if isinstance(node.op, ast.USub):
+            return lambda s: -operand(s)
+        if isinstance(node.op, ast.Not):
+            return lambda s: np.logical_not(operand(s))
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, expr) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def _boolop(s):
+            result = parts[0](s)
+            for part in parts[1:]:
+                result = combine(result, part(s))
+            return result
+        return _boolop
+
+    if isinstance(node, ast.Compare) and all(type(op) in _CMPOPS for op in node.ops):
+        operands = [_compile_node(node.left, expr)] + [_compile_node(c, expr) for c in node.comparators]
+        ops = [_CMPOPS[type(op)] for op in node.ops]
+
+        def _compare(s):
+            values = [fn(s) for fn in operands]
+            with np.errstate(invalid='ignore'):
+                result = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+            return result
+        return _compare
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        return _compile_call(node, expr)
+
+    raise RuleCompileError(f"Unsupported syntax in rule '{expr}': {ast.dump(node)[:60]}")
+
+
+def _compile_call(node: ast.Call, expr: str) -> Evaluator:
+    name = node.func.id
+    memo_key = ast.dump(node)
+
+    if name in PAIRWISE:
+        if len(node.args) != 2:
+            raise RuleCompileError(f"{name}() takes two series in rule '{expr}'")
+        fn = PAIRWISE[name]
+        a, b = (_compile_node(arg, expr) for arg in node.args)
+        return _memoized(memo_key, lambda s: fn(a(s), b(s)))
+
+    if name not in INDICATORS:
+        raise RuleCompileError(f"Unknown function '{name}' in rule '{expr}'")
+
+    args = list(node.args)
+    if args and _is_number_literal(args[-1]):
+        period = ast.literal_eval(args.pop())
+        if not isinstance(period, int) or period < 1:
+            raise RuleCompileError(f"{name}() period must be a positive integer in rule '{expr}'")
+        period_args = (period,)
+    else:
+        period_args = ()
+
+    if not args:
+        if name not in CLOSE_DEFAULT:
+            raise RuleCompileError(f"{name}() needs a source series in rule '{expr}'")
+        source = lambda s: s.column('close')
+    elif len(args) == 1:
+        source = _compile_node(args[0], expr)
+    else:
+        raise RuleCompileError(f"Too many arguments to {name}() in rule '{expr}'")
+
+    fn = INDICATORS[name]
+
+    def _indicator(s):
+        return fn(np.asarray(source(s), dtype=float), *period_args)
+    return _memoized(memo_key, _indicator)
+
+
+def _is_number_literal(node: ast.AST) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+
+
+def _memoized(key: str, fn: Evaluator) -> Evaluator:
+    def _cached(s: MarketSeries):
+        if key not in s.memo:
+            s.memo[key] = fn(s)
+        return s.memo[key]
+    return _cached
+
+
+def _feature(s: MarketSeries, name: str, expr: str):
+    if name not in s.features:
+        raise KeyError(f"Unknown variable '{name}' in rule '{expr}'")
+    value = s.features[name]
+    return np.nan if value is None else value
+
+
+def _last(value) -> np.ndarray:
+    """Latest bar of an evaluated condition (scalar per symbol)"""
+    arr = np.asarray(value)
+    return arr[..., -1] if arr.ndim else arr
+
+
+class ConditionSet:
+    """A list of conditions that must all hold on the latest bar"""
+
+    def __init__(self, expressions: Optional[List[str]]):
+        if isinstance(expressions, str):
+            expressions = [expressions]
+        self.expressions = list(expressions or [])
+        self._evaluators = [compile_expression(e) for e in self.expressions]
+
+    def __bool__(self) -> bool:
+        return bool(self._evaluators)
+
+    def evaluate(self, series: MarketSeries) -> np.ndarray:
+        if not self._evaluators or len(series) == 0:
+            return np.zeros(series.column('close').shape[:-1], dtype=bool)
+        result = np.ones(series.column('close').shape[:-1], dtype=bool)
+        for evaluator in self._evaluators:
+            result &= np.asarray(_last(evaluator(series)), dtype=bool)
+        return result
+
+
+class CompiledRules:
+    """Compiled entry/exit/risk section of an AIX skill"""
+
+    def __init__(self, spec: Dict):
+        if not isinstance(spec, dict):
+            raise RuleCompileError("'rules' must be a mapping with entry/exit/risk sections")
+
+        entry = spec.get('entry') or {}
+        exit_ = spec.get('exit') or {}
+        risk = spec.get('risk') or {}
+
+        self.buy = ConditionSet(entry.get('buy'))
+        self.sell = ConditionSet(entry.get('sell'))
+        self.exit_long = ConditionSet(exit_.get('long'))
+        self.exit_short = ConditionSet(exit_.get('short'))
+
+        self.stop_loss_pct = float(exit_.get('stop_loss_pct', 0) or 0)
+        self.take_profit_pct = float(exit_.get('take_profit_pct', 0) or 0)
+        self.confidence = float(spec.get('confidence', 0.6))
+        self.max_position_pct = float(risk.get('max_position_pct', 2.0))
+        self.max_concurrent_positions = risk.get('max_concurrent_positions')
+
+        if not (self.buy or self.sell):
+            raise RuleCompileError("'rules.entry' needs at least one buy or sell condition")
+
+    def evaluate(self, series: MarketSeries, position_amount: float = 0.0,
+                 open_positions: int = 0, entry_price: Optional[float] = None) -> Dict:
+        """Evaluate against a single-symbol series and return a skill decision
+
+        With an open position, the stop loss / take profit (against entry_price)
+        and the exit conditions are checked first, and entries in the position's
+        direction are suppressed.
+        """
+        if len(series) == 0:
+            return self._decision('HOLD', 0.0, "No market data", None)
+
+        price = float(series.column('close')[-1])
+
+        if position_amount and entry_price:
+            exit_action = 'SELL' if position_amount > 0 else 'BUY'
+            move_pct = (price / entry_price - 1) * 100 * (1 if position_amount > 0 else -1)
+            if self.stop_loss_pct and move_pct <= -self.stop_loss_pct:
+                return self._decision(exit_action, self.confidence,
+                                      f"Stop loss: {move_pct:+.2f}% from entry {entry_price:g}", price)
+            if self.take_profit_pct and move_pct >= self.take_profit_pct:
+                return self._decision(exit_action, self.confidence,
+                                      f"Take profit: {move_pct:+.2f}% from entry {entry_price:g}", price)
+
+        if position_amount > 0 and self.exit_long and self.exit_long.evaluate(series):
+            return self._decision('SELL', self.confidence, "Exit long: " + " and ".join(self.exit_long.expressions), price)
+        if position_amount < 0 and self.exit_short and self.exit_short.evaluate(series):
+            return self._decision('BUY', self.confidence, "Exit short: " + " and ".join(self.exit_short.expressions), price)
+
+        if position_amount == 0 and self.max_concurrent_positions is not None \
+                and open_positions >= int(self.max_concurrent_positions):
+            return self._decision('HOLD', 0.5, "Max concurrent positions reached", price)
+
+        if self.buy and self.buy.evaluate(series):
+            if position_amount > 0:
+                return self._decision('HOLD', 0.5, "Already long", price)
+            return self._entry('BUY', price, self.buy)
+        if self.sell and self.sell.evaluate(series):
+            if position_amount < 0:
+                return self._decision('HOLD', 0.5, "Already short", price)
+            return self._entry('SELL', price, self.sell)
+
+        return self._decision('HOLD', 0.5, "Entry conditions not met", price)
+
+    def _entry(self, action: str, price: float, conditions: ConditionSet) -> Dict:
+        decision = self._decision(action, self.confidence, " and ".join(conditions.expressions), price)
+        direction = 1 if action == 'BUY' else -1
+        if self.stop_loss_pct:
+            decision['stop_loss'] = price * (1 - direction * self.stop_loss_pct / 100)
+        if self.take_profit_pct:
+            decision['take_profit'] = price * (1 + direction * self.take_profit_pct / 100)
+        decision['params'] = {"amount_pct": self.max_position_pct / 100, "price": price}
+        return decision
+
+    @staticmethod
+    def _decision(action: str, confidence: float, reason: str, price: Optional[float]) -> Dict:
+        return {
+            "decision": action,
+            "confidence": confidence,
+            "reason": f"Rule-based: {reason}",
+            "price": price,
+        }
@@ -0,0 +1,182 @@
+"""
+Compiled Skill Cache - parsed AIX frontmatter keyed by content hash
+Unchanged skill files skip YAML parsing on startup and on every reload
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# libyaml bindings are several times faster than the pure-Python loader
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_FORMAT_VERSION = 2
+
+
+class SkillCache:
+    """Content-hash keyed cache of compiled skill definitions"""
+
+    # Static response contract appended to every skill's system prompt
+    PROMPT_SUFFIX = """
+Each request contains compact market data and the portfolio state.
+Based on that data and your strategy rules, make a trading decision.
+Respond with a strict JSON object containing:
+- decision: "BUY", "SELL", or "HOLD"
+- confidence: 0.0 to 1.0
+- reason: brief explanation
+- params: {amount, price} if applicable
+"""
+
+    def __init__(self, cache_path: Optional[Path] = None, lazy_body_threshold: int = 4096):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.lazy_body_threshold = lazy_body_threshold
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        self._load_from_disk()
+
+    def _load_from_disk(self):
+        """Load persisted compiled entries, ignoring stale or corrupt caches"""
+        if not self.cache_path or not self.cache_path.exists():
+            return
+
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_FORMAT_VERSION:
+                self._entries = data.get('entries', {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable skill cache {self.cache_path}: {e}")
+
+    def save(self, live_hashes: Optional[set] = None):
+        """Persist compiled entries, dropping those no longer backed by a file"""
+        with self._lock:
+            if live_hashes is not None:
+                for content_hash in list(self._entries):
+                    if content_hash not in live_hashes:
+                        del self._entries[content_hash]
+                        self._dirty = True
+
+            if not self.cache_path or not self._dirty:
+                return
+
+            try:
+                tmp_path = self.cache_path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(
+                        {"version": CACHE_FORMAT_VERSION, "entries": self._entries},
+                        f, default=str
+                    )
+                tmp_path.replace(self.cache_path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning(f"Could not write skill cache {self.cache_path}: {e}")
+
+    def load_skill(self, filepath: Path) -> Optional[Dict]:
+        """Return a skill dict for the file, compiling it only on a cache miss"""
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+
+        content_hash = hashlib.sha256(raw).hexdigest()
+
+        with self._lock:
+            entry = self._entries.get(content_hash)
+
+        if entry is None:
+            entry = self._compile(raw)
+            with self._lock:
+                self._entries[content_hash] = entry
+                self._dirty = True
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        if entry['frontmatter'] is None:
+            return None
+
+        skill = dict(entry['frontmatter'])
+        skill['_content_hash'] = content_hash
+        if entry['system_instruction'] is not None:
+            skill['_system_instruction'] = entry['system_instruction']
+
+        if entry['has_body']:
+            body_offset = entry['body_offset']
+            if len(raw) - body_offset <= self.lazy_body_threshold:
+                skill['_raw_content'] = raw[body_offset:].decode('utf-8')
+            else:
+                # Large bodies stay on disk until first execution
+                skill['_body_path'] = str(filepath)
+                skill['_body_offset'] = body_offset
+
+        return skill
+
+    def _compile(self, raw: bytes) -> Dict[str, Any]:
+        """Parse YAML (frontmatter or plain) and pre-render the system instruction"""
+        content = raw.decode('utf-8')
+        frontmatter = None
+        body_offset = 0
+        has_body = False
+
+        # Handle YAML frontmatter format
+        if content.startswith('---'):
+            parts = content.split('---', 2)
+            if len(parts) >= 2:
+                frontmatter = yaml.load(parts[1], Loader=_YamlLoader)
+                if frontmatter:
+                    has_body = True
+                    body_offset = len(('---' + parts[1] + '---').encode('utf-8'))
+
+        # Plain YAML
+        if not frontmatter:
+            frontmatter = yaml.load(content, Loader=_YamlLoader)
+            has_body = False
+
+        if not isinstance(frontmatter, dict):
+            frontmatter = None
+        else:
+            # Same JSON types a cache hit returns (dates become strings), so hits and misses match
+            frontmatter = json.loads(json.dumps(frontmatter, default=str))
+
+        system_instruction = None
+        if frontmatter and 'system_prompt' in frontmatter:
+            system_instruction = self.render_system_instruction(frontmatter['system_prompt'])
+
+        return {
+            "frontmatter": frontmatter,
+            "has_body": has_body,
+            "body_offset": body_offset,
+            "system_instruction": system_instruction,
+        }
+
+    @classmethod
+    def render_system_instruction(cls, system_prompt: str) -> str:
+        """Static per-skill prompt prefix: strategy text plus the response contract"""
+        return f"{str(system_prompt).rstrip()}\n{cls.PROMPT_SUFFIX}"
+
+    @staticmethod
+    def load_body(skill: Dict) -> str:
+        """Load (and memoize on the skill) a lazily deferred markdown body"""
+        if '_raw_content' in skill:
+            return skill['_raw_content']
+
+        body_path = skill.get('_body_path')
+        if not body_path:
+            return ""
+
+        with open(body_path, 'rb') as f:
+            f.seek(skill['_body_offset'])
+            body = f.read().decode('utf-8')
+
+        skill['_raw_content'] = body
+        return body
@@ -3,34 +3,67 @@ AIX Format Skill Executor - Runs trading strategies as skills
 Refactored to use Gemini API for decision making
 """
 
-import yaml
 import json
 import asyncio
 from pathlib import Path
 from typing import Dict, Optional, List, Any
 import logging
 import os
+from datetime import datetime
+
+from skills.skill_cache import SkillCache
+from engine.cassette import llm_available, load_genai
+from utils.executors import run_blocking
+from utils.logger import RateLimitedLogger
+from skills.rule_engine import CompiledRules
+from engine.market_snapshot import MarketSnapshot
+from engine.order_book import format_book_features
+from engine.shard_pool import ShardPool
+from engine.signal_generator import PromptStats, stream_json_completion
 
 logger = logging.getLogger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=30.0)
 
 
 class SkillExecutor:
     """Executes AIX-format trading skills"""
     
-    def __init__(self, engine, api_key: str = ""):
+    def __init__(
+        self,
+        engine,
+        api_key: str = "",
+        max_ai_concurrency: int = 4,
+        token_budget: int = 120,
+        skills_dir: Optional[Path] = None,
+        shards: Optional[ShardPool] = None
+    ):
         self.engine = engine
+        self.shards = shards
+        self.skills_dir = Path(skills_dir) if skills_dir else Path(__file__).parent
         self.api_key = api_key
+        self.max_ai_concurrency = max(1, int(max_ai_concurrency))
         self.model = None
         self.loaded_skills: Dict[str, Dict] = {}
+        # Candle context and closed-bar features are shared with the signal generator
+        self.features = engine.features
+        self.context = engine.features.context
+        self.token_budget = token_budget
+        self.prompt_stats = PromptStats()
+        self._cache = SkillCache(self.skills_dir / ".skill_cache.json")
+        self._compiled_rules: Dict[str, CompiledRules] = {}
+        self._genai = None
+        self._model_name = None
+        self._skill_models: Dict[str, Any] = {}
         
         # Initialize Gemini if API key provided
-        if api_key:
+        if llm_available(api_key):
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=api_key)
+                genai = load_genai(api_key)
                 # Use standard flash model for skills
                 model_name = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
                 self.model = genai.GenerativeModel(model_name)
+                self._genai = genai
+                self._model_name = model_name
                 logger.info(f"✅ SkillExecutor using Gemini model: {model_name}")
             except ImportError:
                 logger.warning("Google Generative AI SDK not installed. AI skills disabled.")
@@ -40,47 +73,49 @@ class SkillExecutor:
     
     def _load_skills(self):
         """Load AIX format skills from ./skills directory"""
-        skills_dir = Path(__file__).parent
+        skills_dir = self.skills_dir
         
-        # Load .aix files
-        for skill_file in skills_dir.glob("*.aix"):
-            try:
-                skill = self._parse_aix_file(skill_file)
-                if skill:
-                    self.loaded_skills[skill['name']] = skill
-                    logger.info(f"Loaded skill: {skill['name']}")
-            except Exception as e:
-                logger.error(f"Error loading skill {skill_file}: {e}")
+        skill_files = list(skills_dir.glob("*.aix"))
+        skill_files += [
+            f for f in skills_dir.glob("*.yaml")
+            if f.name != "example_skill.yaml"  # Skip example
+        ]
         
-        # Load .yaml files
-        for skill_file in skills_dir.glob("*.yaml"):
-            if skill_file.name == "example_skill.yaml":
-                continue  # Skip example
+        # Parsed serially: YAML parsing holds the GIL, and cache hits only hash the file contents
+        loaded: Dict[str, Dict] = {}
+        live_hashes = set()
+        for skill_file in skill_files:
+            skill = self._parse_aix_file(skill_file)
+            if not skill:
+                continue
             try:
-                skill = self._parse_aix_file(skill_file)
-                if skill:
-                    self.loaded_skills[skill['name']] = skill
-                    logger.info(f"Loaded skill: {skill['name']}")
+                loaded[skill['name']] = skill
+                live_hashes.add(skill['_content_hash'])
+                logger.info(f"Loaded skill: {skill['name']}")
             except Exception as e:
                 logger.error(f"Error loading skill {skill_file}: {e}")
+        
+        # Swapped in whole, so a reload off the event loop never exposes a partial set
+        self.loaded_skills = loaded
+        self._cache.save(live_hashes)
+        for cache in (self._compiled_rules, self._skill_models):
+            for content_hash in list(cache):
+                if content_hash not in live_hashes:
+                    del cache[content_hash]
     
     def _parse_aix_file(self, filepath: Path) -> Optional[Dict]:
-        """Parse AIX format YAML"""
+        """Parse AIX format YAML (served from the compiled cache when unchanged)"""
         try:
-            with open(filepath, 'r') as f:
-                content = f.read()
-            
-            # Handle YAML frontmatter format
-            if content.startswith('---'):
-                parts = content.split('---', 2)
-                if len(parts) >= 2:
-                    frontmatter = yaml.safe_load(parts[1])
-                    if frontmatter:
-                        frontmatter['_raw_content'] = parts[2] if len(parts) > 2 else ""
-                        return frontmatter
-            
-            # Plain YAML
-            return yaml.safe_load(content)
+            skill = self._cache.load_skill(filepath)
+            if skill and skill.get('rules'):
+                # Rules are compiled once per file content and reused across reloads
+                content_hash = skill['_content_hash']
+                compiled = self._compiled_rules.get(content_hash)
+                if compiled is None:
+                    compiled = CompiledRules(skill['rules'])
+                    self._compiled_rules[content_hash] = compiled
+                skill['_rules'] = compiled
+            return skill
         except Exception as e:
             logger.error(f"Error parsing {filepath}: {e}")
             return None
@@ -95,55 +130,246 @@ class SkillExecutor:
         try:
             # Get market context
             symbol = params.get('symbol', 'BTC/USDT')
-            market_data = await self.engine.get_market_data(symbol)
+            snapshot = await self.take_snapshot(symbol)
             
-            # If AI is available and skill has a system prompt
-            if self.model and 'system_prompt' in skill:
-                decision = await self._get_ai_decision(skill, market_data, params)
-                return decision
-            
-            # Otherwise, use rule-based execution from skill
-            return await self._rule_based_execution(skill, market_data, params)
+            return await self._evaluate_skill(skill, snapshot, params)
         
         except Exception as e:
             logger.error(f"Skill execution error: {e}")
             return {"error": str(e)}
     
-    async def _get_ai_decision(self, skill: Dict, market_data: List, params: Dict) -> Dict:
+    async def execute_skills(
+        self,
+        symbols: List[str],
+        skill_names: Optional[List[str]] = None,
+        params: Optional[Dict] = None
+    ) -> Dict:
+        """Evaluate every applicable skill against one shared snapshot per symbol"""
+        params = params or {}
+        start_time = datetime.now()
+        
+        if skill_names:
+            missing = [name for name in skill_names if name not in self.loaded_skills]
+            if missing:
+                return {"error": f"Skills not found: {', '.join(missing)}"}
+            skills = [self.loaded_skills[name] for name in skill_names]
+        else:
+            skills = list(self.loaded_skills.values())
+        
+        # One market data fetch and one portfolio read per symbol
+        analyses: Dict[str, Dict] = {}
+        if self.shards:
+            snapshots, analyses = await self._take_sharded_snapshots(symbols, skills)
+        else:
+            snapshots = await asyncio.gather(*(self.take_snapshot(symbol) for symbol in symbols))
+        
+        semaphore = asyncio.Semaphore(self.max_ai_concurrency)
+        
+        async def run(skill: Dict, snapshot: MarketSnapshot) -> Dict:
+            skill_params = {**params, 'symbol': snapshot.symbol}
+            analysis = analyses.get(snapshot.symbol)
+            try:
+                if analysis and analysis.get('error'):
+                    decision = {"error": analysis['error'], "decision": "HOLD"}
+                elif analysis and skill.get('name') in analysis['decisions']:
+                    # Rules already evaluated by the symbol's shard worker
+                    decision = dict(analysis['decisions'][skill['name']])
+                elif self._uses_ai(skill):
+                    async with semaphore:
+                        decision = await self._evaluate_skill(
+                            skill, snapshot, skill_params,
+                            market_context=analysis['context'] if analysis else None
+                        )
+                else:
+                    decision = await self._evaluate_skill(skill, snapshot, skill_params)
+            except Exception as e:
+                logger.error(f"Skill execution error: {e}")
+                decision = {"error": str(e), "decision": "HOLD"}
+            
+            decision['symbol'] = snapshot.symbol
+            decision['skill'] = skill.get('name', 'unknown')
+            return decision
+        
+        tasks = [
+            run(skill, snapshot)
+            for snapshot in snapshots
+            for skill in skills
+            if self._applies_to(skill, snapshot.symbol)
+        ]
+        decisions = await asyncio.gather(*tasks)
+        
+        return {
+            "decisions": self._rank_decisions(decisions),
+            "by_symbol": self._aggregate_by_symbol(decisions),
+            "symbols": len(snapshots),
+            "skills_evaluated": len(decisions),
+            "elapsed_ms": (datetime.now() - start_time).total_seconds() * 1000
+        }
+    
+    async def take_snapshot(self, symbol: str) -> MarketSnapshot:
+        """Capture candles, indicators and portfolio state for a symbol"""
+        market_data = await self.engine.get_market_data(symbol)
+        return MarketSnapshot.build(
+            symbol,
+            market_data,
+            balance=self.engine.portfolio.get_balance(),
+            positions=self.engine.portfolio.get_positions(),
+            book=await self.engine.get_order_book_features(symbol),
+            features=self.engine.get_features(symbol, market_data)
+        )
+    
+    async def _take_sharded_snapshots(self, symbols: List[str], skills: List[Dict]):
+        """Fetch market data here, and compute indicators, prompt context and rule
+        decisions in each symbol's shard worker"""
+        market_data, books = await asyncio.gather(
+            asyncio.gather(*(self.engine.get_market_data(symbol) for symbol in symbols)),
+            asyncio.gather(*(self.engine.get_order_book_features(symbol) for symbol in symbols))
+        )
+        positions = self.engine.portfolio.get_positions()
+        rule_skills = {s['name']: s for s in skills if 'rules' in s and not self._uses_ai(s)}
+        needs_context = any(self._uses_ai(s) for s in skills)
+        
+        items = []
+        for symbol, ohlcv, book in zip(symbols, market_data, books):
+            position = positions.get(symbol) or {}
+            items.append({
+                "symbol": symbol,
+                "ohlcv": ohlcv,
+                "skills": [name for name, s in rule_skills.items() if self._applies_to(s, symbol)],
+                "position_amount": float(position.get('amount', 0) or 0),
+                "entry_price": position.get('entry_price'),
+                "open_positions": len(positions),
+                "features": dict(book) if book else None,
+                "context": needs_context,
+            })
+        
+        rules = {name: (s['_content_hash'], s['rules']) for name, s in rule_skills.items()}
+        results = await self.shards.analyze(items, rules=rules)
+        
+        snapshots = [
+            MarketSnapshot.build(
+                symbol, ohlcv,
+                balance=self.engine.portfolio.get_balance(),
+                positions=positions,
+                book=book,
+                indicators=result['indicators'],
+                features=self.engine.get_features(symbol, ohlcv)
+            )
+            for symbol, ohlcv, book, result in zip(symbols, market_data, books, results)
+        ]
+        return snapshots, dict(zip(symbols, results))
+    
+    async def _evaluate_skill(
+        self,
+        skill: Dict,
+        snapshot: MarketSnapshot,
+        params: Dict,
+        market_context: Optional[str] = None
+    ) -> Dict:
+        """Run one skill against a snapshot, through Gemini or its compiled rules"""
+        # Deferred markdown bodies are read on first execution
+        if '_raw_content' not in skill and '_body_path' in skill:
+            await run_blocking('io', SkillCache.load_body, skill)
+        
+        # If AI is available and skill has a system prompt
+        if self._uses_ai(skill):
+            return await self._get_ai_decision(skill, snapshot, params, market_context)
+        
+        # Otherwise, use rule-based execution from skill
+        return await self._rule_based_execution(skill, snapshot, params)
+    
+    def _uses_ai(self, skill: Dict) -> bool:
+        return self.model is not None and 'system_prompt' in skill
+    
+    @staticmethod
+    def _applies_to(skill: Dict, symbol: str) -> bool:
+        symbols = skill.get('symbols')
+        return not symbols or symbol in symbols
+    
+    @staticmethod
+    def _rank_decisions(decisions: List[Dict]) -> List[Dict]:
+        """Actionable decisions first, by confidence; errors last"""
+        def rank_key(decision: Dict):
+            action = str(decision.get('decision', 'HOLD')).upper()
+            actionable = action in ('BUY', 'SELL') and not decision.get('error')
+            try:
+                confidence = float(decision.get('confidence', 0) or 0)
+            except (TypeError, ValueError):
+                confidence = 0.0
+            return (bool(decision.get('error')), not actionable, -confidence)
+        
+        return sorted(decisions, key=rank_key)
+    
+    @staticmethod
+    def _aggregate_by_symbol(decisions: List[Dict]) -> Dict[str, Dict]:
+        """Confidence-weighted consensus per symbol (BUY positive, SELL negative)"""
+        summary: Dict[str, Dict] = {}
+        for decision in decisions:
+            entry = summary.setdefault(
+                decision['symbol'], {"score": 0.0, "buy": 0, "sell": 0, "hold": 0}
+            )
+            if decision.get('error'):
+                continue
+            action = str(decision.get('decision', 'HOLD')).upper()
+            try:
+                confidence = float(decision.get('confidence', 0) or 0)
+            except (TypeError, ValueError):
+                confidence = 0.0
+            if action == 'BUY':
+                entry['buy'] += 1
+                entry['score'] += confidence
+            elif action == 'SELL':
+                entry['sell'] += 1
+                entry['score'] -= confidence
+            else:
+                entry['hold'] += 1
+        
+        for entry in summary.values():
+            entry['action'] = 'BUY' if entry['score'] > 0 else 'SELL' if entry['score'] < 0 else 'HOLD'
+        return summary
+    
+    async def _get_ai_decision(
+        self,
+        skill: Dict,
+        snapshot: MarketSnapshot,
+        params: Dict,
+        market_context: Optional[str] = None
+    ) -> Dict:
         """Get trading decision from Gemini API"""
         try:
-            # Build prompt
-            system_prompt = skill['system_prompt']
+            features = snapshot.features
+            if features is None:
+                # Snapshot taken outside the engine: bring context and features up to date
+                features = self.features.update(snapshot.symbol, snapshot.market_data)
+            if market_context is None:
+                market_context = self.context.get_compact_context(snapshot.symbol, self.token_budget,
+                                                                  features.timeframe)
+            user_message = (
+                market_context
+                + f"\n{features.render()}"
+                + (f"\n{format_book_features(snapshot.book)}" if snapshot.book else "")
+                + "\n\nPortfolio State: "
+                + json.dumps(snapshot.portfolio_state(), separators=(',', ':'))
+            )
             
-            # Add market context
-            portfolio_state = {
-                "balance": self.engine.portfolio.get_balance(),
-                "positions": self.engine.portfolio.get_positions()
-            }
+            model = self._get_skill_model(skill)
+            if model is self.model:
+                # No per-skill model available - send the static prefix inline
+                user_message = self._system_instruction(skill) + "\n" + user_message
             
-            user_message = f"""{system_prompt}
-
-Market Data (last 5 candles): {json.dumps(market_data[-5:] if market_data else [])}
-
-Portfolio State: {json.dumps(portfolio_state)}
-
-Based on the above data and your strategy rules, make a trading decision.
-Respond with a strict JSON object containing:
-- decision: "BUY", "SELL", or "HOLD"
-- confidence: 0.0 to 1.0
-- reason: brief explanation
-- params: {{amount, price}} if applicable
-"""
-            
-            # Call Gemini API
-            response = await asyncio.to_thread(
-                self.model.generate_content,
+            # Call Gemini API, parsing the decision while the reason is still streaming
+            result = await stream_json_completion(
+                model,
                 user_message,
+                ('decision', 'confidence'),
                 generation_config={"response_mime_type": "application/json"}
             )
+            self.prompt_stats.record(user_message, result.response, result.latency_ms, result.decision_ms)
             
             # Parse response
-            response_text = response.text
+            if result.parser.done:
+                return result.parser.fields
+            response_text = result.parser.text
             
             try:
                 decision = json.loads(response_text)
@@ -164,20 +390,53 @@ Respond with a strict JSON object containing:
             }
         
         except Exception as e:
-            logger.error(f"Gemini API error: {e}")
+            hot_path_logger.error("Gemini API error: %s", e)
             return {"error": str(e), "decision": "HOLD"}
     
-    async def _rule_based_execution(self, skill: Dict, market_data: List, params: Dict) -> Dict:
+    @staticmethod
+    def _system_instruction(skill: Dict) -> str:
+        return skill.get('_system_instruction') or \
+            SkillCache.render_system_instruction(skill['system_prompt'])
+    
+    def _get_skill_model(self, skill: Dict):
+        """Per-skill model carrying the static system prompt, cached by content hash"""
+        if self._genai is None:
+            return self.model
+        
+        key = skill.get('_content_hash') or skill.get('name', '')
+        model = self._skill_models.get(key)
+        if model is None:
+            model = self._genai.GenerativeModel(
+                self._model_name,
+                system_instruction=self._system_instruction(skill)
+            )
+            self._skill_models[key] = model
+        return model
+    
+    async def _rule_based_execution(self, skill: Dict, snapshot: MarketSnapshot, params: Dict) -> Dict:
         """Execute skill using rule-based logic"""
-        # Default rule-based response
-        return {
-            "decision": "HOLD",
-            "confidence": 0.5,
-            "reason": "Rule-based execution (AI not available)",
-            "skill": skill.get('name', 'unknown')
-        }
+        rules: Optional[CompiledRules] = skill.get('_rules')
+        if rules is None:
+            # Default rule-based response
+            return {
+                "decision": "HOLD",
+                "confidence": 0.5,
+                "reason": "Rule-based execution (AI not available)",
+                "skill": skill.get('name', 'unknown')
+            }
+        
+        positions = snapshot.positions
+        position = positions.get(snapshot.symbol) or {}
+        
+        decision = rules.evaluate(
+            snapshot.series,
+            position_amount=float(position.get('amount', 0) or 0),
+            open_positions=len(positions),
+            entry_price=position.get('entry_price')
+        )
+        decision['skill'] = skill.get('name', 'unknown')
+        return decision
     
     def reload_skills(self):
-        """Reload all skills from disk"""
-        self.loaded_skills.clear()
+        """Reload all skills from disk (blocking: run it off the event loop)"""
         self._load_skills()
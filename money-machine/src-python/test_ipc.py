@@ -1,11 +1,28 @@
 """
 Test script for Money Machine IPC communication
 Run with: python test_ipc.py
+
+Load / soak mode opens N concurrent clients with a weighted command mix:
+    python test_ipc.py load --clients 50 --rate 500 --duration 60
+    python test_ipc.py load --clients 20 --rate 200 --duration 14400 \
+        --mix PING=10,GET_STATUS=2,GET_PORTFOLIO=4,GENERATE_SIGNAL=1 --output soak.jsonl
 """
 
+import argparse
 import asyncio
+import bisect
 import json
-import socket
+import math
+import random
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+HOST = "127.0.0.1"
+PORT = 19284
+
+DEFAULT_MIX = "PING=10,GET_STATUS=2,GET_PORTFOLIO=4,GET_LAST_SIGNAL=3,GENERATE_SIGNAL=1"
 
 
 async def test_ipc_connection():
@@ -14,8 +31,8 @@ async def test_ipc_connection():
     print("🔌 Testing IPC Connection to Money Machine Engine...")
     print("-" * 50)
     
-    host = "127.0.0.1"
-    port = 19284
+    host = HOST
+    port = PORT
     
     # Test 1: Simple ping
     try:
@@ -88,5 +105,341 @@ async def test_ipc_connection():
     return True
 
 
+# === Load / soak mode ===
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: bounded memory for multi-hour runs (~2% resolution)"""
+
+    GROWTH = 1.02
+    MIN_MS = 0.01
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        bucket = int(math.log(max(ms, self.MIN_MS) / self.MIN_MS, self.GROWTH))
+        self.counts[bucket] += 1
+        self.total += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = pct / 100 * self.total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.MIN_MS * self.GROWTH ** (bucket + 1), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict:
+        return {
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "p999_ms": round(self.percentile(99.9), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class LoadStats:
+    """Totals for the whole run plus a window that resets at every report"""
+
+    def __init__(self):
+        self.total = LatencyHistogram()
+        self.window = LatencyHistogram()
+        self.errors: Counter = Counter()
+        self.window_errors = 0
+        self.by_command: Counter = Counter()
+
+    def record(self, command: str, latency_ms: float, error: Optional[str]):
+        self.by_command[command] += 1
+        self.total.record(latency_ms)
+        self.window.record(latency_ms)
+        if error:
+            self.errors[error] += 1
+            self.window_errors += 1
+
+    def reset_window(self) -> Tuple[LatencyHistogram, int]:
+        window, errors = self.window, self.window_errors
+        self.window, self.window_errors = LatencyHistogram(), 0
+        return window, errors
+
+
+def parse_mix(spec: str) -> Tuple[List[str], List[float]]:
+    """"PING=10,GET_STATUS=2" -> (commands, cumulative weights)"""
+    commands, cumulative, running = [], [], 0.0
+    for item in spec.split(','):
+        name, _, weight = item.strip().partition('=')
+        weight = float(weight or 1)
+        if weight <= 0:
+            continue
+        running += weight
+        commands.append(name.strip().upper())
+        cumulative.append(running)
+    if not commands:
+        raise ValueError(f"Empty command mix: {spec!r}")
+    return commands, cumulative
+
+
+def command_payload(command: str, symbol: str) -> dict:
+    if command in ("GENERATE_SIGNAL", "GET_LAST_SIGNAL"):
+        return {"symbol": symbol}
+    if command == "EXECUTE_SKILL":
+        return {"skill": "aggressive-scalper-v1", "params": {"symbol": symbol}}
+    if command == "EXECUTE_SKILLS":
+        return {"symbols": [symbol]}
+    return {}
+
+
+async def send_command(host: str, port: int, command: str, payload: dict, timeout: float) -> dict:
+    """One request per connection, the same framing the UI uses"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write((json.dumps({"command": command, "payload": payload}) + "\n").encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.readline(), timeout)
+        if not response:
+            raise ConnectionError("connection closed without a response")
+        return json.loads(response)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+# Errors that are part of normal operation (no signal generated yet for the symbol)
+EXPECTED_ERRORS = ("No signal found for symbol",)
+
+
+def command_error(response: Dict) -> Optional[str]:
+    """Transport-level error, else the error a handler returned inside its result"""
+    if response.get("error"):
+        return str(response["error"])
+    result = response.get("result")
+    if isinstance(result, dict) and result.get("error"):
+        return str(result["error"])
+    return None
+
+
+async def load_client(client_id: int, args, mix, stats: LoadStats, stop_at: float):
+    commands, cumulative = mix
+    rng = random.Random(args.seed + client_id)
+    interval = args.clients / args.rate if args.rate > 0 else 0.0
+    # Stagger starts so paced clients do not fire in lockstep
+    next_at = time.perf_counter() + rng.random() * interval
+
+    while time.perf_counter() < stop_at:
+        if interval:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scheduled = next_at
+            next_at += interval
+        else:
+            scheduled = time.perf_counter()
+
+        command = commands[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+        error = None
+        try:
+            result = await send_command(
+                args.host, args.port, command, command_payload(command, args.symbol), args.timeout
+            )
+            message = command_error(result)
+            if message and not message.startswith(EXPECTED_ERRORS):
+                error = f"{command}: {message[:80]}"
+        except asyncio.TimeoutError:
+            error = f"{command}: timeout"
+        except (OSError, ValueError) as e:
+            error = f"{command}: {type(e).__name__}"
+
+        # Measured from the scheduled send time, so a stalled server is not hidden
+        # by clients that simply send less (coordinated omission)
+        stats.record(command, (time.perf_counter() - scheduled) * 1000, error)
+
+
+async def sample_engine(args) -> Optional[Dict]:
+    """Engine-side health: loop lag, RSS and the structures that could leak"""
+    try:
+        status = (await send_command(args.host, args.port, "GET_STATUS", {}, args.timeout)).get("result") or {}
+    except (OSError, ValueError, asyncio.TimeoutError):
+        return None
+    memory = status.get("memory", {})
+    lag = status.get("loop_lag", {})
+    return {
+        "loop_lag_p99_ms": round(lag["p99_ms"], 2) if lag.get("p99_ms") is not None else None,
+        "loop_lag_max_ms": round(lag["max_ms"], 2) if lag.get("max_ms") is not None else None,
+        "rss_mb": round(memory.get("rss_bytes", 0) / 1e6, 1),
+        "signals_cached": memory.get("signals_cached"),
+        "trades_recorded": memory.get("trades_recorded"),
+        "open_connections": status.get("ipc", {}).get("open_connections"),
+        "dropped_log_records": status.get("dropped_log_records"),
+    }
+
+
+def _slope_per_hour(points: List[Tuple[float, float]]) -> float:
+    """Least-squares slope of (seconds, value) samples, per hour"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if not var_t:
+        return 0.0
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var_t * 3600
+
+
+async def run_load(args) -> int:
+    mix = parse_mix(args.mix)
+    stats = LoadStats()
+    output = open(args.output, 'a') if args.output else None
+
+    baseline = await sample_engine(args)
+    if baseline is None:
+        print(f"❌ Cannot reach engine at {args.host}:{args.port}. Is the Python engine running?")
+        return 2
+
+    rate_desc = f"{args.rate:g}/s" if args.rate > 0 else "unthrottled"
+    print(f"🔥 {args.clients} clients, {rate_desc}, {args.duration:g}s, mix {args.mix}")
+    print(f"   engine at start: {baseline}")
+    print(f"{'elapsed':>8} {'cmd/s':>8} {'p50':>8} {'p99':>8} {'max':>8} {'errors':>7} "
+          f"{'lag p99':>8} {'rss MB':>8} {'signals':>8} {'trades':>8} {'conns':>6}")
+
+    start = time.perf_counter()
+    stop_at = start + args.duration
+    clients = [
+        asyncio.create_task(load_client(i, args, mix, stats, stop_at))
+        for i in range(args.clients)
+    ]
+    samples: List[Tuple[float, Dict]] = [(0.0, baseline)]
+    last_report, last_count = start, 0
+
+    while not all(c.done() for c in clients):
+        await asyncio.sleep(min(args.report_interval, max(0.0, stop_at - time.perf_counter()) + 0.05))
+        now = time.perf_counter()
+        window, window_errors = stats.reset_window()
+        throughput = (stats.total.total - last_count) / max(now - last_report, 1e-9)
+        last_report, last_count = now, stats.total.total
+
+        engine = await sample_engine(args) or {}
+        samples.append((now - start, engine))
+        w = window.summary()
+        print(f"{now - start:>7.0f}s {throughput:>8.0f} {w['p50_ms']:>8.2f} {w['p99_ms']:>8.2f} "
+              f"{w['max_ms']:>8.1f} {window_errors:>7} {engine.get('loop_lag_p99_ms', '-'):>8} "
+              f"{engine.get('rss_mb', '-'):>8} {engine.get('signals_cached', '-'):>8} "
+              f"{engine.get('trades_recorded', '-'):>8} {engine.get('open_connections', '-'):>6}")
+        if output:
+            output.write(json.dumps({
+                "elapsed_s": round(now - start, 1), "throughput": round(throughput, 1),
+                "latency": w, "errors": window_errors, "engine": engine,
+            }) + "\n")
+            output.flush()
+
+    await asyncio.gather(*clients, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    # Once clients are gone only our own status probe should be connected
+    await asyncio.sleep(1.0)
+    final = await sample_engine(args) or {}
+
+    return report(args, stats, elapsed, baseline, final, samples, output)
+
+
+def report(args, stats: LoadStats, elapsed: float, baseline: Dict, final: Dict,
+           samples: List[Tuple[float, Dict]], output) -> int:
+    total = stats.total.total
+    error_count = sum(stats.errors.values())
+    error_rate = error_count / total if total else 0.0
+    rss_points = [(t, s["rss_mb"]) for t, s in samples if s.get("rss_mb")]
+    lag_p99 = [s["loop_lag_p99_ms"] for _, s in samples if s.get("loop_lag_p99_ms") is not None]
+
+    summary = {
+        "commands": total,
+        "elapsed_s": round(elapsed, 1),
+        "throughput": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency": stats.total.summary(),
+        "errors": error_count,
+        "error_rate": round(error_rate, 5),
+        "errors_by_kind": dict(stats.errors.most_common(10)),
+        "by_command": dict(stats.by_command),
+        "loop_lag_p99_ms_worst": max(lag_p99) if lag_p99 else None,
+        "rss_mb": {
+            "start": baseline.get("rss_mb"),
+            "end": final.get("rss_mb"),
+            "peak": max((v for _, v in rss_points), default=None),
+            "slope_mb_per_hour": round(_slope_per_hour(rss_points), 2),
+        },
+        "signals_cached": [baseline.get("signals_cached"), final.get("signals_cached")],
+        "trades_recorded": [baseline.get("trades_recorded"), final.get("trades_recorded")],
+        "open_connections_after": final.get("open_connections"),
+    }
+
+    # Leak heuristics: connections not released, or RSS still climbing over a long run
+    warnings = []
+    if final.get("open_connections") is not None and final["open_connections"] > 1:
+        warnings.append(f"{final['open_connections'] - 1} IPC connection(s) still open after clients stopped")
+    # Ignore the warm-up (allocator and caches settle during the first tenth of the run)
+    settled = [p for p in rss_points if p[0] >= elapsed / 10]
+    slope = _slope_per_hour(settled)
+    if elapsed >= 600 and slope > args.max_rss_growth:
+        warnings.append(f"RSS growing {slope:.1f} MB/h after warm-up (limit {args.max_rss_growth:g})")
+    signals_start, signals_end = summary["signals_cached"]
+    if signals_end is not None and signals_start is not None and signals_end > max(signals_start, 1) * 10:
+        warnings.append(f"last_signals grew {signals_start} -> {signals_end}")
+    summary["warnings"] = warnings
+
+    print("-" * 50)
+    print(json.dumps(summary, indent=2))
+    if output:
+        output.write(json.dumps({"summary": summary}) + "\n")
+        output.close()
+
+    failed = error_rate > args.max_error_rate or bool(warnings)
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    if error_rate > args.max_error_rate:
+        print(f"❌ Error rate {error_rate:.2%} above {args.max_error_rate:.2%}")
+    if not failed:
+        print(f"🎉 Sustained {summary['throughput']:.0f} cmd/s, p99 {summary['latency']['p99_ms']} ms")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    global HOST, PORT
+    parser = argparse.ArgumentParser(description="Money Machine IPC smoke and load test")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    sub = parser.add_subparsers(dest="mode")
+
+    load = sub.add_parser("load", help="concurrent load / soak run")
+    load.add_argument("--clients", type=int, default=20)
+    load.add_argument("--rate", type=float, default=0,
+                      help="target commands per second across all clients (0 = unthrottled)")
+    load.add_argument("--duration", type=float, default=60, help="seconds (soak: e.g. 14400)")
+    load.add_argument("--mix", default=DEFAULT_MIX, help="weighted command mix, e.g. PING=10,GET_STATUS=2")
+    load.add_argument("--symbol", default="BTC/USDT")
+    load.add_argument("--timeout", type=float, default=10.0)
+    load.add_argument("--report-interval", type=float, default=10.0)
+    load.add_argument("--output", help="append per-interval JSON lines to this file")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--max-error-rate", type=float, default=0.001)
+    load.add_argument("--max-rss-growth", type=float, default=20.0,
+                      help="MB/hour of post-warm-up RSS growth flagged as a leak")
+
+    args = parser.parse_args(argv)
+    if args.mode == "load":
+        return asyncio.run(run_load(args))
+
+    HOST, PORT = args.host, args.port
+    return 0 if asyncio.run(test_ipc_connection()) else 1
+
+
 if __name__ == "__main__":
-    asyncio.run(test_ipc_connection())
+    sys.exit(main())
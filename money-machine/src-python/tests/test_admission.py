@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from utils.admission import AdmissionRejected, _Limiter
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_release_hands_slot_to_best_priority_waiter():
+    async def scenario():
+        limiter = _Limiter("test", limit=1, max_queue=10)
+        await limiter.acquire(1)
+        order = []
+
+        async def waiter(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter("compute", 2)), asyncio.create_task(waiter("query", 1)),
+                 asyncio.create_task(waiter("compute-2", 2))]
+        await settle()
+        assert limiter.queued == 3
+
+        for _ in range(3):
+            limiter.release()
+            await settle()
+            # The slot moves straight to the woken waiter; it is never free in between
+            assert limiter.in_flight == 1
+        assert order == ["query", "compute", "compute-2"]
+
+        limiter.release()
+        assert limiter.in_flight == 0
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_is_skipped():
+    async def scenario():
+        limiter = _Limiter("test", limit=1, max_queue=10)
+        await limiter.acquire(1)
+        cancelled = asyncio.create_task(limiter.acquire(1))
+        admitted = asyncio.create_task(limiter.acquire(1))
+        await settle()
+
+        cancelled.cancel()
+        await settle()
+        assert limiter.queued == 1
+
+        limiter.release()
+        await admitted
+        assert limiter.in_flight == 1
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_racing_a_hand_off_returns_the_slot():
+    async def scenario():
+        limiter = _Limiter("test", limit=1, max_queue=10)
+        await limiter.acquire(1)
+        task = asyncio.create_task(limiter.acquire(1))
+        await settle()
+
+        limiter.release()  # Hands the slot to the waiter...
+        task.cancel()  # ...which is cancelled before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.in_flight == 0
+        await limiter.acquire(1)  # The slot is free again
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects():
+    async def scenario():
+        limiter = _Limiter("test", limit=1, max_queue=1)
+        await limiter.acquire(1)
+        waiting = asyncio.create_task(limiter.acquire(1))
+        await settle()
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire(1)
+        assert limiter.rejected == 1
+        waiting.cancel()
+        await settle()
+
+    asyncio.run(scenario())
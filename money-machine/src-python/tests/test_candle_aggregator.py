@@ -0,0 +1,67 @@
+import numpy as np
+
+from engine.candle_aggregator import CandleAggregator, resample, timeframe_ms
+
+
+def base_candles(n: int, start: int = 0, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        o, c = rng.uniform(95, 105, 2)
+        rows.append([(start + i) * 60000, o, max(o, c) + 1, min(o, c) - 1, c, float(rng.integers(1, 10))])
+    return rows
+
+
+def test_resample_matches_a_plain_loop():
+    candles = base_candles(37, start=3)
+    expected = {}
+    for ts, o, h, l, c, v in candles:
+        bucket = ts - ts % 900000
+        bar = expected.setdefault(bucket, [bucket, o, h, l, c, 0.0])
+        bar[2], bar[3], bar[4], bar[5] = max(bar[2], h), min(bar[3], l), c, bar[5] + v
+    np.testing.assert_allclose(resample(np.asarray(candles), 900000), list(expected.values()))
+
+
+def test_incremental_updates_match_a_fresh_resample():
+    candles = base_candles(60)
+    live = CandleAggregator()
+    live.on_candles("BTC/USDT", candles[:20])
+    live.get("BTC/USDT", "5m")  # Starts tracking 5m
+    for i in range(20, 60):
+        # Each base candle arrives forming first, then final
+        live.on_candles("BTC/USDT", [candles[i - 1], candles[i][:4] + [candles[i][1], 1.0]])
+        live.on_candles("BTC/USDT", [candles[i]])
+
+    fresh = CandleAggregator()
+    fresh.on_candles("BTC/USDT", candles)
+    np.testing.assert_allclose(live.get("BTC/USDT", "5m"), fresh.get("BTC/USDT", "5m"))
+    assert len(live.get("BTC/USDT", "5m")) == 12
+
+
+def test_partial_leading_bucket_is_dropped_and_seeded_from_the_exchange():
+    aggregator = CandleAggregator()
+    aggregator.on_candles("BTC/USDT", base_candles(10, start=2))  # 00:02 to 00:11
+    bars = aggregator.get("BTC/USDT", "5m")
+    assert [b[0] for b in bars] == [300000, 600000]
+    assert aggregator.needs_seed("BTC/USDT", "5m", limit=3)
+
+    aggregator.seed("BTC/USDT", "5m", [[0, 1, 1, 1, 1, 1], [300000, 9, 9, 9, 9, 9]])
+    assert [b[0] for b in aggregator.get("BTC/USDT", "5m")] == [0, 300000, 600000]
+    assert aggregator.get("BTC/USDT", "5m")[1][1] != 9  # Built bars win over fetched ones
+    assert not aggregator.needs_seed("BTC/USDT", "5m", limit=3)
+
+
+def test_trades_fold_into_the_forming_candle():
+    aggregator = CandleAggregator()
+    aggregator.on_trade("BTC/USDT", 61000, 100.0, 1.0)
+    aggregator.on_trade("BTC/USDT", 62000, 102.0, 2.0)
+    aggregator.on_trade("BTC/USDT", 63000, 99.0, 0.5)
+    assert aggregator.get("BTC/USDT", "1m") == [[60000, 100.0, 102.0, 99.0, 99.0, 3.5]]
+
+
+def test_supported_timeframes():
+    aggregator = CandleAggregator({"base_timeframe": "1m"})
+    assert timeframe_ms("15m") == 900000
+    assert aggregator.supports("4h")
+    assert not aggregator.supports("30s")
+    assert not aggregator.supports("1M")
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from engine.cassette import Cassette
+
+
+class FakeClient:
+    has = {"fetchTickers": False, "fetchOHLCV": True}
+
+    async def load_markets(self):
+        return {"BTC/USDT": {"symbol": "BTC/USDT", "quote": "USDT", "info": {"large": "payload"}}}
+
+    async def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "last": 100.0}
+
+
+def record_and_replay(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+
+    async def record():
+        cassette = Cassette(path, "record")
+        client = cassette.exchange("binance", FakeClient())
+        await client.load_markets()
+        await client.fetch_ticker("BTC/USDT")
+        cassette.close()
+
+    asyncio.run(record())
+    return Cassette(path, "replay", speed="fast")
+
+
+def test_replay_restores_markets_and_capabilities(tmp_path):
+    client = record_and_replay(tmp_path).exchange("binance")
+
+    async def replay():
+        await client.load_markets()
+        return await client.fetch_ticker("BTC/USDT")
+
+    assert asyncio.run(replay()) == {"symbol": "BTC/USDT", "last": 100.0}
+    assert client.has == FakeClient.has
+    assert set(client.markets["BTC/USDT"]) == {"symbol", "quote"}  # Compacted on record
+
+
+def test_replay_has_no_unrecorded_attributes(tmp_path):
+    client = record_and_replay(tmp_path).exchange("binance")
+    with pytest.raises(AttributeError):
+        client.fetch_tickers
+    assert getattr(client, "rateLimit", None) is None
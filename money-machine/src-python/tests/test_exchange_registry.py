@@ -0,0 +1,36 @@
+import asyncio
+
+from engine.exchange_registry import ExchangeRegistry
+from engine.trading_core import TradingEngine
+
+
+def simulator(venue_id, symbols, listed=()):
+    return {"id": venue_id, "name": "simulator", "symbols": list(listed), "simulator": {"symbols": symbols}}
+
+
+def test_routes_explicit_then_primary_then_any_listing():
+    async def scenario():
+        registry = ExchangeRegistry({"exchanges": [
+            simulator("main", ["BTC/USDT", "ETH/USDT"]),
+            simulator("alt", ["ETH/USDT", "SOL/USDT"], listed=["ETH/USDT"]),
+        ]})
+        assert await registry.open() == 2
+        routes = {s: registry.route(s).id for s in ("BTC/USDT", "ETH/USDT", "SOL/USDT", "XRP/USDT")}
+        quotes = await registry.best_quotes("ETH/USDT")
+        await registry.close()
+        return routes, quotes
+
+    routes, quotes = asyncio.run(scenario())
+    assert routes == {"BTC/USDT": "main", "ETH/USDT": "alt", "SOL/USDT": "alt", "XRP/USDT": "main"}
+    assert set(quotes["quotes"]) == {"main", "alt"}
+
+
+def test_close_releases_the_session_without_venues():
+    async def scenario():
+        engine = TradingEngine({"exchange": {"name": "simulator"}})
+        session = engine.exchanges._get_session()  # Created for a venue that then failed to connect
+        await engine.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.closed
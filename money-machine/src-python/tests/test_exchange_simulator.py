@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from engine.exchange_simulator import InsufficientFunds, SimulatedExchange
+
+BARS = [
+    [0, 100, 100, 90, 100, 10],  # Current bar when the order is placed: its low came first
+    [60000, 100, 100, 99, 100, 10],
+    [120000, 100, 100, 94, 96, 10],
+]
+
+
+def make_exchange(tmp_path, **options):
+    path = tmp_path / "btc.json"
+    path.write_text(json.dumps(BARS))
+    return SimulatedExchange({
+        "symbols": ["BTC/USDT"], "ohlcv_files": {"BTC/USDT": str(path)}, "history_bars": 0,
+        "start_time_ms": 30000, "fee_rate": 0.0, **options,
+    })
+
+
+def test_resting_limit_ignores_the_bar_it_was_placed_in(tmp_path):
+    exchange = make_exchange(tmp_path)
+
+    async def scenario():
+        order = await exchange.create_order("BTC/USDT", "limit", "buy", 1.0, 95.0)
+        statuses = [(await exchange.fetch_order(order["id"]))["status"]]
+        for _ in range(2):
+            exchange.advance(60)
+            statuses.append((await exchange.fetch_order(order["id"]))["status"])
+        return statuses, await exchange.fetch_order(order["id"])
+
+    statuses, filled = asyncio.run(scenario())
+    assert statuses == ["open", "open", "closed"]
+    assert filled["average"] == 95.0
+
+
+def test_returned_orders_do_not_share_state(tmp_path):
+    exchange = make_exchange(tmp_path)
+
+    async def scenario():
+        order = await exchange.create_order("BTC/USDT", "market", "buy", 1.0)
+        order["fee"]["cost"] = 123.0
+        order["trades"].clear()
+        return await exchange.fetch_order(order["id"])
+
+    stored = asyncio.run(scenario())
+    assert stored["fee"]["cost"] == 0.0
+    assert len(stored["trades"]) == 1
+
+
+def test_market_order_walks_the_book_and_checks_funds(tmp_path):
+    exchange = make_exchange(tmp_path, balances={"USDT": 1000.0}, level_size_quote=200.0)
+
+    async def scenario():
+        order = await exchange.create_order("BTC/USDT", "market", "buy", 5.0)
+        with pytest.raises(InsufficientFunds):
+            await exchange.create_order("BTC/USDT", "market", "buy", 100.0)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order["status"] == "closed"
+    assert len(order["trades"]) > 1  # More than the best level's size
+    assert order["average"] > order["trades"][0]["price"]
+    assert exchange.balances["BTC"] == 5.0
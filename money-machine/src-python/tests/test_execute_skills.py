@@ -0,0 +1,66 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from engine.trading_core import TradingEngine
+from skills.skill_executor import SkillExecutor
+
+BUYER = """name: buyer
+rules:
+  confidence: 0.7
+  entry:
+    buy: ["close > 0"]
+"""
+
+SELLER = """name: seller
+symbols: ["ETH/USDT"]
+rules:
+  confidence: 0.9
+  entry:
+    sell: ["close > 0"]
+"""
+
+
+def run_skills(tmp_path, **kwargs):
+    (tmp_path / "buyer.yaml").write_text(BUYER)
+    (tmp_path / "seller.yaml").write_text(SELLER)
+
+    async def scenario():
+        engine = TradingEngine({"exchange": {"name": "simulator"}})
+        await engine.initialize()
+        fetches = Counter()
+        fetch = engine.get_market_data
+
+        async def counted(symbol, *args, **kw):
+            fetches[symbol] += 1
+            return await fetch(symbol, *args, **kw)
+
+        engine.get_market_data = counted
+        executor = SkillExecutor(engine, skills_dir=tmp_path)
+        try:
+            return await executor.execute_skills(["BTC/USDT", "ETH/USDT"], **kwargs), fetches
+        finally:
+            await engine.close()
+
+    return asyncio.run(scenario())
+
+
+def test_one_snapshot_per_symbol_shared_by_all_skills(tmp_path):
+    result, fetches = run_skills(tmp_path)
+    assert fetches == {"BTC/USDT": 1, "ETH/USDT": 1}
+    # The seller only applies to ETH; actionable decisions rank by confidence
+    assert [(d["skill"], d["symbol"], d["decision"]) for d in result["decisions"]] == [
+        ("seller", "ETH/USDT", "SELL"),
+        ("buyer", "BTC/USDT", "BUY"),
+        ("buyer", "ETH/USDT", "BUY"),
+    ]
+    assert result["skills_evaluated"] == 3
+    assert result["by_symbol"]["ETH/USDT"]["score"] == pytest.approx(-0.2)
+    assert result["by_symbol"]["BTC/USDT"]["buy"] == 1
+
+
+def test_unknown_skills_are_rejected(tmp_path):
+    result, fetches = run_skills(tmp_path, skill_names=["buyer", "missing"])
+    assert result == {"error": "Skills not found: missing"}
+    assert not fetches
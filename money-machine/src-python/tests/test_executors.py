@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+from utils.executors import BoundedExecutor
+
+
+def test_timed_out_callers_keep_the_slot_until_the_thread_finishes():
+    async def scenario():
+        pool = BoundedExecutor("test", workers=1, max_queue=8)
+        gate = threading.Event()
+        try:
+            await asyncio.wait_for(pool.run(gate.wait), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        # The worker is still busy: a second call waits instead of queueing behind it in the pool
+        second = asyncio.create_task(pool.run(lambda: "done"))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        assert pool.stats()["queued"] == 1
+
+        gate.set()
+        assert await asyncio.wait_for(second, 1.0) == "done"
+        assert pool.stats()["queued"] == 0
+        pool.shutdown()
+
+    asyncio.run(scenario())
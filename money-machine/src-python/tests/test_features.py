@@ -0,0 +1,43 @@
+import pytest
+
+from engine.features import FeaturePipeline
+
+
+def candles(n: int, start: int = 0, step: int = 300000):
+    return [[(start + i) * step, 100 + i, 101 + i, 99 + i, 100 + i, 10.0 + i % 3] for i in range(n)]
+
+
+def test_snapshot_is_rebuilt_once_per_closed_bar():
+    pipeline = FeaturePipeline()
+    first = pipeline.update("BTC/USDT", candles(30))
+    # Forming bar moved, closed bars did not: same snapshot
+    forming = candles(30)
+    forming[-1][4] = 500.0
+    assert pipeline.update("BTC/USDT", forming) is first
+    assert first.bars == 29 and first.bar_timestamp == 28 * 300000
+    assert first.features["return_1"] == pytest.approx(128 / 127 - 1, abs=1e-6)
+
+    second = pipeline.update("BTC/USDT", candles(31))
+    assert second.version == 2 and second.bars == 30
+    assert pipeline.stats()["computed"] == 2 and pipeline.stats()["reused"] == 1
+
+
+def test_exposure_change_bumps_the_version_without_recomputing():
+    pipeline = FeaturePipeline()
+    first = pipeline.update("BTC/USDT", candles(30))
+    second = pipeline.update("BTC/USDT", candles(30), exposure={"position": 0.1, "gross": 0.1})
+    assert second.version == first.version + 1
+    assert second.features is first.features
+    assert "exposure pos=+10.0%" in second.render()
+    assert pipeline.stats()["computed"] == 1
+
+
+def test_timeframes_have_their_own_snapshots():
+    pipeline = FeaturePipeline()
+    five = pipeline.update("BTC/USDT", candles(30))
+    hour = pipeline.update("BTC/USDT", candles(30, step=3600000))
+    assert (five.timeframe, hour.timeframe) == ("5m", "1h")
+    assert pipeline.get("BTC/USDT", "5m") is five
+    assert pipeline.get("BTC/USDT") is hour  # Latest by default
+    assert pipeline.update("BTC/USDT", candles(30)) is five
+    assert "features 5m v1:" in five.render()
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from engine.json_stream import StreamingJSONObject
+
+RESPONSE = (
+    '```json\n{"action": "BUY", "confidence": 0.85, "levels": {"stop": [1, 2], "note": "a}b"},'
+    ' "ok": true, "skip": null, "reasoning": "Breakout \\"confirmed\\" \\\\ volume \\u2191"}\n```'
+)
+
+
+def feed_all(chunks):
+    parser = StreamingJSONObject()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(RESPONSE)])
+def test_fields_match_json_loads_for_any_split(size):
+    parser = feed_all(RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size))
+    expected = json.loads(RESPONSE[RESPONSE.index('{'):RESPONSE.rindex('}') + 1])
+    assert parser.done and not parser.failed
+    assert parser.fields == expected
+    assert parser.fields["reasoning"] == 'Breakout "confirmed" \\ volume \u2191'
+    assert parser.fields["levels"] == {"stop": [1, 2], "note": "a}b"}
+
+
+def test_fields_complete_before_the_object_does():
+    parser = StreamingJSONObject()
+    assert parser.feed('{"action": "SE') == {}
+    assert parser.feed('LL", "confidence": 0.') == {"action": "SELL"}
+    # A number is only complete once its delimiter arrives
+    assert parser.feed('7') == {}
+    assert parser.feed(', "reasoning": "x') == {"confidence": 0.7}
+    assert not parser.done
+    assert parser.feed('"}') == {"reasoning": "x"}
+    assert parser.done
+
+
+def test_escaped_quote_split_across_chunks():
+    parser = feed_all(['{"k": "a\\', '"b', '"}'])
+    assert parser.fields == {"k": 'a"b'}
+
+
+def test_malformed_input_fails_and_keeps_the_text():
+    parser = feed_all(['{"action" "BUY"}', ' trailing'])
+    assert parser.failed and not parser.done
+    assert parser.text == '{"action" "BUY"} trailing'
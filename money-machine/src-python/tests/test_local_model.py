@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from engine.local_model import FEATURES, LogisticModel, feature_vector, train_logistic
+
+SNAPSHOT = {"rsi_14": 62.0, "return_1": 0.01, "return_5": -0.02, "price": 105.0, "sma_20": 100.0}
+EXPOSURE = {"position": 0.1}
+
+
+def trained_model() -> LogisticModel:
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(90, len(FEATURES)))
+    labels = ["BUY" if row[0] > 0.5 else "SELL" if row[0] < -0.5 else "HOLD" for row in x]
+    return train_logistic(x, labels, epochs=50)
+
+
+def test_trained_model_predicts_with_its_weights():
+    model = trained_model()
+    p, _ = model.predict_one(feature_vector(SNAPSHOT, EXPOSURE))
+    batch = model.probabilities(model.standardize(np.array([feature_vector(SNAPSHOT, EXPOSURE)])))[0]
+    assert p == pytest.approx(batch.tolist())
+
+
+def test_inputs_follow_the_stored_feature_order():
+    data = trained_model().to_dict()
+    order = list(reversed(range(len(FEATURES))))
+    shuffled = LogisticModel.from_dict({
+        **data,
+        "features": [data["features"][i] for i in order],
+        "mean": [data["mean"][i] for i in order],
+        "std": [data["std"][i] for i in order],
+        "weights": [data["weights"][i] for i in order],
+    })
+    original = LogisticModel.from_dict(data)
+    expected, _ = original.predict_one(feature_vector(SNAPSHOT, EXPOSURE, original.features))
+    p, _ = shuffled.predict_one(feature_vector(SNAPSHOT, EXPOSURE, shuffled.features))
+    assert p == pytest.approx(expected)
+
+
+def test_loading_rejects_unknown_or_mismatched_features():
+    data = trained_model().to_dict()
+    with pytest.raises(ValueError, match="unknown features"):
+        LogisticModel.from_dict({**data, "features": data["features"][:-1] + ["order_flow"]})
+    with pytest.raises(ValueError, match="do not match"):
+        LogisticModel.from_dict({**data, "features": data["features"][:-1]})
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import logging
+import queue
+import time
+
+from utils.logger import JsonFormatter, NonBlockingQueueHandler, RateLimitedLogger
+from utils.loop_monitor import LoopLagMonitor
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def isolated_logger(name: str):
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    handler = ListHandler()
+    log.handlers = [handler]
+    return log, handler
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    for _ in range(5):
+        handler.emit(record)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_json_lines_carry_extra_fields():
+    log, handler = isolated_logger("test.json")
+    handler.setFormatter(JsonFormatter())
+    record = log.makeRecord("test.json", logging.WARNING, __file__, 1, "fill %s", ("BTC",), None,
+                            extra={"order_id": "o1"})
+    entry = json.loads(handler.format(record))
+    assert entry["msg"] == "fill BTC"
+    assert entry["level"] == "WARNING"
+    assert entry["order_id"] == "o1"
+
+
+def test_rate_limited_logger_counts_suppressed_repeats():
+    log, handler = isolated_logger("test.rate")
+    limited = RateLimitedLogger(log, interval=0.05)
+    for symbol in ("BTC", "ETH", "SOL"):
+        limited.warning("fetch failed for %s", symbol)
+    time.sleep(0.06)
+    limited.warning("fetch failed for %s", "XRP")
+    assert handler.messages == ["fetch failed for BTC", "fetch failed for XRP (suppressed 2 similar)"]
+
+
+def test_loop_monitor_sees_a_blocked_loop():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.03)
+        time.sleep(0.1)  # Blocks the loop past the next wakeup
+        await asyncio.sleep(0.03)
+        monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["max_ms"] >= 50
+    assert stats["p99_ms"] <= stats["max_ms"]
@@ -0,0 +1,87 @@
+from engine.order_book import L2OrderBook
+
+BIDS = [[100.0, 1.0], [99.0, 2.0]]
+ASKS = [[101.0, 1.5], [102.0, 3.0]]
+
+
+def synced_book(sequence: int = 10) -> L2OrderBook:
+    book = L2OrderBook("BTC/USDT", max_levels=5)
+    book.apply_snapshot(BIDS, ASKS, sequence)
+    return book
+
+
+def test_delta_updates_levels_and_totals():
+    book = synced_book()
+    assert book.apply_delta([[100.0, 0.0], [99.5, 4.0]], [[101.0, 2.0]], 11)
+    assert book.top() == (99.5, 4.0, 101.0, 2.0)
+    assert book.bids.levels() == [[99.5, 4.0], [99.0, 2.0]]
+    assert book.bids.total_size == 6.0
+    assert book.asks.total_notional == 101.0 * 2.0 + 102.0 * 3.0
+    assert book.sequence == 11
+
+
+def test_stale_deltas_are_ignored():
+    book = synced_book()
+    assert book.apply_delta([[100.0, 9.0]], [], 10)
+    assert book.top()[1] == 1.0
+
+
+def test_gap_unsyncs_and_buffers_until_snapshot():
+    book = synced_book()
+    assert not book.apply_delta([[100.0, 5.0]], [], 13, first_sequence=12)
+    assert not book.synced and book.gaps == 1
+    # While out of sync, deltas are buffered
+    assert not book.apply_delta([[98.0, 1.0]], [], 14)
+
+    book.apply_snapshot(BIDS, ASKS, 12)
+    assert book.synced
+    assert book.sequence == 14
+    assert book.bids.levels() == [[100.0, 5.0], [99.0, 2.0], [98.0, 1.0]]
+
+
+def test_snapshot_replay_skips_covered_deltas_and_stops_at_a_new_gap():
+    book = L2OrderBook("BTC/USDT")
+    book.apply_delta([[100.0, 7.0]], [], 5)  # Covered by the snapshot below
+    book.apply_delta([[99.0, 3.0]], [], 11)
+    book.apply_delta([[98.0, 1.0]], [], 14)  # 12-13 missing
+    book.apply_snapshot(BIDS, ASKS, 10)
+
+    assert book.sequence == 11
+    assert book.top()[:2] == (100.0, 1.0)
+    assert book.bids.levels()[1] == [99.0, 3.0]
+    assert not book.synced  # Waiting for the next snapshot
+    book.apply_snapshot(BIDS, ASKS, 13)
+    assert book.synced and book.sequence == 14
+
+
+def test_crossed_book_requests_resync():
+    book = synced_book()
+    assert not book.apply_delta([[101.5, 1.0]], [], 11)
+    assert not book.synced
+
+
+def test_features_follow_the_top_of_book():
+    book = synced_book()
+    features = book.features()
+    assert features["mid"] == 100.5
+    assert features["spread"] == 1.0
+    assert features["top_imbalance"] == (1.0 - 1.5) / 2.5
+    assert book.features() is features  # Cached until the book changes
+    book.apply_delta([[100.0, 2.0]], [], 11)
+    assert book.features()["top_imbalance"] == (2.0 - 1.5) / 3.5
+
+
+def test_removals_past_the_truncated_depth_request_resync():
+    book = L2OrderBook("BTC/USDT", max_levels=4)
+    book.apply_snapshot([[100.0 - i, 1.0] for i in range(6)], ASKS, 10)
+    assert book.bids.levels()[-1] == [97.0, 1.0]  # Cut at the tracked depth
+    assert book.apply_delta([[100.0, 0.0], [99.0, 0.0]], [], 11)
+    # One more removal leaves a single known level with unknown depth behind it
+    assert not book.apply_delta([[98.0, 0.0]], [], 12)
+    assert not book.synced
+
+
+def test_untruncated_sides_may_thin_out():
+    book = synced_book()
+    assert book.apply_delta([[100.0, 0.0], [99.0, 0.0]], [], 11)
+    assert book.synced and book.bids.levels() == []
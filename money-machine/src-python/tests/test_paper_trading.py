@@ -0,0 +1,106 @@
+from engine.paper_trading import PaperTradingEngine
+
+
+def make_engine(**config):
+    return PaperTradingEngine({"maker_fee": 0.0, "taker_fee": 0.0, "slippage_bps": 0.0, **config})
+
+
+def test_marketable_orders_fill_immediately():
+    engine = make_engine()
+    order, fills = engine.submit("BTC/USDT", "buy", 1.0, None, reference_price=100.0)
+    assert order.status == "closed"
+    assert [(f.amount, f.price) for f in fills] == [(1.0, 100.0)]
+    # A limit through the reference price is marketable too, capped at the limit
+    _, fills = engine.submit("BTC/USDT", "sell", 1.0, 99.0, reference_price=100.0)
+    assert fills[0].price == 100.0
+
+
+def test_price_then_time_priority():
+    engine = make_engine()
+    first, _ = engine.submit("BTC/USDT", "buy", 1.0, 99.0, reference_price=100.0)
+    better, _ = engine.submit("BTC/USDT", "buy", 1.0, 99.5, reference_price=100.0)
+    second, _ = engine.submit("BTC/USDT", "buy", 1.0, 99.0, reference_price=100.0)
+    assert engine.books["BTC/USDT"].best_bid() == 99.5
+
+    fills = engine.on_tick("BTC/USDT", 98.0)
+    assert [f.order_id for f in fills] == [better.id, first.id, second.id]
+    assert [f.price for f in fills] == [99.5, 99.0, 99.0]  # Each at its own limit
+
+
+def test_participation_limits_fills_and_keeps_queue_order():
+    engine = make_engine(max_participation=0.5)
+    first, _ = engine.submit("BTC/USDT", "sell", 2.0, 101.0, reference_price=100.0)
+    second, _ = engine.submit("BTC/USDT", "sell", 2.0, 101.0, reference_price=100.0)
+
+    fills = engine.on_tick("BTC/USDT", 102.0, volume=6.0)  # 3 units of capacity
+    assert [(f.order_id, f.amount) for f in fills] == [(first.id, 2.0), (second.id, 1.0)]
+    assert second.status == "open" and second.remaining == 1.0
+
+    fills = engine.on_tick("BTC/USDT", 102.0, volume=10.0)
+    assert [(f.order_id, f.amount, f.status) for f in fills] == [(second.id, 1.0, "closed")]
+    assert engine.stats()["open_orders"] == 0
+
+
+def test_touch_versus_trade_through():
+    engine = make_engine(fill_on_touch=False)
+    engine.submit("BTC/USDT", "buy", 1.0, 99.0, reference_price=100.0)
+    assert engine.on_tick("BTC/USDT", 99.0) == []
+    assert len(engine.on_tick("BTC/USDT", 98.9)) == 1
+
+
+def test_cancelled_orders_never_fill():
+    engine = make_engine()
+    kept, _ = engine.submit("BTC/USDT", "buy", 1.0, 98.0, reference_price=100.0)
+    cancelled, _ = engine.submit("BTC/USDT", "buy", 1.0, 99.0, reference_price=100.0)
+    assert engine.cancel(cancelled.id) is cancelled
+    assert engine.cancel(cancelled.id) is None  # Already gone
+    assert cancelled.status == "canceled"
+    assert engine.books["BTC/USDT"].best_bid() == 98.0
+    assert [o.id for o in engine.open_orders("BTC/USDT")] == [kept.id]
+
+    fills = engine.on_tick("BTC/USDT", 97.0)
+    assert [f.order_id for f in fills] == [kept.id]
+    assert engine.stats()["open_orders"] == 0
+
+
+def test_candles_replay_new_movement_only():
+    engine = make_engine()
+    engine.on_candles("BTC/USDT", [[0, 100, 100, 100, 100, 10]])
+    order, _ = engine.submit("BTC/USDT", "buy", 1.0, 97.0, reference_price=100.0)
+
+    # The forming bar dips to 98: not far enough
+    assert engine.on_candles("BTC/USDT", [[0, 100, 100, 98, 99, 20]]) == []
+    # Next bar trades through the limit
+    fills = engine.on_candles("BTC/USDT", [[0, 100, 100, 98, 99, 20], [60, 99, 99, 96, 98, 10]])
+    assert [(f.order_id, f.price) for f in fills] == [(order.id, 97.0)]
+
+
+def test_mixed_timeframes_do_not_replay_history():
+    engine = make_engine()
+    five = [[0, 100, 100, 90, 99, 10], [300000, 99, 100, 98, 99, 10]]
+    hour = [[-3600000, 100, 101, 85, 99, 100]]
+    engine.on_candles("BTC/USDT", five, "5m")
+    engine.on_candles("BTC/USDT", hour, "1h")
+    order, _ = engine.submit("BTC/USDT", "buy", 1.0, 95.0, reference_price=99.0, timestamp=400000)
+
+    # Refetches of either timeframe carry the old lows (90, 85) but nothing new below 95
+    assert engine.on_candles("BTC/USDT", hour, "1h") == []
+    assert engine.on_candles("BTC/USDT", five, "5m") == []
+    assert engine.on_candles("BTC/USDT", hour + [[0, 99, 100, 97, 98, 50]], "1h") == []
+    assert order.status == "open"
+
+    fills = engine.on_candles("BTC/USDT", five + [[600000, 99, 99, 94, 96, 10]], "5m")
+    assert [(f.order_id, f.price) for f in fills] == [(order.id, 95.0)]
+
+
+def test_bars_before_an_order_never_fill_it():
+    engine = make_engine()
+    engine.on_candles("BTC/USDT", [[0, 100, 100, 100, 100, 10]])
+    order, _ = engine.submit("BTC/USDT", "buy", 1.0, 95.0, reference_price=100.0, timestamp=150000)
+    # A bar that opened before the order dipped to 90, then came back: only its close counts
+    assert engine.on_candles("BTC/USDT", [[0, 100, 100, 100, 100, 10], [60000, 100, 100, 90, 99, 10],
+                                          [120000, 99, 99, 98, 98, 10]]) == []
+    assert order.status == "open"
+    # Once the forming bar's current price reaches the limit it fills
+    fills = engine.on_candles("BTC/USDT", [[120000, 99, 99, 94, 94, 20]])
+    assert [f.price for f in fills] == [95.0]
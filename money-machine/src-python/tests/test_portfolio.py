@@ -0,0 +1,51 @@
+import pytest
+
+from engine.trading_core import Portfolio
+
+
+def test_open_and_add_uses_volume_weighted_entry():
+    portfolio = Portfolio(1000.0)
+    assert portfolio.apply_fill("BTC/USDT", "buy", 1.0, 100.0) == 0.0
+    portfolio.apply_fill("BTC/USDT", "buy", 3.0, 120.0)
+    position = portfolio.positions["BTC/USDT"]
+    assert position["amount"] == 4.0
+    assert position["entry_price"] == pytest.approx(115.0)
+    assert portfolio.balance == 1000.0
+
+
+def test_partial_close_realizes_pnl_and_keeps_entry():
+    portfolio = Portfolio(1000.0)
+    portfolio.apply_fill("BTC/USDT", "buy", 4.0, 100.0)
+    realized = portfolio.apply_fill("BTC/USDT", "sell", 1.0, 110.0, fee=0.5)
+    assert realized == pytest.approx(9.5)
+    position = portfolio.positions["BTC/USDT"]
+    assert position["amount"] == 3.0
+    assert position["entry_price"] == 100.0
+    assert portfolio.balance == pytest.approx(1009.5)
+
+
+def test_full_close_removes_position():
+    portfolio = Portfolio(1000.0)
+    portfolio.apply_fill("ETH/USDT", "sell", 2.0, 50.0)
+    realized = portfolio.apply_fill("ETH/USDT", "buy", 2.0, 45.0)
+    assert realized == pytest.approx(10.0)  # Short profits on the way down
+    assert "ETH/USDT" not in portfolio.positions
+
+
+def test_flip_realizes_closed_part_and_reopens_at_fill_price():
+    portfolio = Portfolio(1000.0)
+    portfolio.apply_fill("BTC/USDT", "buy", 2.0, 100.0)
+    realized = portfolio.apply_fill("BTC/USDT", "sell", 5.0, 90.0)
+    assert realized == pytest.approx(-20.0)  # Only the 2 long units close
+    position = portfolio.positions["BTC/USDT"]
+    assert position["amount"] == -3.0
+    assert position["entry_price"] == 90.0
+    assert portfolio.balance == pytest.approx(980.0)
+
+
+def test_every_fill_is_a_trade_and_bumps_version():
+    portfolio = Portfolio(1000.0)
+    portfolio.apply_fill("BTC/USDT", "buy", 1.0, 100.0)
+    portfolio.apply_fill("BTC/USDT", "sell", 1.0, 101.0)
+    assert [t["side"] for t in portfolio.trades] == ["buy", "sell"]
+    assert portfolio.version == 2
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from engine.position_sizing import PositionSizer
+from engine.signal_generator import SignalGenerator, TradingSignal
+
+
+def candles(n: int = 300, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return [[i * 60000, c, c, c, c, 1.0] for i, c in enumerate(closes)]
+
+
+def make_sizer(**config):
+    return PositionSizer({"seed": 7, "paths": 5000, **config})
+
+
+def test_confidence_sets_take_profit_odds():
+    sizer, ohlcv = make_sizer(), candles()
+    low = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.3)
+    high = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.9)
+    assert low.expected_return < high.expected_return
+    # Exit probabilities come from the unweighted paths either way
+    assert low.p_take == high.p_take
+    assert low.p_stop + low.p_take + low.p_timeout == pytest.approx(1.0)
+
+
+def test_confidence_odds_are_capped():
+    sizer, ohlcv = make_sizer(max_take_odds=0.6), candles()
+    capped = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.7)
+    certain = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.99)
+    assert capped.take_odds == certain.take_odds == 0.6
+    assert capped.amount_pct == certain.amount_pct
+
+
+def test_scale_mode_keeps_the_simulated_odds():
+    sizer, ohlcv = make_sizer(confidence_weighting="scale"), candles()
+    low = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.3)
+    high = sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.9)
+    assert low.take_odds == low.p_take
+    assert low.expected_return == high.expected_return
+    assert high.binding == "no_edge"  # Drift-free history: confidence cannot create an edge
+
+
+def test_no_edge_sizes_zero():
+    result = make_sizer().size("BTC/USDT", "BUY", candles(), confidence=0.1)
+    assert result.binding == "no_edge"
+    assert result.amount_pct == 0.0
+
+
+def test_kelly_is_capped_by_stop_risk_before_exposure():
+    sizer = make_sizer(kelly_fraction=1.0, max_risk_per_trade=0.01, max_asset_exposure=10.0,
+                       max_gross_exposure=10.0)
+    result = sizer.size("BTC/USDT", "BUY", candles(), confidence=0.95)
+    # The stop cap includes fees and gap-through fills, so it is below risk / stop distance
+    assert result.loss_at_stop >= 0.02 + sizer.fee
+    assert result.amount_pct <= 0.01 / result.loss_at_stop + 1e-4
+    assert result.binding in ("stop", "cvar")
+
+
+def test_exposure_room_binds_last():
+    sizer = make_sizer(kelly_fraction=1.0)
+    result = sizer.size("BTC/USDT", "SELL", candles(), confidence=0.95,
+                        exposure={"position": -0.45, "gross": 0.5})
+    assert result.binding == "exposure"
+    assert result.amount_pct == pytest.approx(0.05)
+
+
+def test_paths_are_reused_until_the_next_bar():
+    sizer, ohlcv = make_sizer(), candles()
+    sizer.size("BTC/USDT", "BUY", ohlcv, confidence=0.6)
+    sizer.size("BTC/USDT", "SELL", ohlcv, confidence=0.6)
+    assert sizer.simulated == 1
+    sizer.size("BTC/USDT", "BUY", ohlcv + [[len(ohlcv) * 60000, 100, 100, 100, 100, 1.0]])
+    assert sizer.simulated == 2
+
+
+def test_sized_signal_carries_the_exits_it_was_sized_for():
+    generator = SignalGenerator(sizing_config={"seed": 7, "paths": 1000})
+    signal = TradingSignal("BTC/USDT", "BUY", 0.8, entry_price=100.0, stop_loss=105.0)
+    generator._size_signal(signal, candles(), None)
+    assert signal.stop_loss == pytest.approx(98.0)  # Wrong-side stop replaced by the default
+    assert signal.take_profit == pytest.approx(104.0)
+    assert (signal.sizing["stop_loss"], signal.sizing["take_profit"]) == (signal.stop_loss, signal.take_profit)
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import tracemalloc
+
+import pytest
+
+from utils.profiler import SamplingProfiler, enter_command, exit_command
+
+
+def spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def cmd_busy():
+    spin(0.1)
+    # Work fanned out to tasks is attributed to the command that created them
+    await asyncio.gather(fanned_out(), fanned_out())
+
+
+async def fanned_out():
+    await asyncio.sleep(0)
+    spin(0.1)
+
+
+def test_samples_are_attributed_to_the_command_and_its_tasks():
+    profiler = SamplingProfiler()
+
+    async def scenario():
+        profiler.set_handlers({"BUSY": cmd_busy})
+        profiler.start(duration_s=5, interval_ms=2, memory=False)
+        with pytest.raises(RuntimeError):
+            profiler.start()
+        token = enter_command("BUSY")
+        try:
+            await cmd_busy()
+        finally:
+            exit_command(token)
+        spin(0.05)  # Outside any command
+        profiler.stop()
+        await asyncio.sleep(0)  # Let the task factory restore run
+        return asyncio.get_running_loop().get_task_factory()
+
+    assert asyncio.run(scenario()) is None
+    report = profiler.report(collapsed=True)
+    busy = report["by_command"]["BUSY"]
+    assert busy["samples"] > 0.6 * report["samples"]
+    assert busy["top_functions"][0]["function"].startswith("spin ")
+    stacks = report["collapsed"].splitlines()
+    # Task frames do not include the handler; the command still comes from the task
+    assert any(line.startswith("BUSY;") and "fanned_out" in line and "cmd_busy" not in line for line in stacks)
+
+
+def test_sessions_stop_by_themselves_and_release_tracemalloc():
+    profiler = SamplingProfiler()
+
+    async def scenario():
+        profiler.start(duration_s=0.1, interval_ms=5, memory=True)
+        blocks = [bytearray(1024) for _ in range(200)]
+        await asyncio.sleep(0.3)
+        return blocks
+
+    asyncio.run(scenario())
+    assert not profiler.running
+    assert not tracemalloc.is_tracing()
+    report = profiler.report()
+    assert report["status"] == "stopped"
+    assert "top_allocations" in report["memory"]
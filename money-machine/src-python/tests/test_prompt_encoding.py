@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from engine.signal_generator import MarketContext, PromptStats, estimate_tokens
+
+
+def candles(n: int, start: int = 0):
+    return [[(start + i) * 300000, 100 + i, 101 + i, 99 + i, 100.5 + i, 1500.0] for i in range(n)]
+
+
+def test_incremental_rows_match_a_fresh_encoding():
+    history = candles(30)
+    updated = history[:19] + [[history[19][0], 119, 125, 118, 124, 9e5]] + history[20:]
+    incremental = MarketContext()
+    incremental.add_market_data("BTC/USDT", history[:20])
+    # The forming bar changed and new bars arrived since the last call
+    incremental.add_market_data("BTC/USDT", updated)
+
+    fresh = MarketContext()
+    fresh.add_market_data("BTC/USDT", updated)
+    assert incremental.get_compact_context("BTC/USDT") == fresh.get_compact_context("BTC/USDT")
+    assert incremental.get_context_string("BTC/USDT") == fresh.get_context_string("BTC/USDT")
+
+
+def test_compact_rows_are_basis_points_and_fit_the_budget():
+    context = MarketContext(token_budget=60)
+    context.add_market_data("BTC/USDT", [[0, 100, 100, 100, 100, 10], [300000, 100, 102, 99, 101, 2500]])
+    text = context.get_compact_context("BTC/USDT")
+    assert text.splitlines()[0] == "BTC/USDT 5m candles, n=2, base close=100.00"
+    assert "+100 99 198 2.5k" in text  # +1% close, high 0.99% above, low 1.98% below
+
+    context.add_market_data("BTC/USDT", candles(100))
+    text = context.get_compact_context("BTC/USDT")
+    assert estimate_tokens(text) <= 60
+    assert text.splitlines()[-1].startswith("last=199.50 change=+")
+    assert "n=100" not in text
+
+
+def test_timeframes_are_kept_apart():
+    context = MarketContext()
+    context.add_market_data("BTC/USDT", candles(5), "5m")
+    context.add_market_data("BTC/USDT", [[0, 50, 50, 50, 50, 1], [3600000, 50, 50, 50, 50, 1]], "1h")
+    assert "last=104.50" in context.get_compact_context("BTC/USDT", timeframe="5m")
+    assert "last=50.00" in context.get_compact_context("BTC/USDT")  # Latest timeframe by default
+
+
+def test_prompt_stats_prefer_reported_usage():
+    stats = PromptStats()
+    stats.record("x" * 40, SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=25)), 10.0, 4.0)
+    stats.record("x" * 40, None, 20.0)
+    summary = stats.to_dict()
+    assert summary["avg_prompt_tokens"] == (25 + 10) / 2
+    assert summary["avg_latency_ms"] == 15.0
+    assert summary["avg_decision_ms"] == 4.0
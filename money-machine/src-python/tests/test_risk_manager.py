@@ -0,0 +1,95 @@
+from engine.risk_manager import RiskManager
+
+CONFIG = {
+    "max_risk_per_trade": 0.02,
+    "max_daily_loss": 0.05,
+    "max_open_positions": 2,
+    "max_gross_exposure": 1.0,
+    "max_asset_exposure": 0.5,
+}
+
+
+def make_risk(**overrides):
+    return RiskManager({**CONFIG, **overrides}, equity=10000.0)
+
+
+def test_rejects_bad_amount_and_missing_price():
+    risk = make_risk()
+    assert not risk.check_order("BTC/USDT", "buy", 0, 100.0, 10000.0).approved
+    assert not risk.check_order("BTC/USDT", "buy", 1.0, None, 10000.0).approved
+
+
+def test_trade_risk_uses_stop_distance():
+    risk = make_risk()
+    # 10 units at 100 without a stop risks the full 1000 notional (> 2% of 10000)
+    assert not risk.check_order("BTC/USDT", "buy", 10, 100.0, 10000.0).approved
+    # With a stop 2 away only 20 is at risk
+    assert risk.check_order("BTC/USDT", "buy", 10, 100.0, 10000.0, stop_loss=98.0).approved
+
+
+def test_asset_and_gross_exposure_limits():
+    risk = make_risk(max_risk_per_trade=1.0)
+    risk.on_fill("BTC/USDT", 40, 100.0)  # 4000 notional
+    check = risk.check_order("BTC/USDT", "buy", 20, 100.0, 10000.0)
+    assert not check.approved and "BTC exposure" in check.reason
+    # Same base asset on another quote counts against the same limit
+    assert not risk.check_order("BTC/USD", "buy", 20, 100.0, 10000.0).approved
+
+    risk.on_order_open("o1", 5500.0)
+    check = risk.check_order("ETH/USDT", "buy", 10, 100.0, 10000.0)
+    assert not check.approved and "Gross exposure" in check.reason
+    risk.on_order_closed("o1")
+    assert risk.open_order_notional == 0.0
+    assert risk.check_order("ETH/USDT", "buy", 10, 100.0, 10000.0).approved
+
+
+def test_reducing_orders_always_pass():
+    risk = make_risk(max_risk_per_trade=1.0)
+    risk.on_fill("BTC/USDT", 40, 100.0)
+    risk.daily_realized_pnl = -10000.0  # Far past the daily loss limit
+    assert risk.check_order("BTC/USDT", "sell", 40, 100.0, 10000.0).approved
+    # A flip through zero is a new position and is checked
+    assert not risk.check_order("BTC/USDT", "sell", 41, 100.0, 10000.0).approved
+
+
+def test_max_open_positions():
+    risk = make_risk(max_risk_per_trade=1.0, max_asset_exposure=1.0)
+    risk.on_fill("BTC/USDT", 1, 100.0)
+    risk.on_fill("ETH/USDT", 1, 100.0)
+    check = risk.check_order("SOL/USDT", "buy", 1, 100.0, 10000.0)
+    assert not check.approved and "Max open positions" in check.reason
+    # Adding to an existing position does not open a new one
+    assert risk.check_order("BTC/USDT", "buy", 1, 100.0, 10000.0).approved
+
+
+def test_on_fill_tracks_positions_and_daily_pnl():
+    risk = make_risk()
+    risk.on_fill("BTC/USDT", 2, 100.0)
+    assert risk.open_positions == 1
+    assert risk.gross_exposure == 200.0
+    risk.on_fill("BTC/USDT", 0, 110.0, realized_pnl=20.0)
+    assert risk.open_positions == 0
+    assert risk.gross_exposure == 0.0
+    assert risk.daily_realized_pnl == 20.0
+    assert "BTC/USDT" not in risk.position_amount
+
+
+def test_mark_revalues_exposure_incrementally():
+    risk = make_risk()
+    risk.on_fill("BTC/USDT", 2, 100.0)
+    risk.on_fill("ETH/USDT", -3, 10.0)
+    assert risk.gross_exposure == 230.0
+    assert risk.net_exposure == 170.0
+
+    version = risk.version
+    risk.mark("BTC/USDT", 150.0)
+    assert risk.gross_exposure == 330.0
+    assert risk.net_exposure == 270.0
+    assert risk.asset_net["BTC"] == 300.0
+    assert risk.version > version
+
+    version = risk.version
+    risk.mark("BTC/USDT", 150.0)  # Unchanged price: nothing to do
+    risk.mark("BTC/USDT", 0)  # No price: ignored
+    assert risk.version == version
+    assert risk.gross_exposure == 330.0
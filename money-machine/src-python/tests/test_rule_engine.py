@@ -0,0 +1,48 @@
+import pytest
+
+from engine.indicators import MarketSeries
+from skills.rule_engine import CompiledRules, RuleCompileError
+
+SPEC = {
+    "entry": {"buy": ["close > 0"]},
+    "exit": {"stop_loss_pct": 2, "take_profit_pct": 4},
+    "risk": {"max_position_pct": 5},
+}
+
+
+def flat_series(price: float = 100.0) -> MarketSeries:
+    return MarketSeries.from_ohlcv([[i * 60000, price, price, price, price, 1.0] for i in range(5)])
+
+
+def test_entry_carries_stop_target_and_size():
+    decision = CompiledRules(SPEC).evaluate(flat_series())
+    assert decision["decision"] == "BUY"
+    assert decision["stop_loss"] == pytest.approx(98.0)
+    assert decision["take_profit"] == pytest.approx(104.0)
+    assert decision["params"]["amount_pct"] == 0.05
+
+
+@pytest.mark.parametrize("amount, entry, action, reason", [
+    (1.0, 103.0, "SELL", "Stop loss"),
+    (1.0, 95.0, "SELL", "Take profit"),
+    (-1.0, 97.0, "BUY", "Stop loss"),
+    (-1.0, 105.0, "BUY", "Take profit"),
+])
+def test_open_positions_exit_at_stop_or_target(amount, entry, action, reason):
+    decision = CompiledRules(SPEC).evaluate(flat_series(), position_amount=amount, entry_price=entry)
+    assert decision["decision"] == action
+    assert reason in decision["reason"]
+
+
+def test_same_direction_entry_is_suppressed():
+    rules = CompiledRules(SPEC)
+    decision = rules.evaluate(flat_series(), position_amount=1.0, entry_price=100.0)
+    assert decision["decision"] == "HOLD"
+    # An opposite position inside its stop may still be reversed by the entry rules
+    decision = rules.evaluate(flat_series(), position_amount=-1.0, entry_price=101.0)
+    assert decision["decision"] == "BUY"
+
+
+def test_entry_section_is_required():
+    with pytest.raises(RuleCompileError):
+        CompiledRules({"exit": {"stop_loss_pct": 2}})
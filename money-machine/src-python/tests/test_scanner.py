@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from engine.scanner import UniverseScanner
+
+
+def test_scanner_skips_tickers_only_when_has_says_so():
+    calls = []
+
+    class Venue:
+        def __init__(self, venue_id, has):
+            self.id = venue_id
+            self.client = SimpleNamespace(has=has)
+
+        async def call(self, method, symbols):
+            calls.append(self.id)
+            return {s: {"symbol": s} for s in symbols}
+
+    venues = {"a": Venue("a", {"fetchTickers": False}), "b": Venue("b", lambda: None), "c": Venue("c", None)}
+    routes = {"A/USDT": venues["a"], "B/USDT": venues["b"], "C/USDT": venues["c"]}
+    engine = SimpleNamespace(exchanges=SimpleNamespace(route=routes.get, venues=venues))
+
+    tickers = asyncio.run(UniverseScanner(engine).fetch_tickers(list(routes)))
+    assert sorted(calls) == ["b", "c"]
+    assert set(tickers) == {"B/USDT", "C/USDT"}
+
+
+def candles(n: int, drift: float = 0.0, spike: float = 1.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(drift, 0.002, n)))
+    volumes = rng.uniform(9, 11, n)
+    volumes[-2] *= spike  # Last closed bar
+    return [[i * 300000, c, c, c, c, v] for i, (c, v) in enumerate(zip(closes, volumes))]
+
+
+def test_prefilter_drops_illiquid_and_keeps_uncovered_symbols_last():
+    scanner = UniverseScanner(None, {"min_quote_volume": 1000, "max_candidates": 3})
+    tickers = {
+        "A/USDT": {"quoteVolume": 5e6, "percentage": 1.0},
+        "B/USDT": {"baseVolume": 10, "last": 50, "percentage": 9.0},  # 500 quote: dropped
+        "C/USDT": {"quoteVolume": 5e6, "percentage": 8.0},
+        "D/USDT": {"quoteVolume": 2e3, "percentage": 0.1},
+    }
+    symbols = ["A/USDT", "B/USDT", "C/USDT", "D/USDT", "E/USDT"]
+    assert scanner.prefilter(symbols, tickers) == ["C/USDT", "A/USDT", "D/USDT"]
+    assert UniverseScanner(None, {"max_candidates": 5}).prefilter(symbols, tickers)[-1] == "E/USDT"
+
+
+def test_scan_ranks_movers_and_skips_short_histories():
+    data = {
+        "QUIET/USDT": candles(100, seed=1),
+        "TREND/USDT": candles(100, drift=0.002, spike=4.0, seed=2),
+        "NOISE/USDT": candles(100, seed=3),
+        "NEW/USDT": candles(20, seed=4),
+    }
+
+    async def get_market_data(symbol, timeframe, limit):
+        return data[symbol][-limit:]
+
+    scanner = UniverseScanner(SimpleNamespace(get_market_data=get_market_data), {"top_k": 2})
+    result = asyncio.run(scanner.scan(symbols=list(data)))
+    assert result.universe == 4 and result.screened == 3
+    assert [r["symbol"] for r in result.ranked][0] == "TREND/USDT"
+    assert len(result.ranked) == 2
+    assert set(result.ohlcv) == {r["symbol"] for r in result.ranked}
+    assert scanner.stats()["last"]["top"][0] == "TREND/USDT"
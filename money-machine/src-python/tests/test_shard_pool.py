@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from engine.shard_pool import ShardPool, _merge_candles
+
+RULES = {"buyer": ("hash-1", {"entry": {"buy": ["close > sma(close, 3)"]}})}
+
+
+def candles(n: int, start: int = 0):
+    return [[(start + i) * 60000, 100 + i, 101 + i, 99 + i, 100 + i, 10.0] for i in range(n)]
+
+
+def item(symbol: str, ohlcv):
+    return {"symbol": symbol, "ohlcv": ohlcv, "skills": ["buyer"], "context": True}
+
+
+def test_merge_replaces_the_forming_bar_and_trims():
+    store = candles(3)
+    _merge_candles(store, [[120000, 1, 1, 1, 1, 1], [180000, 2, 2, 2, 2, 2], [60000, 9, 9, 9, 9, 9]], 3)
+    assert [c[0] for c in store] == [60000, 120000, 180000]
+    assert store[1][4] == 1 and store[0][4] == 101  # Older bars are never rewritten
+
+
+@pytest.fixture
+def pool():
+    pool = ShardPool(workers=2, max_candles=50, token_budget=2000)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def test_workers_keep_history_and_restart_with_it(pool):
+    symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+
+    async def scenario():
+        first = await pool.analyze([item(s, candles(20)) for s in symbols], rules=RULES)
+        # Only the forming bar and newer are sent now; the result still sees the full history
+        second = await pool.analyze([item(s, candles(21)) for s in symbols], rules=RULES)
+
+        index = pool.shard_for("BTC/USDT")
+        pool._shards[index].process.kill()
+        pool._shards[index].process.join()
+        third = await pool.analyze([item(s, candles(22)) for s in symbols], rules=RULES)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    for results in (first, second, third):
+        assert [r["decisions"]["buyer"]["decision"] for r in results] == ["BUY"] * 3
+    assert "n=20" in first[0]["context"]
+    assert "n=21" in second[0]["context"]
+    assert "n=22" in third[0]["context"]  # Full history resent to the restarted worker
+    assert pool.restarts == 1
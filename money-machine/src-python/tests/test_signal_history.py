@@ -0,0 +1,59 @@
+from engine.signal_generator import TradingSignal
+from engine.signal_history import SignalHistory
+
+
+def signal(i: int, symbol: str = "BTC/USDT") -> TradingSignal:
+    return TradingSignal(symbol=symbol, action=("BUY", "SELL", "HOLD")[i % 3], confidence=0.5,
+                         entry_price=100.0 + i, reasoning=f"signal {i}", timestamp=1000.0 + i)
+
+
+def filled_history(tmp_path, n: int = 10, capacity: int = 4) -> SignalHistory:
+    history = SignalHistory({"capacity": capacity, "spill_dir": str(tmp_path)})
+    for i in range(n):
+        history.record(signal(i))
+    return history
+
+
+def reasons(page):
+    return [s["reasoning"] for s in page["signals"]]
+
+
+def test_query_spans_spill_file_and_memory(tmp_path):
+    history = filled_history(tmp_path)
+    assert history.stats()["spilled"] > 0
+
+    page = history.query("BTC/USDT", limit=100)
+    assert reasons(page) == [f"signal {i}" for i in range(10)]
+    assert page["total"] == 10 and page["first_index"] == 0
+    assert page["signals"][3]["entry_price"] == 103.0
+    assert page["signals"][0]["stop_loss"] is None
+
+
+def test_time_range_and_cursor_cross_the_boundary(tmp_path):
+    history = filled_history(tmp_path)
+    spilled = history.stats()["spilled"]
+
+    page = history.query("BTC/USDT", start=1000.0 + spilled - 2, end=1000.0 + spilled + 1, limit=2)
+    assert reasons(page) == [f"signal {spilled - 2}", f"signal {spilled - 1}"]
+    page = history.query("BTC/USDT", end=1000.0 + spilled + 1, limit=2, cursor=page["next_cursor"])
+    assert reasons(page) == [f"signal {spilled}", f"signal {spilled + 1}"]
+    assert page["next_cursor"] is None
+
+
+def test_history_survives_restart(tmp_path):
+    history = filled_history(tmp_path)
+    history.flush()
+
+    reopened = SignalHistory({"capacity": 4, "spill_dir": str(tmp_path)})
+    page = reopened.query("BTC/USDT", start=1007.0)
+    assert reasons(page) == ["signal 7", "signal 8", "signal 9"]
+
+
+def test_without_spill_old_records_are_dropped():
+    history = SignalHistory({"capacity": 4})
+    for i in range(10):
+        history.record(signal(i))
+    page = history.query("BTC/USDT")
+    assert page["first_index"] == 6
+    assert reasons(page) == [f"signal {i}" for i in range(6, 10)]
+    assert history.query("ETH/USDT")["signals"] == []
@@ -0,0 +1,45 @@
+from skills.skill_cache import SkillCache
+
+SKILL = """---
+name: dated
+created: 2024-05-01
+system_prompt: Buy dips.
+---
+Body text.
+"""
+
+
+def test_hits_and_misses_return_the_same_skill(tmp_path):
+    skill_file = tmp_path / "dated.aix"
+    skill_file.write_text(SKILL)
+    cache_path = tmp_path / ".skill_cache.json"
+
+    first = SkillCache(cache_path)
+    miss = first.load_skill(skill_file)
+    first.save({miss["_content_hash"]})
+
+    second = SkillCache(cache_path)
+    hit = second.load_skill(skill_file)
+    assert (first.misses, second.hits) == (1, 1)
+    assert hit == miss
+    assert hit["created"] == "2024-05-01"
+    assert hit["_raw_content"].strip() == "Body text."
+    assert hit["_system_instruction"].startswith("Buy dips.")
+
+
+def test_large_bodies_load_lazily(tmp_path):
+    skill_file = tmp_path / "big.aix"
+    skill_file.write_text("---\nname: big\n---\n" + "x" * 100)
+    skill = SkillCache(lazy_body_threshold=10).load_skill(skill_file)
+    assert "_raw_content" not in skill
+    assert SkillCache.load_body(skill).strip() == "x" * 100
+
+
+def test_save_drops_entries_without_a_file(tmp_path):
+    cache_path = tmp_path / ".skill_cache.json"
+    skill_file = tmp_path / "gone.aix"
+    skill_file.write_text("name: gone\n")
+    cache = SkillCache(cache_path)
+    cache.load_skill(skill_file)
+    cache.save(set())
+    assert SkillCache(cache_path)._entries == {}
@@ -0,0 +1,45 @@
+import json
+
+from utils.versioned_state import VersionedState, diff_sections
+
+
+def decode(encoded):
+    return json.loads(encoded.line)["result"]
+
+
+def test_unchanged_reply_is_cached_and_carries_live_fields():
+    state = VersionedState()
+    state.publish({"trading_active": False, "skills_loaded": 3})
+    full = decode(state.reply(None, {"uptime_seconds": 1.0}))
+    assert full["full"] is True and full["skills_loaded"] == 3 and full["uptime_seconds"] == 1.0
+
+    # Republishing the same sections keeps the version, so the poll stays "unchanged"
+    assert state.publish({"trading_active": False, "skills_loaded": 3}) == full["version"]
+    first = decode(state.reply(full["version"], {"live": {"rss_bytes": 1}}))
+    second = decode(state.reply(full["version"], {"live": {"rss_bytes": 2}}))
+    assert first["unchanged"] is True and first["updated_at"] == full["updated_at"]
+    assert (first["live"], second["live"]) == ({"rss_bytes": 1}, {"rss_bytes": 2})
+    assert second["timestamp"] >= first["timestamp"]
+    assert state.stats()["encoded"] == 2 and state.stats()["cached"] == 1
+
+
+def test_delta_and_expired_versions():
+    state = VersionedState(history=2)
+    v1 = state.publish({"balance": {"USDT": 100.0, "BTC": 1.0}, "mode": "paper"})
+    v2 = state.publish({"balance": {"USDT": 90.0}, "mode": "paper"})
+    delta = decode(state.reply(v1))
+    assert delta["since_version"] == v1 and delta["version"] == v2
+    assert delta["delta"] == {"balance": {"USDT": 90.0, "BTC": None}}
+
+    state.publish({"balance": {"USDT": 80.0}, "mode": "paper"})
+    assert decode(state.reply(v1))["full"] is True  # v1 is no longer kept
+
+
+def test_server_time_can_be_overridden():
+    state = VersionedState()
+    state.publish({"a": 1})
+    assert decode(state.reply(None, {"timestamp": 123.0}))["timestamp"] == 123.0
+
+
+def test_diff_sections_reports_removed_keys():
+    assert diff_sections({"a": 1, "b": 2}, {"a": 1}) == {"b": None}
@@ -0,0 +1,198 @@
+"""
+Admission control for IPC commands
+Commands fall into priority classes: control (kill switch, cancels) is never
+queued or limited; query and compute requests pass a per-command limit, a
+per-class limit and a shared in-flight limit whose waiters are woken in
+priority order. Queues are bounded: a full queue rejects at once with a
+retry hint, and every request runs under its class timeout.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+CONTROL, QUERY, COMPUTE = "control", "query", "compute"
+PRIORITY = {CONTROL: 0, QUERY: 1, COMPUTE: 2}
+
+DEFAULT_CLASSES = {
+    # Limits of 0 mean unlimited; timeout_s 0 means no timeout (never cancel a kill switch mid-way)
+    CONTROL: {"concurrency": 0, "max_queue": 0, "timeout_s": 0},
+    QUERY: {"concurrency": 32, "max_queue": 256, "timeout_s": 10},
+    COMPUTE: {"concurrency": 8, "max_queue": 64, "timeout_s": 60},
+}
+
+DEFAULT_COMMANDS = {
+    "PING": {"class": CONTROL},
+    "START_TRADING": {"class": CONTROL},
+    "STOP_TRADING": {"class": CONTROL},
+    "CANCEL_ORDER": {"class": CONTROL},
+    "UPDATE_CONFIG": {"class": CONTROL},
+    "PROFILE_STOP": {"class": CONTROL},
+    "GENERATE_SIGNAL": {"class": COMPUTE, "concurrency": 4},
+    "EXECUTE_SKILL": {"class": COMPUTE, "concurrency": 4},
+    "EXECUTE_SKILLS": {"class": COMPUTE, "concurrency": 1},
+    "RELOAD_SKILLS": {"class": COMPUTE, "concurrency": 1},
+    "SCAN_UNIVERSE": {"class": COMPUTE, "concurrency": 1},
+}
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a queue is full; retry_after_ms is a hint for the client"""
+
+    def __init__(self, message: str, retry_after_ms: int):
+        super().__init__(message)
+        self.retry_after_ms = retry_after_ms
+
+
+class _Limiter:
+    """Concurrency limit with a bounded wait queue, served by priority then arrival"""
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = max(0, int(limit))
+        self.max_queue = max(0, int(max_queue))
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: List[tuple] = []  # (priority, seq, future)
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int):
+        if not self.limit:
+            return
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.name} queue full ({self.queued} waiting)", 0)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future  # The releasing request hands its slot over
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # Slot was handed over just as we were cancelled
+            raise
+
+    def release(self):
+        if not self.limit:
+            return
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "queued": self.queued,
+                "rejected": self.rejected}
+
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_ms = 0.0  # EWMA of time from arrival to completion
+
+    def record(self, elapsed_ms: float):
+        self.completed += 1
+        self.avg_ms = elapsed_ms if self.completed == 1 else 0.9 * self.avg_ms + 0.1 * elapsed_ms
+
+
+class AdmissionController:
+    """Runs command handlers under their class's limits, queue bounds and timeout"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.enabled = bool(config.get('enabled', True))
+
+        self.classes = {name: dict(values) for name, values in DEFAULT_CLASSES.items()}
+        for name, values in (config.get('classes') or {}).items():
+            self.classes.setdefault(name, {}).update(values)
+        self.commands = {name: dict(values) for name, values in DEFAULT_COMMANDS.items()}
+        for name, values in (config.get('commands') or {}).items():
+            self.commands.setdefault(name, {}).update(values)
+
+        # Shared by every non-control request; frees up for queries before compute
+        self._shared = _Limiter("engine", config.get('max_in_flight', 32), config.get('max_queue', 256))
+        self._class_limits = {
+            name: _Limiter(name, values.get('concurrency', 0), values.get('max_queue', 0))
+            for name, values in self.classes.items()
+        }
+        self._command_limits: Dict[str, _Limiter] = {}
+        for name, values in self.commands.items():
+            if values.get('concurrency'):
+                max_queue = values.get('max_queue', self.classes[self.class_of(name)].get('max_queue', 0))
+                self._command_limits[name] = _Limiter(name, values['concurrency'], max_queue)
+        self._stats = {name: _ClassStats() for name in self.classes}
+
+    def class_of(self, command: str) -> str:
+        return self.commands.get(command, {}).get('class', QUERY)
+
+    def _retry_after_ms(self, klass: str, limiter: _Limiter) -> int:
+        """Rough time until the queue drains: queue length x average service time / concurrency"""
+        avg_ms = self._stats[klass].avg_ms or 100.0
+        return int(max(50.0, (limiter.queued + 1) * avg_ms / max(limiter.limit, 1)))
+
+    async def run(self, command: str, handler: Callable[[Any], Awaitable], payload: Any) -> Any:
+        """await handler(payload) once admitted; raises AdmissionRejected or asyncio.TimeoutError"""
+        klass = self.class_of(command)
+        if not self.enabled or klass == CONTROL:
+            return await handler(payload)
+
+        timeout = self.classes[klass].get('timeout_s') or None
+        return await asyncio.wait_for(self._admitted(command, klass, handler, payload), timeout)
+
+    async def _admitted(self, command: str, klass: str, handler: Callable, payload: Any) -> Any:
+        stats = self._stats[klass]
+        priority = PRIORITY.get(klass, PRIORITY[COMPUTE])
+        limiters = [l for l in (self._command_limits.get(command), self._class_limits[klass], self._shared) if l]
+        start = time.perf_counter()
+        held = []
+        try:
+            for limiter in limiters:
+                try:
+                    await limiter.acquire(priority)
+                except AdmissionRejected as e:
+                    stats.rejected += 1
+                    raise AdmissionRejected(f"{command} rejected: {e}", self._retry_after_ms(klass, limiter))
+                held.append(limiter)
+            stats.admitted += 1
+            result = await handler(payload)
+            stats.record((time.perf_counter() - start) * 1000)
+            return result
+        except asyncio.CancelledError:
+            # Timed out in the queue or in the handler
+            stats.timed_out += 1
+            raise
+        finally:
+            for limiter in reversed(held):
+                limiter.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "shared": self._shared.stats(),
+            "classes": {
+                name: {
+                    **self._class_limits[name].stats(),
+                    "admitted": s.admitted,
+                    "completed": s.completed,
+                    "rejected": s.rejected,
+                    "timed_out": s.timed_out,
+                    "avg_ms": round(s.avg_ms, 2),
+                }
+                for name, s in self._stats.items()
+            },
+            "commands": {name: limiter.stats() for name, limiter in self._command_limits.items()},
+        }
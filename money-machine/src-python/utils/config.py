@@ -16,6 +16,9 @@ def load_config() -> Dict[str, Any]:
         "initial_balance": 10000.0,
         "max_risk_per_trade": 0.02,  # 2%
         "max_daily_loss": 0.05,  # 5%
+        "max_open_positions": 10,
+        "max_gross_exposure": 1.0,  # Sum of |position notional| as a multiple of equity
+        "max_asset_exposure": 0.5,  # Net notional per base asset as a multiple of equity
         
         # Exchange configuration
         "exchange": {
@@ -23,11 +26,143 @@ def load_config() -> Dict[str, Any]:
             "api_key": os.environ.get("EXCHANGE_API_KEY", ""),
             "secret": os.environ.get("EXCHANGE_SECRET", ""),
             "sandbox": os.environ.get("EXCHANGE_SANDBOX", "true").lower() == "true",
+            "simulator": {},  # SimulatedExchange options when name is "simulator"
+        },
+        # Optional multi-venue setup; replaces "exchange" when non-empty. Each entry takes
+        # the keys above plus "id", "symbols" (routed here), "rate_limit_ms", "max_in_flight"
+        "exchanges": [],
+        "http_pool": {
+            "limit": 100,
+            "limit_per_host": 20,
+            "dns_cache_ttl": 300,
+            "keepalive_timeout": 30,
+        },
+        
+        # Execution: "live" sends orders to the exchange, "paper" matches them locally
+        "trading_mode": os.environ.get("TRADING_MODE", "live"),
+        "order_poll_ms": 2000,  # Live resting orders are reconciled via fetch_order this often
+        "paper": {
+            "maker_fee": 0.001,
+            "taker_fee": 0.001,
+            "slippage_bps": 1.0,  # Market orders fill this far beyond the last price
+            "max_participation": 1.0,  # Share of bar volume resting orders may fill
+            "fill_on_touch": True,  # False requires price to trade through the limit
+        },
+        
+        # Local multi-timeframe candles: fetch one base series per symbol and
+        # aggregate every requested timeframe from it
+        "candles": {
+            "enabled": False,
+            "base_timeframe": "1m",
+            "history": 1000,  # Base bars per fetch window and kept per symbol
+            "max_bars": 500,  # Bars kept per aggregated timeframe
+            "refresh_ms": 1000,  # Base series is refetched at most this often per symbol
+        },
+        
+        # L2 order books for spread / imbalance / microprice features
+        "order_book": {
+            "enabled": False,
+            "depth": 50,  # Levels kept per side
+            "max_age_ms": 1000,  # Polling mode: refresh snapshots older than this
         },
         
         # AI Provider (Gemini)
         "gemini_api_key": os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY", ""),
         "gemini_model": os.environ.get("GEMINI_MODEL", "gemini-1.5-flash"),
+        "skill_ai_concurrency": 4,  # Max in-flight Gemini calls during EXECUTE_SKILLS
+        "prompt_format": "compact",  # "compact" numeric encoding or legacy "markdown" table
+        "prompt_token_budget": 600,  # Market context budget for GENERATE_SIGNAL
+        "skill_prompt_token_budget": 120,  # Market context budget per skill call
+        # Local model tier for GENERATE_SIGNAL: confident predictions are answered
+        # locally, the rest go to Gemini. Train it offline from log_path with
+        # python -m engine.local_model train <logs> -o <model_path>
+        "local_model": {
+            "enabled": False,
+            "model_path": "local_model.json",
+            "min_confidence": 0.8,  # Escalate to Gemini below this
+            "regime_z": 4.0,  # Escalate when any feature is this many stdevs from training data
+            "shadow_every": 20,  # Also escalate every Nth confident case, to measure agreement
+            "log_path": "",  # Gemini decisions + features (JSON lines), the training input
+        },
+        # Monte Carlo sizing of every BUY / SELL signal; replaces the model's amount_pct.
+        # Risk limits come from max_risk_per_trade / max_gross_exposure / max_asset_exposure
+        "sizing": {
+            "enabled": True,
+            "paths": 20000,
+            "horizon_bars": 32,  # Paths that hit neither stop nor target exit here
+            "lookback_bars": 256,  # Closed-bar returns resampled into the paths
+            "kelly_fraction": 0.5,  # Share of the Kelly size taken
+            "cvar_alpha": 0.95,  # Tail loss at this quantile is held to max_risk_per_trade
+            "round_trip_fee": 0.002,
+            "default_stop_pct": 0.02,  # Used when a signal has no usable stop / target
+            "default_take_pct": 0.04,
+            # "odds": confidence sets P(take), capped at max_take_odds; "scale": multiplies
+            # the Kelly size from the unweighted paths; "off": ignored
+            "confidence_weighting": "odds",
+            "max_take_odds": 0.6,
+        },
+        # SCAN_UNIVERSE: bulk screening before signal generation. One fetch_tickers per
+        # venue prefilters the universe; candles for the candidates are scored together
+        "scanner": {
+            "symbols": [],  # Empty: every active market quoted in "quote"
+            "quote": "USDT",
+            "timeframe": "5m",
+            "bars": 100,
+            "max_candidates": 200,  # Kept by the ticker prefilter (0 = no prefilter)
+            "min_quote_volume": 0.0,
+            "concurrency": 32,  # OHLCV requests in flight during a scan
+            "momentum_bars": 12,
+            "volume_bars": 20,
+            "weights": {"volatility": 1.0, "momentum": 1.0, "volume_spike": 1.0},
+            "top_k": 10,  # Symbols forwarded to the signal generator
+            "signal_concurrency": 4,
+        },
+        # Closed-bar features (indicators, returns, volatility, volume z-score,
+        # exposure) shared by signal and skill prompts
+        "features": {
+            "window": 20,  # Bars for volatility and volume z-score
+            "max_candles": 100,  # Candles kept per symbol for prompt context
+        },
+        "signal_history": {
+            "capacity": 1000,  # Signals kept in memory per symbol
+            "spill_dir": "",  # When set, older signals are appended here instead of dropped
+        },
+        
+        # Analytics workers: >0 moves indicator, rule and prompt-context work of
+        # EXECUTE_SKILLS into that many processes, sharded by symbol
+        "shard_workers": 0,
+        
+        # IPC admission control: "control" commands (STOP_TRADING, CANCEL_ORDER, ...)
+        # always run at once; query and compute requests are limited, queued by
+        # priority and rejected with retry_after_ms when their queue is full
+        "admission": {
+            "enabled": True,
+            "max_in_flight": 32,  # Shared by query and compute; queries are admitted first
+            "max_queue": 256,
+            "classes": {
+                "query": {"concurrency": 32, "max_queue": 256, "timeout_s": 10},
+                "compute": {"concurrency": 8, "max_queue": 64, "timeout_s": 60},
+            },
+            "commands": {
+                "GENERATE_SIGNAL": {"concurrency": 4},
+                "EXECUTE_SKILLS": {"concurrency": 1},
+            },
+        },
+        
+        # Thread pools for blocking work: Gemini SDK calls, file I/O, parsing
+        "executors": {
+            "llm": {"workers": 8, "max_queue": 256},  # Waiting callers beyond workers; more are rejected
+            "io": {"workers": 4, "max_queue": 1024},
+            "cpu": {"workers": 4, "max_queue": 1024},
+        },
+        
+        # Record exchange and Gemini traffic to a local file, or replay a recording
+        # offline (no network or API keys) for benchmarking and profiling
+        "cassette": {
+            "mode": os.environ.get("CASSETTE_MODE", "off"),  # "off", "record" or "replay"
+            "path": os.environ.get("CASSETTE_PATH", "session.cassette.jsonl.gz"),
+            "speed": os.environ.get("CASSETTE_SPEED", "recorded"),  # Replay at "recorded" latency or "fast"
+        },
         
         # IPC
         "ipc_port": int(os.environ.get("TAURI_PORT", 19284)),
@@ -0,0 +1,171 @@
+"""
+Named, bounded thread pools for blocking work
+Each kind of blocking call gets its own pool ("llm" for SDK calls, "io" for
+file access, "cpu" for parsing and compilation), so a burst in one cannot
+starve the others or the loop's default executor. Callers beyond a pool's
+worker count wait on the event loop; beyond max_queue they are rejected.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_POOLS = {
+    "llm": {"workers": 8, "max_queue": 256},
+    "io": {"workers": 4, "max_queue": 1024},
+    "cpu": {"workers": 4, "max_queue": 1024},
+}
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a pool's wait queue is full"""
+
+
+def _release_threadsafe(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        pass  # Loop already closed
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded wait queue plus utilization and queue-wait figures"""
+
+    def __init__(self, name: str, workers: int, max_queue: int, window: int = 512):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-pool")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self._lock = threading.Lock()
+        self._waits: deque = deque(maxlen=window)  # Recent queue waits (ms)
+        self._started = time.perf_counter()
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self.max_wait_ms = 0.0
+
+    def _timed(self, submitted: float, fn: Callable, args, kwargs):
+        """Runs in the pool thread"""
+        start = time.perf_counter()
+        with self._lock:
+            self.active += 1
+            wait_ms = (start - submitted) * 1000
+            self._waits.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) on this pool"""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            # Semaphores bind to one loop
+            self._slots = asyncio.Semaphore(self.workers)
+            self._slots_loop = loop
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.name} pool saturated ({self.waiting} waiting)")
+
+        submitted = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            future = self._pool.submit(self._timed, submitted, fn, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the thread finishes, not until the caller stops
+        # waiting: a cancelled (timed-out) caller cannot free a busy worker
+        slots = self._slots
+        future.add_done_callback(lambda _: _release_threadsafe(loop, slots))
+        return await asyncio.wrap_future(future)
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """Blocking map for synchronous callers (e.g. skill loading outside the loop)"""
+        submitted = time.perf_counter()
+        futures = [self._pool.submit(self._timed, submitted, fn, (item,), {}) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            busy = self.busy_seconds
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "queued": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "utilization": self.active / self.workers,
+            "busy_pct": round(100 * busy / (elapsed * self.workers), 2),
+            "avg_wait_ms": sum(waits) / len(waits) if waits else 0.0,
+            "p99_wait_ms": waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, BoundedExecutor] = {}
+
+
+def configure_executors(config: Optional[Dict] = None):
+    """(Re)create the pools from config['executors'] ({name: {workers, max_queue}})"""
+    shutdown_executors()
+    settings = {name: dict(values) for name, values in DEFAULT_POOLS.items()}
+    for name, values in ((config or {}).get('executors') or {}).items():
+        settings.setdefault(name, {}).update(values)
+    for name, values in settings.items():
+        _pools[name] = BoundedExecutor(
+            name,
+            values.get('workers', 4),
+            values.get('max_queue', 1024)
+        )
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Pool by name, created with defaults if configure_executors was not called"""
+    pool = _pools.get(name)
+    if pool is None:
+        values = DEFAULT_POOLS.get(name, {})
+        pool = BoundedExecutor(name, values.get('workers', 4), values.get('max_queue', 1024))
+        _pools[name] = pool
+    return pool
+
+
+async def run_blocking(pool: str, fn: Callable, *args, **kwargs) -> Any:
+    """Shorthand for get_executor(pool).run(fn, ...)"""
+    return await get_executor(pool).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict]:
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+
+def shutdown_executors():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
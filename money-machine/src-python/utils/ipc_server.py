@@ -7,17 +7,34 @@ import json
 import logging
 from typing import Callable, Any
 
+from utils.logger import RateLimitedLogger
+
 logger = logging.getLogger(__name__)
+hot_path_logger = RateLimitedLogger(logger, interval=10.0)
+
+
+class EncodedResult:
+    """Command result serialized ahead of time; written to clients as is"""
+    
+    __slots__ = ('line',)
+    
+    def __init__(self, result_json: str):
+        self.line = ('{"result":' + result_json + ',"error":null}\n').encode('utf-8')
 
 
 class IPCServer:
     """TCP server for inter-process communication with Tauri/Rust backend"""
     
-    def __init__(self, command_handler: Callable, host: str = "127.0.0.1", port: int = 19284):
+    def __init__(self, command_handler: Callable, host: str = "127.0.0.1", port: int = 19284,
+                 read_timeout: float = 10.0):
         self.host = host
         self.port = port
+        # Clients that connect but never send a request are dropped after this
+        self.read_timeout = read_timeout
         self.command_handler = command_handler
         self.server = None
+        self.open_connections = 0
+        self.total_connections = 0
     
     async def start(self):
         """Start the TCP server"""
@@ -35,10 +52,16 @@ class IPCServer:
         """Handle incoming client connection"""
         addr = writer.get_extra_info('peername')
         logger.debug(f"New connection from {addr}")
+        self.open_connections += 1
+        self.total_connections += 1
         
         try:
             # Read request (read until newline)
-            data = await reader.readline()
+            try:
+                data = await asyncio.wait_for(reader.readline(), self.read_timeout)
+            except asyncio.TimeoutError:
+                hot_path_logger.warning("IPC client %s sent no request within %.0fs", addr, self.read_timeout)
+                return
             if not data:
                 return
             
@@ -59,20 +82,27 @@ class IPCServer:
             # Execute command handler
             result = await self.command_handler(command, payload)
             
-            # Send response
-            response = json.dumps(result)
-            writer.write((response + "\n").encode('utf-8'))
+            # Send response (pre-encoded results skip serialization)
+            if isinstance(result, EncodedResult):
+                writer.write(result.line)
+            else:
+                response = json.dumps(result)
+                writer.write((response + "\n").encode('utf-8'))
             await writer.drain()
             
         except Exception as e:
-            logger.error(f"IPC handler error: {e}")
+            hot_path_logger.error("IPC handler error: %s", e)
             error_response = json.dumps({"error": str(e)})
             writer.write((error_response + "\n").encode('utf-8'))
             await writer.drain()
         
         finally:
+            self.open_connections -= 1
             writer.close()
-            await writer.wait_closed()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
             logger.debug(f"Connection closed from {addr}")
     
     async def stop(self):
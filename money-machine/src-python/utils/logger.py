@@ -1,33 +1,156 @@
 """
 Logger configuration for Money Machine
+Records are handed to a background writer thread through a bounded queue,
+so a slow or full stdout pipe never blocks the asyncio event loop
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 
+# Standard LogRecord attributes - anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
 
-def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
-    """Setup a logger with consistent formatting"""
-    
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
-    # Avoid adding handlers multiple times
-    if logger.handlers:
-        return logger
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    
-    # Formatter
-    formatter = logging.Formatter(
+_lock = threading.Lock()
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _make_formatter(json_format: bool) -> logging.Formatter:
+    if json_format:
+        return JsonFormatter()
+    return logging.Formatter(
         fmt='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    console_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    
+
+
+def _install(json_format: bool, queue_size: int):
+    """Attach the shared queue handler to the root logger and start the writer"""
+    global _queue_handler, _listener
+
+    with _lock:
+        if _queue_handler is not None:
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        # Console handler, run by the listener thread
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(_make_formatter(json_format))
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        logging.getLogger().addHandler(_queue_handler)
+
+
+def setup_logger(name: str, level: int = logging.INFO, json_format: Optional[bool] = None) -> logging.Logger:
+    """Setup a logger with consistent formatting"""
+    if json_format is None:
+        json_format = os.environ.get("LOG_FORMAT", "text").lower() == "json"
+
+    _install(json_format, int(os.environ.get("LOG_QUEUE_SIZE", 10000)))
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+
     return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+class RateLimitedLogger:
+    """Logs each message template at most once per interval, counting suppressed repeats
+
+    Use %-style arguments so repeats of the same template share a key:
+        log.warning("Error fetching %s: %s", symbol, e)
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 10.0):
+        self.logger = logger
+        self.interval = interval
+        self._last: Dict[Tuple[int, str], Tuple[float, int]] = {}
+
+    def _log(self, level: int, msg: str, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        key = (level, msg)
+        now = time.monotonic()
+        last_time, suppressed = self._last.get(key, (None, 0))
+        if last_time is not None and now - last_time < self.interval:
+            self._last[key] = (last_time, suppressed + 1)
+            return
+
+        self._last[key] = (now, 0)
+        if suppressed:
+            msg = f"{msg} (suppressed {suppressed} similar)"
+        self.logger.log(level, msg, *args, stacklevel=3, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs):
+        self._log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs):
+        self._log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg: str, *args, **kwargs):
+        self._log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg: str, *args, **kwargs):
+        self._log(logging.ERROR, msg, *args, **kwargs)
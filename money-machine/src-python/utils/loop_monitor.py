@@ -0,0 +1,58 @@
+"""
+Event loop lag monitor - measures how late scheduled wakeups fire
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Samples event-loop scheduling delay with a periodic sleep"""
+    
+    def __init__(self, interval: float = 0.25, window: int = 240, warn_ms: float = 100.0):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.samples: deque = deque(maxlen=window)
+        self.max_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start sampling on the running loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag_ms = max(0.0, (loop.time() - expected) * 1000)
+                
+                self.samples.append(lag_ms)
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                if lag_ms > self.warn_ms:
+                    logger.warning(f"Event loop lag {lag_ms:.0f}ms")
+            except asyncio.CancelledError:
+                break
+    
+    def stats(self) -> Dict[str, float]:
+        """Current, p99 (over the sample window) and max lag in milliseconds"""
+        if not self.samples:
+            return {"current_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        
+        ordered = sorted(self.samples)
+        return {
+            "current_ms": self.samples[-1],
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            "max_ms": self.max_lag_ms,
+        }
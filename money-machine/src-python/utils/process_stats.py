@@ -0,0 +1,23 @@
+"""
+Process resource figures for status reporting
+"""
+
+import os
+import sys
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where current is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
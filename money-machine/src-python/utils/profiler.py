@@ -0,0 +1,295 @@
+"""
+On-demand sampling profiler for the running engine
+A daemon thread samples the event-loop thread's Python stack at a fixed
+interval, and tracemalloc (optionally) records allocations for the same
+window. Samples and allocations are attributed to the IPC command handler
+found on the stack, or to the command whose handler created the running
+task (for work fanned out with gather). Every session has a hard time limit
+and stops by itself.
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+MAX_DURATION_S = 300.0
+MAX_STACKS = 20000  # Distinct collapsed stacks kept per session
+IDLE = "(idle)"
+BACKGROUND = "(background)"
+
+# Event loop waiting for I/O: sampled but not attributed to any work
+_IDLE_FUNCTIONS = {('selectors.py', 'select'), ('selectors.py', 'poll')}
+
+# Command being handled in the current context; inherited by tasks it creates
+_current_command: contextvars.ContextVar = contextvars.ContextVar('current_command', default=None)
+
+
+def enter_command(command: str) -> contextvars.Token:
+    return _current_command.set(command)
+
+
+def exit_command(token: contextvars.Token):
+    _current_command.reset(token)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Session:
+    def __init__(self, duration_s: float, interval_s: float, memory: bool):
+        self.duration_s = duration_s
+        self.interval_s = interval_s
+        self.memory = memory
+        self.started = time.time()
+        self.stopped: Optional[float] = None
+        self.samples = 0
+        self.dropped_stacks = 0
+        self.stacks: Counter = Counter()  # (group, frames...) -> samples
+        self.start_snapshot = None
+        self.end_snapshot = None
+        self.started_tracemalloc = False
+
+
+class SamplingProfiler:
+    """PROFILE_START / PROFILE_STOP backend; one session at a time"""
+
+    def __init__(self):
+        self.session: Optional[_Session] = None
+        self._handlers: Dict[object, str] = {}  # code object -> command
+        self._handler_lines: List[Tuple[str, int, int, str]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target_thread: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+        self._task_commands: Dict[int, str] = {}  # id(task) -> command that created it
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_handlers(self, handlers: Dict[str, Callable]):
+        """Command name -> handler; used to attribute samples and allocations"""
+        self._handlers = {}
+        self._handler_lines = []
+        for command, handler in handlers.items():
+            code = getattr(getattr(handler, '__func__', handler), '__code__', None)
+            if code is None:
+                continue
+            self._handlers[code] = command
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            self._handler_lines.append((code.co_filename, min(lines), max(lines), command))
+
+    def start(self, duration_s: float = 30.0, interval_ms: float = 5.0,
+              memory: bool = True, traceback_frames: int = 16) -> Dict:
+        """Start sampling the calling thread (the event loop) for at most duration_s"""
+        if self.running:
+            raise RuntimeError("A profiling session is already running")
+
+        duration_s = min(max(float(duration_s), 0.1), MAX_DURATION_S)
+        interval_s = max(float(interval_ms), 1.0) / 1000
+        session = _Session(duration_s, interval_s, memory)
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, int(traceback_frames)))
+                session.started_tracemalloc = True
+            session.start_snapshot = tracemalloc.take_snapshot()
+
+        self.session = session
+        self._target_thread = threading.get_ident()
+        self._loop = asyncio.get_running_loop()
+        self._install_task_factory()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session,), name="profiler", daemon=True)
+        self._thread.start()
+        return {"status": "started", "duration_s": duration_s, "interval_ms": interval_s * 1000,
+                "memory": memory}
+
+    def _install_task_factory(self):
+        """Tag tasks created while a command is being handled"""
+        loop = self._loop
+        previous = loop.get_task_factory()
+        self._previous_factory = previous
+        task_commands = self._task_commands
+
+        def factory(loop, coro, context=None):
+            # context= only exists (and is only passed) on Python 3.11+
+            kwargs = {} if context is None else {"context": context}
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            command = _current_command.get()
+            if command is not None:
+                task_commands[id(task)] = command
+                task.add_done_callback(lambda t: task_commands.pop(id(t), None))
+            return task
+
+        loop.set_task_factory(factory)
+
+    def _restore_task_factory(self):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.set_task_factory, self._previous_factory)
+
+    def _run(self, session: _Session):
+        deadline = time.monotonic() + session.duration_s
+        while not self._stop.wait(session.interval_s):
+            if time.monotonic() >= deadline:
+                break
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is not None:
+                self._sample(session, frame)
+        # Time limit reached: finish the memory side too, so nothing keeps tracing
+        self._finish(session)
+
+    def _sample(self, session: _Session, frame):
+        frames = []
+        group = None
+        while frame is not None:
+            code = frame.f_code
+            frames.append(_frame_label(code))
+            if group is None:
+                group = self._handlers.get(code)
+            frame = frame.f_back
+
+        leaf = frames[0] if frames else ""
+        if group is None:
+            task = asyncio.tasks._current_tasks.get(self._loop)
+            if task is not None:
+                group = self._task_commands.get(id(task))
+        if group is None:
+            name = leaf.split(' ', 1)[0]
+            file_name = leaf.rsplit('(', 1)[-1].split(':', 1)[0]
+            group = IDLE if (file_name, name) in _IDLE_FUNCTIONS else BACKGROUND
+
+        key = (group, *reversed(frames))
+        with self._lock:
+            session.samples += 1
+            if key in session.stacks or len(session.stacks) < MAX_STACKS:
+                session.stacks[key] += 1
+            else:
+                session.dropped_stacks += 1
+
+    def _finish(self, session: _Session):
+        with self._lock:
+            if session.stopped is not None:
+                return
+            session.stopped = time.time()
+        self._restore_task_factory()
+        if session.memory and tracemalloc.is_tracing():
+            session.end_snapshot = tracemalloc.take_snapshot()
+            if session.started_tracemalloc:
+                tracemalloc.stop()
+
+    def stop(self) -> Optional[_Session]:
+        """Stop the running session (if any) and return the last session"""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self._thread = None
+        return self.session
+
+    # === Reports ===
+
+    def report(self, top: int = 25, collapsed: bool = False) -> Dict:
+        session = self.session
+        if session is None:
+            return {"error": "No profiling session"}
+        if self.running:
+            return {"status": "running", "elapsed_s": time.time() - session.started}
+
+        with self._lock:
+            stacks = dict(session.stacks)
+        busy = sum(count for key, count in stacks.items() if key[0] != IDLE)
+        result = {
+            "status": "stopped",
+            "duration_s": round((session.stopped or time.time()) - session.started, 3),
+            "interval_ms": session.interval_s * 1000,
+            "samples": session.samples,
+            "busy_samples": busy,
+            "dropped_stacks": session.dropped_stacks,
+            "top_functions": self._top_functions(stacks, top),
+            "by_command": {},
+        }
+
+        groups: Dict[str, Dict] = {}
+        for key, count in stacks.items():
+            groups.setdefault(key[0], {})[key] = count
+        for group, group_stacks in sorted(groups.items(), key=lambda g: -sum(g[1].values())):
+            samples = sum(group_stacks.values())
+            result["by_command"][group] = {
+                "samples": samples,
+                "pct": round(100 * samples / max(session.samples, 1), 2),
+                "top_functions": self._top_functions(group_stacks, min(top, 10)),
+            }
+
+        if session.end_snapshot is not None:
+            result["memory"] = self._memory_report(session, top)
+        if collapsed:
+            # Brendan Gregg's folded format: "frame;frame;frame count"
+            result["collapsed"] = "\n".join(
+                f"{';'.join(key)} {count}" for key, count in sorted(stacks.items(), key=lambda s: -s[1])
+            )
+        return result
+
+    @staticmethod
+    def _top_functions(stacks: Dict[tuple, int], top: int) -> List[Dict]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for key, count in stacks.items():
+            if key[0] == IDLE:
+                continue
+            frames = key[1:]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for function in set(frames):
+                total_counts[function] += count
+        ranked = sorted(total_counts, key=lambda f: (-self_counts[f], -total_counts[f]))
+        return [
+            {"function": function, "self": self_counts[function], "total": total_counts[function]}
+            for function in ranked[:top]
+        ]
+
+    def _command_for(self, traceback) -> str:
+        for frame in traceback:
+            for filename, first, last, command in self._handler_lines:
+                if frame.filename == filename and first <= frame.lineno <= last:
+                    return command
+        return BACKGROUND
+
+    def _memory_report(self, session: _Session, top: int) -> Dict:
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        end = session.end_snapshot.filter_traces(filters)
+        start = session.start_snapshot.filter_traces(filters)
+
+        sites = end.compare_to(start, 'lineno')
+        by_command: Counter = Counter()
+        for stat in end.compare_to(start, 'traceback'):
+            if stat.size_diff > 0:
+                by_command[self._command_for(stat.traceback)] += stat.size_diff
+
+        return {
+            "top_allocations": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count_diff": stat.count_diff,
+                }
+                for stat in sites[:top]
+            ],
+            "growth_kb_by_command": {
+                command: round(size / 1024, 1) for command, size in by_command.most_common()
+            },
+        }
@@ -0,0 +1,107 @@
+"""
+Versioned state with delta replies for polling clients
+A poller passes the version it last saw (since_version) and gets back
+"unchanged", a delta of what changed since then, or the full state when that
+version is no longer kept. Replies are encoded once per version and served
+from cache, so repeated identical polls are not re-serialized.
+
+Only state that changes on real events belongs in the versioned sections.
+Per-poll values (server time, uptime, counters) are passed to reply() as
+unversioned fields and appended to the cached encoding.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.ipc_server import EncodedResult
+
+_MISSING = object()
+
+
+def diff_sections(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Changed top-level sections; dict sections are diffed one level deeper (null = removed)"""
+    delta: Dict[str, Any] = {}
+    for key, value in new.items():
+        old_value = old.get(key, _MISSING)
+        if value == old_value:
+            continue
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            changed = {k: v for k, v in value.items() if old_value.get(k, _MISSING) != v}
+            changed.update({k: None for k in old_value if k not in value})
+            delta[key] = changed
+        else:
+            delta[key] = value
+    for key in old:
+        if key not in new:
+            delta[key] = None
+    return delta
+
+
+class VersionedState:
+    """Recent versions of one state dict, plus their encoded full, delta and unchanged replies"""
+
+    def __init__(self, history: int = 32, extra_delta: Optional[Callable[[Dict, Dict], Dict]] = None):
+        self.history = max(1, int(history))
+        self.extra_delta = extra_delta  # (old, new) -> extra delta fields, e.g. appended trades
+        self.version = 0
+        self.updated_at = 0.0
+        self.source_key: Any = None
+        self._versions: "OrderedDict[int, Dict]" = OrderedDict()
+        self._replies: Dict[Optional[int], str] = {}  # Encoded body without its closing brace
+        self.encoded = 0
+        self.cached = 0
+
+    def publish(self, sections: Dict[str, Any]) -> int:
+        """Record the current state; the version only moves when it differs from the last one"""
+        if self._versions and sections == self._versions[self.version]:
+            return self.version
+        self.version += 1
+        self.updated_at = time.time()
+        self._versions[self.version] = sections
+        while len(self._versions) > self.history:
+            self._versions.popitem(last=False)
+        self._replies.clear()
+        return self.version
+
+    def refresh(self, source_key: Any, build: Callable[[], Dict[str, Any]]) -> int:
+        """publish(build()) only when source_key (e.g. a change counter) has moved"""
+        if self._versions and source_key == self.source_key:
+            return self.version
+        self.source_key = source_key
+        return self.publish(build())
+
+    def reply(self, since_version: Optional[int] = None, unversioned: Optional[Dict[str, Any]] = None) -> EncodedResult:
+        """Full state, "unchanged" or a delta against since_version
+
+        Every reply also carries the server time ("timestamp") and the
+        `unversioned` fields; "updated_at" is when the state last changed.
+        """
+        base = since_version if since_version in self._versions else None
+        prefix = self._replies.get(base)
+        if prefix is not None:
+            self.cached += 1
+        else:
+            current = self._versions[self.version]
+            if base is None:
+                body = {"version": self.version, "full": True, **current, "updated_at": self.updated_at}
+            elif base == self.version:
+                body = {"version": self.version, "unchanged": True, "updated_at": self.updated_at}
+            else:
+                old = self._versions[base]
+                delta = diff_sections(old, current)
+                if self.extra_delta:
+                    delta.update(self.extra_delta(old, current))
+                body = {"version": self.version, "since_version": base, "delta": delta,
+                        "updated_at": self.updated_at}
+            prefix = json.dumps(body)[:-1]
+            self._replies[base] = prefix
+            self.encoded += 1
+
+        tail = json.dumps({"timestamp": time.time(), **(unversioned or {})})
+        return EncodedResult(prefix + "," + tail[1:])
+
+    def stats(self) -> Dict:
+        return {"version": self.version, "kept": len(self._versions),
+                "encoded": self.encoded, "cached": self.cached}